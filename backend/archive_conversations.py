@@ -0,0 +1,11 @@
+import os
+
+# Only run the maintenance task; do not start the queue workers or conversation writer
+os.environ['BACKGROUND_WORKERS_ENABLED'] = 'false'
+
+from src.main import app
+from src.utils.conversation_archive import conversation_archiver
+
+with app.app_context():
+    result = conversation_archiver.archive()
+    print(f"Archived {result['rows']} conversations into {result['files']} files.")
@@ -0,0 +1 @@
+"""Load and latency benchmarks for the backend, run against local stand-ins for its external services"""
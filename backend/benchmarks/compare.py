@@ -0,0 +1,56 @@
+"""
+Compare two benchmark reports.
+
+    python -m benchmarks.compare baseline.json candidate.json
+
+Prints every latency, throughput and error metric with its relative change,
+flagging changes larger than --threshold percent.
+"""
+import argparse
+import json
+
+from benchmarks.stats import flatten
+
+# Metrics compared by default: latency percentiles, throughput and error rates
+DEFAULT_SUFFIXES = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'error_rate')
+
+
+def compare(baseline, candidate, suffixes=DEFAULT_SUFFIXES):
+    """(metric, baseline value, candidate value, relative change) for the metrics in both reports"""
+    before, after = flatten(baseline.get('scenarios', {}), 'scenarios'), flatten(candidate.get('scenarios', {}), 'scenarios')
+    rows = []
+    for key in sorted(before.keys() & after.keys()):
+        if key.endswith(suffixes):
+            change = (after[key] - before[key]) / before[key] if before[key] else None
+            rows.append((key, before[key], after[key], change))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help="Percent change flagged with '!'")
+    parser.add_argument('--json', action='store_true', help="Print the comparison as JSON")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate = json.load(f)
+    rows = compare(baseline, candidate)
+
+    if args.json:
+        print(json.dumps([{'metric': key, 'baseline': old, 'candidate': new, 'change': change}
+                          for key, old, new, change in rows], indent=2))
+        return
+
+    width = max((len(key) for key, *_ in rows), default=0)
+    for key, old, new, change in rows:
+        percent = '      n/a' if change is None else f"{change * 100:+8.1f}%"
+        flag = '!' if change is not None and abs(change * 100) >= args.threshold else ' '
+        print(f"{flag} {key:<{width}}  {old:>12.2f}  {new:>12.2f}  {percent}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Closed-loop load driver for /api/chat and /api/whatsapp/webhook.
+
+Each of ``concurrency`` workers plays users holding conversations drawn from
+a workload: a first question in English or Arabic, then follow-ups in the
+same language. A worker sends its next message as soon as the previous one
+is answered (for the webhook, as soon as the first chunk of the answer has
+reached the Graph API stub).
+"""
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from benchmarks.stats import summarize
+
+SCENARIOS = ('chat', 'chat-stream', 'webhook')
+
+
+class Workload:
+    """
+    A mix of questions to replay.
+
+    Loads either a JSON file with "en" and "ar" question lists (and optional
+    "followups" per language), sampled with ``arabic_ratio``, or a JSONL file
+    of {"message": ..., "language": ...} records replayed in order, e.g.
+    exported from the conversations table.
+    """
+
+    def __init__(self, questions: Dict[str, List[str]], followups: Optional[Dict[str, List[str]]] = None,
+                 replay: Optional[List[Dict[str, str]]] = None, arabic_ratio: float = 0.3, turns: int = 1):
+        self.questions = questions
+        self.followups = followups or {}
+        self.replay = replay
+        self.arabic_ratio = arabic_ratio
+        self.turns = max(1, turns)
+        self._replay_position = itertools.count()
+
+    @classmethod
+    def load(cls, path: str, arabic_ratio: float = 0.3, turns: int = 1) -> 'Workload':
+        with open(path, encoding='utf-8') as f:
+            if path.endswith('.jsonl'):
+                replay = [json.loads(line) for line in f if line.strip()]
+                return cls({}, replay=replay, arabic_ratio=arabic_ratio, turns=turns)
+            data = json.load(f)
+        return cls({'en': data.get('en', []), 'ar': data.get('ar', [])}, data.get('followups'),
+                   arabic_ratio=arabic_ratio, turns=turns)
+
+    def conversation(self, rng: random.Random) -> List[Dict[str, str]]:
+        """The messages of one conversation, each with its language"""
+        if self.replay:
+            record = self.replay[next(self._replay_position) % len(self.replay)]
+            return [{'message': record['message'], 'language': record.get('language', 'en')}]
+
+        language = 'ar' if self.questions.get('ar') and rng.random() < self.arabic_ratio else 'en'
+        messages = [rng.choice(self.questions[language])]
+        followups = self.followups.get(language) or []
+        if followups:
+            messages += [rng.choice(followups) for _ in range(self.turns - 1)]
+        return [{'message': message, 'language': language} for message in messages]
+
+
+class LoadDriver:
+    """Runs one scenario against a backend and summarizes what the clients saw"""
+
+    def __init__(self, base_url: str, workload: Workload, concurrency: int = 8, timeout: float = 120.0,
+                 seed: int = 0, graph_stub=None, delivery_timeout: float = 60.0, settle: float = 1.0):
+        """
+        Initialize the driver.
+
+        Args:
+            base_url (str): Backend URL, e.g. http://127.0.0.1:5055
+            workload (Workload): Questions to send
+            concurrency (int): Simultaneous simulated users
+            timeout (float): Per-request timeout in seconds
+            seed (int): Seed of the question draws
+            graph_stub (GraphStub): Graph API stand-in, required for the webhook scenario
+            delivery_timeout (float): Longest wait for an answer to reach the Graph stub
+            settle (float): Quiet period after which an answer's delivery is taken as complete
+        """
+        self.base_url = base_url.rstrip('/')
+        self.workload = workload
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.seed = seed
+        self.graph_stub = graph_stub
+        self.delivery_timeout = delivery_timeout
+        self.settle = settle
+
+    def run(self, scenario: str, requests_total: Optional[int] = None, duration: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Drive a scenario until ``requests_total`` messages were sent or ``duration`` seconds passed.
+
+        Returns:
+            Dict[str, Any]: Throughput, error rate and latency percentiles, overall and per language
+        """
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {scenario!r}, expected one of {', '.join(SCENARIOS)}")
+        if scenario == 'webhook' and self.graph_stub is None:
+            raise ValueError("The webhook scenario needs the Graph API stub")
+
+        sent = itertools.count()
+        deadline = time.monotonic() + duration if duration else None
+        samples: List[Dict[str, Any]] = []
+        lock = threading.Lock()
+
+        def more() -> bool:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            return requests_total is None or next(sent) < requests_total
+
+        def worker(index: int) -> None:
+            rng = random.Random(self.seed * 1000 + index)
+            session = requests.Session()
+            while True:
+                conversation_id = f"bench-{index}-{uuid.uuid4().hex[:8]}"
+                for message in self.workload.conversation(rng):
+                    if not more():
+                        return
+                    sample = getattr(self, '_' + scenario.replace('-', '_'))(session, conversation_id, message)
+                    with lock:
+                        samples.append(sample)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for future in [pool.submit(worker, index) for index in range(self.concurrency)]:
+                future.result()
+        elapsed = time.monotonic() - started
+
+        if scenario == 'webhook':
+            self._wait_for_deliveries(samples)
+        return self._summarize(scenario, samples, elapsed)
+
+    def _chat(self, session: requests.Session, conversation_id: str, message: Dict[str, str]) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            response = session.post(f"{self.base_url}/api/chat", timeout=self.timeout,
+                                    json={'message': message['message'], 'session_id': conversation_id})
+            ok = response.status_code == 200 and 'response' in response.json()
+            status = response.status_code
+        except (requests.RequestException, ValueError):
+            ok, status = False, None
+        return {'language': message['language'], 'ok': ok, 'status': status,
+                'latency_ms': (time.monotonic() - started) * 1000}
+
+    def _chat_stream(self, session: requests.Session, conversation_id: str, message: Dict[str, str]) -> Dict[str, Any]:
+        started = time.monotonic()
+        first_chunk_ms = None
+        ok, status = False, None
+        try:
+            with session.post(f"{self.base_url}/api/chat", timeout=self.timeout, stream=True,
+                              headers={'Accept': 'text/event-stream'},
+                              json={'message': message['message'], 'session_id': conversation_id}) as response:
+                status = response.status_code
+                for line in response.iter_lines():
+                    if line == b'event: chunk' and first_chunk_ms is None:
+                        first_chunk_ms = (time.monotonic() - started) * 1000
+                    elif line == b'event: done':
+                        ok = status == 200
+                    elif line == b'event: error':
+                        ok = False
+                        break
+        except requests.RequestException:
+            ok = False
+        return {'language': message['language'], 'ok': ok, 'status': status,
+                'latency_ms': (time.monotonic() - started) * 1000, 'first_chunk_ms': first_chunk_ms}
+
+    def _webhook(self, session: requests.Session, conversation_id: str, message: Dict[str, str]) -> Dict[str, Any]:
+        # One simulated phone number per conversation
+        phone_number = str(20_000_000_000 + int(uuid.uuid5(uuid.NAMESPACE_OID, conversation_id).int % 10 ** 9))
+        delivered_before = len(self.graph_stub.deliveries(phone_number))
+        payload = {
+            'object': 'whatsapp_business_account',
+            'entry': [{'id': 'benchmark', 'changes': [{'field': 'messages', 'value': {
+                'messaging_product': 'whatsapp',
+                'messages': [{
+                    'from': phone_number,
+                    'id': f"wamid.bench.{uuid.uuid4().hex}",
+                    'timestamp': str(int(time.time())),
+                    'type': 'text',
+                    'text': {'body': message['message']}
+                }]
+            }}]}]
+        }
+        started = time.monotonic()
+        try:
+            response = session.post(f"{self.base_url}/api/whatsapp/webhook", json=payload, timeout=self.timeout)
+            ok, status = response.status_code == 200, response.status_code
+        except requests.RequestException:
+            ok, status = False, None
+        acknowledged = time.monotonic()
+
+        # Like a user, wait for the first part of the answer before writing again
+        if ok:
+            wait_until = started + self.delivery_timeout
+            while len(self.graph_stub.deliveries(phone_number)) <= delivered_before and time.monotonic() < wait_until:
+                time.sleep(0.01)
+        return {'language': message['language'], 'ok': ok, 'status': status,
+                'latency_ms': (acknowledged - started) * 1000,
+                'phone_number': phone_number, 'sent_at': started, 'delivered_before': delivered_before}
+
+    def _wait_for_deliveries(self, samples: List[Dict[str, Any]]) -> None:
+        """Wait until the Graph stub has been quiet for ``settle`` seconds, then time each answer"""
+        deadline = time.monotonic() + self.delivery_timeout
+        last_count = -1
+        quiet_since = time.monotonic()
+        phones = {sample['phone_number'] for sample in samples}
+        while time.monotonic() < deadline:
+            count = sum(len(self.graph_stub.deliveries(phone)) for phone in phones)
+            if count != last_count:
+                last_count, quiet_since = count, time.monotonic()
+            elif time.monotonic() - quiet_since >= self.settle:
+                break
+            time.sleep(0.05)
+
+        by_phone: Dict[str, List[Dict[str, Any]]] = {}
+        for sample in samples:
+            by_phone.setdefault(sample['phone_number'], []).append(sample)
+        for phone, phone_samples in by_phone.items():
+            deliveries = self.graph_stub.deliveries(phone)
+            phone_samples.sort(key=lambda sample: sample['sent_at'])
+            for position, sample in enumerate(phone_samples):
+                end = phone_samples[position + 1]['delivered_before'] if position + 1 < len(phone_samples) else len(deliveries)
+                answer = deliveries[sample['delivered_before']:end]
+                if answer:
+                    sample['first_chunk_ms'] = (answer[0] - sample['sent_at']) * 1000
+                    sample['last_chunk_ms'] = (answer[-1] - sample['sent_at']) * 1000
+                    sample['chunks'] = len(answer)
+
+    @staticmethod
+    def _summarize(scenario: str, samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+        errors = sum(1 for sample in samples if not sample['ok'])
+        successful = [sample for sample in samples if sample['ok']]
+        result = {
+            'requests': len(samples),
+            'errors': errors,
+            'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+            'duration_s': round(elapsed, 3),
+            'throughput_rps': round(len(successful) / elapsed, 3) if elapsed else 0.0,
+            'latency': summarize(sample['latency_ms'] for sample in successful),
+            'by_language': {
+                language: summarize(sample['latency_ms'] for sample in successful if sample['language'] == language)
+                for language in sorted({sample['language'] for sample in samples})
+            },
+            'status_codes': {str(status): sum(1 for sample in samples if sample['status'] == status)
+                             for status in sorted({sample['status'] for sample in samples}, key=str)}
+        }
+        if scenario in ('chat-stream', 'webhook'):
+            result['first_chunk'] = summarize(sample['first_chunk_ms'] for sample in successful
+                                              if sample.get('first_chunk_ms') is not None)
+        if scenario == 'webhook':
+            answered = [sample for sample in successful if 'last_chunk_ms' in sample]
+            result['acknowledgement'] = result.pop('latency')
+            result['last_chunk'] = summarize(sample['last_chunk_ms'] for sample in answered)
+            result['unanswered'] = len(successful) - len(answered)
+            result['chunks_per_answer'] = round(sum(sample['chunks'] for sample in answered) / len(answered), 2) if answered else 0.0
+        return result
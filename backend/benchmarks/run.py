@@ -0,0 +1,216 @@
+"""
+End-to-end load and latency benchmark.
+
+Starts stand-ins for Gemini, the MediaWiki API and the WhatsApp Graph API,
+launches the backend pointed at them, drives /api/chat and
+/api/whatsapp/webhook with a mix of English and Arabic questions, and writes
+a JSON report: throughput and p50/p95/p99 latency per scenario, the latency
+of every stage seen by the stubs, and the backend's own /api/stats counters
+over the run.
+
+    cd backend
+    python -m benchmarks.run --scenarios chat,chat-stream,webhook --requests 200 --concurrency 16 \\
+        --gemini-latency-ms 800 --output before.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+import requests
+
+from benchmarks.driver import SCENARIOS, LoadDriver, Workload
+from benchmarks.stats import delta
+from benchmarks.stubs import Faults, GeminiStub, GraphStub, MediaWikiStub
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_QUESTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'workloads', 'questions.json')
+
+# Phone number id the backend sends from; any value works against the Graph stub
+PHONE_NUMBER_ID = '100000000000001'
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default='chat,chat-stream,webhook',
+                        help=f"Comma-separated scenarios to run in order ({', '.join(SCENARIOS)})")
+    parser.add_argument('--requests', type=int, default=100, help="Messages sent per scenario")
+    parser.add_argument('--duration', type=float, help="Seconds per scenario, instead of --requests")
+    parser.add_argument('--warmup', type=int, default=10, help="Messages sent before each scenario and not measured")
+    parser.add_argument('--concurrency', type=int, default=8, help="Simultaneous simulated users")
+    parser.add_argument('--questions', default=DEFAULT_QUESTIONS,
+                        help="Question mix: JSON with 'en'/'ar' lists, or JSONL of {message, language} to replay")
+    parser.add_argument('--arabic-ratio', type=float, default=0.3, help="Fraction of conversations in Arabic")
+    parser.add_argument('--turns', type=int, default=3,
+                        help="Messages per conversation; follow-ups depend on history, so they bypass the answer cache")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--label', default='', help="Free-form label stored in the report")
+    parser.add_argument('--output', help="Report path (default: stdout)")
+
+    server = parser.add_argument_group('backend')
+    server.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi', help="How to serve the backend")
+    server.add_argument('--target', help="Benchmark an already running backend at this URL instead of launching one")
+    server.add_argument('--port', type=int, default=5055)
+    server.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help="Extra backend setting, e.g. WHATSAPP_QUEUE_ENABLED=false (repeatable)")
+    server.add_argument('--keep-workdir', action='store_true', help="Keep the databases and server log of the run")
+
+    stubs = parser.add_argument_group('stubs')
+    stubs.add_argument('--jitter', type=float, default=0.2, help="Log-normal spread of every injected latency")
+    stubs.add_argument('--gemini-latency-ms', type=float, default=600.0, help="Time to the first token")
+    stubs.add_argument('--gemini-chunk-interval-ms', type=float, default=40.0, help="Time between streamed chunks")
+    stubs.add_argument('--gemini-answer-words', type=int, default=180)
+    stubs.add_argument('--gemini-error-rate', type=float, default=0.0)
+    stubs.add_argument('--wiki-latency-ms', type=float, default=150.0)
+    stubs.add_argument('--wiki-error-rate', type=float, default=0.0)
+    stubs.add_argument('--graph-latency-ms', type=float, default=120.0)
+    stubs.add_argument('--graph-error-rate', type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    args.scenarios = [scenario.strip() for scenario in args.scenarios.split(',') if scenario.strip()]
+    for scenario in args.scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario {scenario!r}")
+    return args
+
+
+def start_stubs(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        'gemini': GeminiStub(Faults(args.gemini_latency_ms, args.jitter, args.gemini_error_rate, 503, args.seed),
+                             answer_words=args.gemini_answer_words,
+                             chunk_interval_ms=args.gemini_chunk_interval_ms).start(),
+        'mediawiki': MediaWikiStub(Faults(args.wiki_latency_ms, args.jitter, args.wiki_error_rate, 503, args.seed + 1)).start(),
+        'graph': GraphStub(Faults(args.graph_latency_ms, args.jitter, args.graph_error_rate, 503, args.seed + 2)).start()
+    }
+
+
+def backend_environment(stubs: Dict[str, Any], workdir: str) -> Dict[str, str]:
+    """Settings that point the backend at the stubs and keep its state in workdir"""
+    return {
+        'GEMINI_API_KEY': 'benchmark',
+        'GEMINI_API_ENDPOINT': stubs['gemini'].url,
+        'WIKIPEDIA_API_URL': stubs['mediawiki'].url + '/{language}/api.php',
+        'WHATSAPP_GRAPH_API_URL': stubs['graph'].url + '/v18.0',
+        'WHATSAPP_ACCESS_TOKEN': 'benchmark',
+        'WHATSAPP_PHONE_NUMBER_ID': PHONE_NUMBER_ID,
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'benchmark.db')}",
+        'WIKIPEDIA_CACHE_PATH': os.path.join(workdir, 'wikipedia_cache.sqlite3'),
+        'WHATSAPP_QUEUE_PATH': os.path.join(workdir, 'whatsapp_queue.sqlite3'),
+        'CONVERSATION_ARCHIVE_DIR': os.path.join(workdir, 'archive'),
+        'LOG_LEVEL': 'WARNING'
+    }
+
+
+def launch_backend(args: argparse.Namespace, env: Dict[str, str], workdir: str) -> subprocess.Popen:
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.serve', '--mode', args.server, '--port', str(args.port)],
+        cwd=BACKEND_DIR, env=dict(os.environ, **env), stdout=log, stderr=subprocess.STDOUT
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with status {process.returncode}, see {log.name}")
+        try:
+            if requests.get(f"{base_url}/api/stats", timeout=1).status_code == 200:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Backend did not start within 60s, see {log.name}")
+
+
+def app_stats(base_url: str) -> Dict[str, Any]:
+    """The backend's chat pipeline and WhatsApp counters"""
+    stats = {}
+    for name, path in (('chat', '/api/stats'), ('whatsapp', '/api/whatsapp/status')):
+        try:
+            stats[name] = requests.get(base_url + path, timeout=10).json()
+        except (requests.RequestException, ValueError):
+            stats[name] = None
+    return stats
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    stubs = start_stubs(args)
+    workdir = tempfile.mkdtemp(prefix='chronicler-bench-')
+    env = backend_environment(stubs, workdir)
+    for setting in args.env:
+        key, _, value = setting.partition('=')
+        env[key] = value
+
+    process = None
+    if args.target:
+        base_url = args.target.rstrip('/')
+        print("Benchmarking %s; it should run with:\n%s" % (
+            base_url, '\n'.join(f"  {key}={value}" for key, value in sorted(env.items()))), file=sys.stderr)
+    else:
+        base_url = f"http://127.0.0.1:{args.port}"
+        process = launch_backend(args, env, workdir)
+
+    workload = Workload.load(args.questions, arabic_ratio=args.arabic_ratio, turns=args.turns)
+    driver = LoadDriver(base_url, workload, concurrency=args.concurrency, seed=args.seed, graph_stub=stubs['graph'])
+
+    report = {
+        'label': args.label,
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'server': 'external' if args.target else args.server
+        },
+        'parameters': {key: value for key, value in sorted(vars(args).items()) if key not in ('output', 'label')},
+        'backend_settings': {key: value for key, value in sorted(env.items()) if key != 'GEMINI_API_KEY'},
+        'scenarios': {}
+    }
+    try:
+        for scenario in args.scenarios:
+            print(f"Running {scenario}...", file=sys.stderr)
+            if args.warmup:
+                driver.run(scenario, requests_total=args.warmup)
+            for stub in stubs.values():
+                stub.reset()
+            before = app_stats(base_url)
+
+            result = driver.run(scenario, requests_total=None if args.duration else args.requests,
+                                duration=args.duration)
+            result['stages'] = {name: stub.stats() for name, stub in stubs.items()}
+            after = app_stats(base_url)
+            # Counters as changed by this scenario, and the final values of gauges and settings
+            result['app'] = {'change': delta(before, after), 'final': after}
+            report['scenarios'][scenario] = result
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        for stub in stubs.values():
+            stub.stop()
+        if args.keep_workdir:
+            report['workdir'] = workdir
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    report = json.dumps(run(args), indent=2, sort_keys=True, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+Serve the backend for a benchmark run.
+
+    python -m benchmarks.serve --mode wsgi --port 5055
+    python -m benchmarks.serve --mode asgi --port 5055
+"""
+import argparse
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('wsgi', 'asgi'), default='wsgi',
+                        help="wsgi: the Flask app on a threaded server; asgi: src.asgi under uvicorn")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    if args.mode == 'asgi':
+        import uvicorn
+        uvicorn.run('src.asgi:application', host=args.host, port=args.port, log_level='warning')
+        return
+
+    from werkzeug.serving import run_simple
+    from src.main import app
+    run_simple(args.host, args.port, app, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
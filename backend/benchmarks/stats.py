@@ -0,0 +1,50 @@
+"""Latency summaries and run-to-run comparison of benchmark reports"""
+import math
+from typing import Any, Dict, Iterable
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(values_ms: Iterable[float]) -> Dict[str, Any]:
+    """Count, mean and p50/p95/p99/max of latencies in milliseconds"""
+    values = sorted(values_ms)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values), 2),
+        'p50_ms': round(percentile(values, 0.50), 2),
+        'p95_ms': round(percentile(values, 0.95), 2),
+        'p99_ms': round(percentile(values, 0.99), 2),
+        'max_ms': round(values[-1], 2)
+    }
+
+
+def delta(before: Any, after: Any) -> Any:
+    """
+    Difference of two snapshots of nested stats. Integer counters are
+    subtracted; rates, means and other values are taken from after.
+    """
+    if isinstance(after, dict) and isinstance(before, dict):
+        return {key: delta(before.get(key), value) for key, value in after.items()}
+    if type(after) is int and type(before) is int:
+        return after - before
+    return after
+
+
+def flatten(report: Any, prefix: str = '') -> Dict[str, float]:
+    """Numeric leaves of a report keyed by their dotted path"""
+    if isinstance(report, dict):
+        flat = {}
+        for key, value in report.items():
+            flat.update(flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(report, (int, float)) and not isinstance(report, bool):
+        return {prefix: report}
+    return {}
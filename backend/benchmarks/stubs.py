@@ -0,0 +1,290 @@
+"""
+Local stand-ins for the external services the backend calls.
+
+Each stub is a threaded HTTP server speaking just enough of the real API for
+the backend's clients, with configurable latency and error injection, and
+records the latency of every call it served so a report can break a request
+down by stage.
+"""
+import json
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.stats import summarize
+
+_ARABIC_RE = re.compile(r'[\u0600-\u06FF]')
+
+ENGLISH_WORDS = (
+    "the pharaohs of the old kingdom raised monumental tombs along the western bank of the nile "
+    "while scribes recorded harvests taxes and temple offerings in hieratic script and priests "
+    "managed vast estates that sustained the cult of the gods across upper and lower egypt"
+).split()
+ARABIC_WORDS = (
+    "شيد الفراعنة في الدولة القديمة مقابر ضخمة على الضفة الغربية للنيل بينما سجل الكتبة المحاصيل "
+    "والضرائب وقرابين المعابد وأدار الكهنة أراضي واسعة لخدمة عبادة الآلهة في مصر العليا والسفلى"
+).split()
+
+
+class Faults:
+    """Latency and error injection for one stub"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter: float = 0.2, error_rate: float = 0.0,
+                 error_status: int = 503, seed: Optional[int] = None):
+        """
+        Initialize the fault settings.
+
+        Args:
+            latency_ms (float): Median added latency per call
+            jitter (float): Spread of the latency as a fraction of latency_ms (log-normal sigma)
+            error_rate (float): Fraction of calls answered with error_status
+            error_status (int): HTTP status of injected errors
+            seed (int): Seed for reproducible runs
+        """
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, latency_ms: Optional[float] = None) -> float:
+        """Sample a delay in seconds around latency_ms (default: the configured latency)"""
+        median = self.latency_ms if latency_ms is None else latency_ms
+        if median <= 0:
+            return 0.0
+        with self._lock:
+            factor = self._random.lognormvariate(0, self.jitter) if self.jitter > 0 else 1.0
+        return median * factor / 1000
+
+    def should_fail(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class StubServer(ABC):
+    """A threaded HTTP stub that records the latency and outcome of every call"""
+
+    name = 'stub'
+
+    def __init__(self, faults: Optional[Faults] = None, host: str = '127.0.0.1', port: int = 0):
+        self.faults = faults or Faults()
+        self._lock = threading.Lock()
+        self._latencies_ms: List[float] = []
+        self._errors = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub._serve(self)
+
+            def do_POST(self):
+                stub._serve(self)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StubServer':
+        self._thread = threading.Thread(target=self.server.serve_forever, name=f"{self.name}-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._latencies_ms = []
+            self._errors = 0
+
+    def _serve(self, request: BaseHTTPRequestHandler) -> None:
+        started = time.monotonic()
+        failed = False
+        try:
+            length = int(request.headers.get('Content-Length') or 0)
+            body = request.rfile.read(length) if length else b''
+            time.sleep(self.faults.delay())
+            if self.faults.should_fail():
+                failed = True
+                self.send_json(request, {'error': {'code': self.faults.error_status, 'message': 'Injected error'}},
+                               self.faults.error_status)
+                return
+            self.handle(request, urlparse(request.path), body)
+        except (BrokenPipeError, ConnectionResetError):
+            failed = True
+        finally:
+            with self._lock:
+                self._latencies_ms.append((time.monotonic() - started) * 1000)
+                self._errors += failed
+
+    @abstractmethod
+    def handle(self, request: BaseHTTPRequestHandler, url, body: bytes) -> None:
+        """Answer one request; faults have already been applied"""
+
+    @staticmethod
+    def send_json(request: BaseHTTPRequestHandler, payload: Any, status: int = 200) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json; charset=utf-8')
+        request.send_header('Content-Length', str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls served, injected errors and the latency summary of this stage"""
+        with self._lock:
+            latencies = list(self._latencies_ms)
+            errors = self._errors
+        return {'calls': len(latencies), 'errors': errors, 'latency': summarize(latencies)}
+
+
+class GeminiStub(StubServer):
+    """
+    Stand-in for the Gemini REST API (generateContent and streamGenerateContent).
+
+    The answer is filler text in the language of the user's question, so
+    the backend's language handling and chunking see realistic input. The
+    fault latency is the time to the first token; a stream then sends one
+    chunk every ``chunk_interval_ms``.
+    """
+
+    name = 'gemini'
+
+    def __init__(self, faults: Optional[Faults] = None, answer_words: int = 180, chunk_words: int = 30,
+                 chunk_interval_ms: float = 40.0, **kwargs):
+        super().__init__(faults, **kwargs)
+        self.answer_words = answer_words
+        self.chunk_words = chunk_words
+        self.chunk_interval_ms = chunk_interval_ms
+
+    def _answer(self, body: bytes) -> List[str]:
+        try:
+            parts = json.loads(body)['contents'][-1]['parts']
+            prompt = ' '.join(part.get('text', '') for part in parts)
+        except (ValueError, KeyError, IndexError, TypeError):
+            prompt = ''
+        # The prompt ends with "User: <question>\nChronicler:"
+        question = prompt.rsplit('User:', 1)[-1]
+        words = ARABIC_WORDS if _ARABIC_RE.search(question) else ENGLISH_WORDS
+        answer = [words[i % len(words)] for i in range(self.answer_words)]
+        return [' '.join(answer[i:i + self.chunk_words]) + ' ' for i in range(0, len(answer), self.chunk_words)]
+
+    @staticmethod
+    def _candidate(text: str) -> Dict[str, Any]:
+        return {'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'},
+                                'finishReason': 'STOP', 'index': 0}]}
+
+    def handle(self, request, url, body):
+        chunks = self._answer(body)
+        if ':streamGenerateContent' not in url.path:
+            self.send_json(request, self._candidate(''.join(chunks)))
+            return
+
+        # The REST transport reads the stream as one JSON array, sent element by element
+        request.send_response(200)
+        request.send_header('Content-Type', 'application/json; charset=utf-8')
+        request.send_header('Transfer-Encoding', 'chunked')
+        request.end_headers()
+        for index, text in enumerate(chunks):
+            if index:
+                time.sleep(self.faults.delay(self.chunk_interval_ms))
+            piece = ('[' if index == 0 else ',\r\n') + json.dumps(self._candidate(text), ensure_ascii=False)
+            self._write_chunk(request, piece.encode('utf-8'))
+        self._write_chunk(request, b']')
+        request.wfile.write(b'0\r\n\r\n')
+        request.wfile.flush()
+
+    @staticmethod
+    def _write_chunk(request, data: bytes) -> None:
+        request.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        request.wfile.flush()
+
+
+class MediaWikiStub(StubServer):
+    """
+    Stand-in for the MediaWiki action API at /<language>/api.php.
+
+    A search returns ``hits`` pages whose titles are Egypt-related, each with
+    an intro extract, in the formatversion=2 shape the client parses.
+    """
+
+    name = 'mediawiki'
+
+    def __init__(self, faults: Optional[Faults] = None, hits: int = 5, **kwargs):
+        super().__init__(faults, **kwargs)
+        self.hits = hits
+
+    def handle(self, request, url, body):
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        language = url.path.strip('/').split('/')[0] or 'en'
+        words = ARABIC_WORDS if language == 'ar' else ENGLISH_WORDS
+
+        if 'gsrsearch' in params:
+            query = params['gsrsearch']
+            count = min(self.hits, int(params.get('gsrlimit', self.hits)))
+            titles = [f"{query.title()} in Egypt ({index + 1})" for index in range(count)]
+        else:
+            titles = [params.get('titles', 'Egypt')]
+
+        pages = []
+        for index, title in enumerate(titles):
+            start = (index * 7) % len(words)
+            extract = ' '.join(words[start:] + words[:start])[:600] + '.'
+            pages.append({'pageid': 1000 + index, 'ns': 0, 'title': title, 'index': index + 1, 'extract': extract})
+        self.send_json(request, {'batchcomplete': True, 'query': {'pages': pages}})
+
+
+class GraphStub(StubServer):
+    """
+    Stand-in for graph.facebook.com's /<version>/<phone-number-id>/messages.
+
+    Every accepted message is recorded with its arrival time, so the load
+    driver can measure how long after the webhook an answer reached the user.
+    """
+
+    name = 'graph'
+
+    def __init__(self, faults: Optional[Faults] = None, **kwargs):
+        super().__init__(faults, **kwargs)
+        self._deliveries: Dict[str, List[float]] = {}
+        self._sent = 0
+
+    def reset(self) -> None:
+        super().reset()
+        with self._lock:
+            self._deliveries = {}
+
+    def handle(self, request, url, body):
+        payload = json.loads(body or b'{}')
+        recipient = payload.get('to', '')
+        with self._lock:
+            self._deliveries.setdefault(recipient, []).append(time.monotonic())
+            self._sent += 1
+            message_id = f"wamid.stub{self._sent}"
+        self.send_json(request, {'messaging_product': 'whatsapp', 'contacts': [{'input': recipient, 'wa_id': recipient}],
+                                 'messages': [{'id': message_id}]})
+
+    def deliveries(self, recipient: str) -> List[float]:
+        """Monotonic arrival times of the messages sent to recipient"""
+        with self._lock:
+            return list(self._deliveries.get(recipient, []))
@@ -1,7 +1,14 @@
+import os
+
+# Only run the maintenance task; do not start the queue workers or conversation writer
+os.environ['BACKGROUND_WORKERS_ENABLED'] = 'false'
+
 from src.main import app
-from src.models.conversation import db
+from src.models.conversation import db, create_missing_indexes, backfill_session_summaries
 
 with app.app_context():
     db.create_all()
+    create_missing_indexes()
+    backfill_session_summaries()
     print("Database initialized.")
 
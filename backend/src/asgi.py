@@ -0,0 +1,263 @@
+"""
+ASGI entry point: uvicorn src.asgi:application --workers 2
+
+POST /api/chat and POST /api/whatsapp/webhook are served natively on the event
+loop, so a chat waiting on Gemini or Wikipedia holds a coroutine instead of a
+thread. Session and database work goes to the bounded blocking executor. Every
+other route is the unchanged Flask app behind asgiref's WSGI adapter.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+from src.main import app
+from src.config import Config
+from src.routes.chat import (conversation_sessions, get_chronicler_response_async,
+                             stream_chronicler_response_async, _sse_event)
+from src.routes import whatsapp
+from src.utils.blocking_executor import blocking_executor
+from src.utils.conversation_writer import conversation_writer
+from src.utils.logging_setup import correlation_id, new_correlation_id
+from src.utils.query_analysis import query_analyzer
+from src.utils.wikipedia_search import wikipedia_searcher
+
+logger = logging.getLogger(__name__)
+
+blocking_executor.init_app(app)
+
+
+class Request:
+    """The parts of an ASGI HTTP request the native routes need"""
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self.receive = receive
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                        for name, value in scope.get('headers', [])}
+
+    async def body(self) -> bytes:
+        chunks = []
+        while True:
+            message = await self.receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def json(self):
+        return json.loads(await self.body() or b'null')
+
+
+def _headers(content_type, extra=None):
+    headers = {
+        'content-type': content_type,
+        'access-control-allow-origin': '*',
+        'x-request-id': correlation_id.get() or ''
+    }
+    headers.update(extra or {})
+    return [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()]
+
+
+async def send_json(send, payload, status=200):
+    """Send a complete JSON response"""
+    await send({'type': 'http.response.start', 'status': status, 'headers': _headers('application/json')})
+    await send({'type': 'http.response.body', 'body': json.dumps(payload, ensure_ascii=False).encode('utf-8')})
+
+
+def _record_chat(session_id, conversation, user_message, ai_response, language):
+    """Save the session and queue the exchange for the database; run on the blocking executor"""
+    conversation_sessions.save(session_id, conversation)
+    conversation_writer.submit(
+        session_id=session_id,
+        user_message=user_message,
+        ai_response=ai_response,
+        language=language
+    )
+
+
+class ChroniclerASGI:
+    """Serves the chat and webhook routes natively and the rest through Flask"""
+
+    def __init__(self, flask_app, max_in_flight=Config.ASYNC_MAX_IN_FLIGHT):
+        """
+        Initialize the application.
+
+        Args:
+            flask_app (Flask): Application serving every other route
+            max_in_flight (int): Native requests handled at once; the rest wait for a slot
+        """
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.routes = {
+            ('POST', '/api/chat'): self.chat,
+            ('POST', '/api/whatsapp/webhook'): self.whatsapp_webhook
+        }
+        self._slots = asyncio.Semaphore(max_in_flight)
+        # Keeps background message tasks alive until they finish
+        self._tasks = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+
+        handler = self.routes.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+        if handler is None:
+            await self.wsgi(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+        token = new_correlation_id(request.headers.get('x-request-id'))
+        try:
+            async with self._slots:
+                await handler(request, send)
+        finally:
+            correlation_id.reset(token)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._tasks:
+                    await asyncio.wait(self._tasks, timeout=Config.ASYNC_SHUTDOWN_TIMEOUT_SECONDS)
+                await wikipedia_searcher.client.aclose()
+                await whatsapp.whatsapp_client.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def chat(self, request, send):
+        try:
+            data = await request.json()
+            logger.debug("Received chat request", extra={"payload": data})
+
+            user_message = data.get('message', '')
+            session_id = data.get('session_id', str(uuid.uuid4()))
+
+            if not user_message:
+                logger.info("Rejected chat request with an empty message")
+                await send_json(send, {'error': 'Message is required'}, 400)
+                return
+
+            language = query_analyzer.analyze(user_message).language
+
+            conversation = await blocking_executor.run(conversation_sessions.get, session_id)
+            logger.info("Chat request", extra={"session_id": session_id, "language": language, "history_messages": len(conversation.history)})
+
+            conversation.add_message('user', user_message)
+
+            accept = parse_accept_header(request.headers.get('accept'), MIMEAccept)
+            if accept.best == 'text/event-stream':
+                await self._stream_chat(send, user_message, session_id, language, conversation)
+                return
+
+            ai_response = await get_chronicler_response_async(user_message, conversation, language)
+
+            conversation.add_message('assistant', ai_response)
+            await blocking_executor.run(_record_chat, session_id, conversation, user_message, ai_response, language)
+
+            await send_json(send, {
+                'response': ai_response,
+                'session_id': session_id,
+                'language': language,
+                'timestamp': datetime.utcnow().isoformat()
+            })
+
+        except Exception as e:
+            logger.exception("Error occurred in chat()")
+            await send_json(send, {'error': str(e)}, 500)
+
+    async def _stream_chat(self, send, user_message, session_id, language, conversation):
+        """Stream a chat answer as server-sent events, then persist the exchange"""
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': _headers('text/event-stream; charset=utf-8', {'cache-control': 'no-cache', 'x-accel-buffering': 'no'})
+        })
+
+        disconnected = False
+
+        async def emit(event, payload, more_body=True):
+            nonlocal disconnected
+            try:
+                await send({'type': 'http.response.body', 'body': _sse_event(event, payload).encode('utf-8'), 'more_body': more_body})
+            except OSError:
+                # The server reports a closed client connection as an OSError
+                disconnected = True
+                raise
+
+        chunks = []
+        try:
+            async for text in stream_chronicler_response_async(user_message, conversation, language):
+                chunks.append(text)
+                await emit('chunk', {'text': text})
+
+            ai_response = ''.join(chunks)
+            logger.info("AI response streamed", extra={"response_chars": len(ai_response)})
+
+            conversation.add_message('assistant', ai_response)
+            await blocking_executor.run(_record_chat, session_id, conversation, user_message, ai_response, language)
+
+            await emit('done', {
+                'session_id': session_id,
+                'language': language,
+                'timestamp': datetime.utcnow().isoformat()
+            }, more_body=False)
+        except Exception as e:
+            if disconnected:
+                logger.info("Client disconnected during the stream")
+                return
+            logger.exception("Error occurred while streaming chat")
+            try:
+                await emit('error', {'error': str(e)}, more_body=False)
+            except OSError:
+                logger.info("Client disconnected before the error was sent")
+
+    async def whatsapp_webhook(self, request, send):
+        try:
+            body = await request.body()
+            signature = request.headers.get('x-hub-signature-256')
+            if signature and not whatsapp.verify_webhook_signature(body, signature):
+                logger.warning("Invalid webhook signature")
+                await send_json(send, {'error': 'Invalid signature'}, 403)
+                return
+
+            data = json.loads(body or b'null')
+            logger.debug("Webhook payload", extra={"payload": data})
+
+            if data.get("object") == "whatsapp_business_account":
+                for entry in data.get("entry", []):
+                    for change in entry.get("changes", []):
+                        if change.get("field") == "messages":
+                            for message in change.get("value", {}).get("messages", []):
+                                await self._accept(message)
+
+            await send_json(send, {"status": "success"})
+
+        except Exception as e:
+            logger.exception("Error processing webhook")
+            await send_json(send, {"error": str(e)}, 500)
+
+    async def _accept(self, message):
+        """Claim and enqueue a message for the durable queue, or answer it on the event loop after acknowledging"""
+        if whatsapp.whatsapp_job_queue is not None:
+            # Claiming and enqueuing run together, so a failed enqueue releases the claim
+            await blocking_executor.run(whatsapp.accept_message, message)
+            return
+
+        message_id = message.get("id")
+        if message_id and not await blocking_executor.run(whatsapp.message_deduplicator.claim, message_id):
+            logger.info("Duplicate message %s, skipping", message_id)
+            return
+
+        message_data = {"messages": [message]}
+        task = asyncio.ensure_future(whatsapp.process_message_async(message_data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+# Global instance served by uvicorn
+application = ChroniclerASGI(app)
@@ -3,14 +3,29 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') 
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY') 
+    # Alternative Gemini API host, e.g. a local stand-in for benchmarks; it is reached over REST
+    GEMINI_API_ENDPOINT = os.environ.get('GEMINI_API_ENDPOINT')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Async (ASGI) serving settings
+    ASYNC_BLOCKING_WORKERS = int(os.environ.get('ASYNC_BLOCKING_WORKERS', 16))
+    ASYNC_MAX_IN_FLIGHT = int(os.environ.get('ASYNC_MAX_IN_FLIGHT', 500))
+    ASYNC_SHUTDOWN_TIMEOUT_SECONDS = float(os.environ.get('ASYNC_SHUTDOWN_TIMEOUT_SECONDS', 30))
+    
+    # Background worker settings; maintenance scripts that import the app turn them off
+    BACKGROUND_WORKERS_ENABLED = os.environ.get('BACKGROUND_WORKERS_ENABLED', 'true').lower() == 'true'
+    
+    # Logging settings
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # 'json' or 'text'
+    LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 0.01))
+    
     # CORS settings
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS')  
     
     # AI Model settings
-    AI_MODEL_NAME = 'gemini-pro'
+    AI_MODEL_NAME = os.environ.get('AI_MODEL_NAME', 'gemini-1.5-flash')
     AI_TEMPERATURE = 0.7
     AI_TOP_P = 0.8
     AI_TOP_K = 40
@@ -19,4 +34,92 @@ class Config:
     # Conversation settings
     MAX_CONVERSATION_TOKENS = 4000
     MAX_HISTORY_LENGTH = 50
+    HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 50))
+    HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', 200))
+    SESSIONS_PAGE_SIZE = int(os.environ.get('SESSIONS_PAGE_SIZE', 50))
+    SESSIONS_MAX_PAGE_SIZE = int(os.environ.get('SESSIONS_MAX_PAGE_SIZE', 200))
+    
+    # Write-behind persistence of Conversation rows
+    CONVERSATION_WRITE_BEHIND = os.environ.get('CONVERSATION_WRITE_BEHIND', 'true').lower() == 'true'
+    CONVERSATION_WRITE_BATCH_SIZE = int(os.environ.get('CONVERSATION_WRITE_BATCH_SIZE', 100))
+    CONVERSATION_WRITE_FLUSH_INTERVAL_SECONDS = float(os.environ.get('CONVERSATION_WRITE_FLUSH_INTERVAL_SECONDS', 1.0))
+    CONVERSATION_WRITE_QUEUE_SIZE = int(os.environ.get('CONVERSATION_WRITE_QUEUE_SIZE', 10000))
+    
+    # Archival of old Conversation rows into compressed monthly files
+    CONVERSATION_ARCHIVE_DIR = os.environ.get('CONVERSATION_ARCHIVE_DIR', '/tmp/instance/archive')
+    CONVERSATION_ARCHIVE_AFTER_DAYS = int(os.environ.get('CONVERSATION_ARCHIVE_AFTER_DAYS', 90))
+    CONVERSATION_ARCHIVE_BATCH_SIZE = int(os.environ.get('CONVERSATION_ARCHIVE_BATCH_SIZE', 10000))
+    CONVERSATION_ARCHIVE_CACHE_BLOCKS = int(os.environ.get('CONVERSATION_ARCHIVE_CACHE_BLOCKS', 256))
+    
+    # Knowledge base settings
+    KNOWLEDGE_BASE_DIR = os.environ.get('KNOWLEDGE_BASE_DIR')  # Defaults to the bundled knowledge_base directory
+    KNOWLEDGE_RELOAD_CHECK_SECONDS = float(os.environ.get('KNOWLEDGE_RELOAD_CHECK_SECONDS', 5))
+    KNOWLEDGE_PAGE_SIZE = int(os.environ.get('KNOWLEDGE_PAGE_SIZE', 20))
+    KNOWLEDGE_MAX_PAGE_SIZE = int(os.environ.get('KNOWLEDGE_MAX_PAGE_SIZE', 100))
+    KNOWLEDGE_PRELOAD = os.environ.get('KNOWLEDGE_PRELOAD', 'false').lower() == 'true'  # Load at startup instead of on first use
+    
+    # Session store settings
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'memory')  # 'memory', 'sql' or 'redis'
+    SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    SESSION_STORE_MAX_SESSIONS = int(os.environ.get('SESSION_STORE_MAX_SESSIONS', 1000))
+    SESSION_STORE_TTL_SECONDS = float(os.environ.get('SESSION_STORE_TTL_SECONDS', 3600))
+
+    # Wikipedia retrieval settings
+    WIKIPEDIA_MAX_WORKERS = int(os.environ.get('WIKIPEDIA_MAX_WORKERS', 8))
+    WIKIPEDIA_DEADLINE_SECONDS = float(os.environ.get('WIKIPEDIA_DEADLINE_SECONDS', 4.0))
+    WIKIPEDIA_CACHE_PATH = os.environ.get('WIKIPEDIA_CACHE_PATH', '/tmp/instance/wikipedia_cache.sqlite3')
+    WIKIPEDIA_CACHE_TTL_SECONDS = float(os.environ.get('WIKIPEDIA_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+    WIKIPEDIA_CACHE_NEGATIVE_TTL_SECONDS = float(os.environ.get('WIKIPEDIA_CACHE_NEGATIVE_TTL_SECONDS', 3600))
+    WIKIPEDIA_CACHE_MEMORY_SIZE = int(os.environ.get('WIKIPEDIA_CACHE_MEMORY_SIZE', 2048))
+    WIKIPEDIA_CACHE_PURGE_INTERVAL_SECONDS = float(os.environ.get('WIKIPEDIA_CACHE_PURGE_INTERVAL_SECONDS', 3600))
+    WIKIPEDIA_API_URL = os.environ.get('WIKIPEDIA_API_URL', 'https://{language}.wikipedia.org/w/api.php')  # {language} is filled per call
+    WIKIPEDIA_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('WIKIPEDIA_CONNECT_TIMEOUT_SECONDS', 3.05))
+    WIKIPEDIA_READ_TIMEOUT_SECONDS = float(os.environ.get('WIKIPEDIA_READ_TIMEOUT_SECONDS', 4.0))
+    WIKIPEDIA_USER_AGENT = os.environ.get('WIKIPEDIA_USER_AGENT', 'ChroniclerOfTheNile/1.0 (Egyptian history chatbot)')
 
+    # Local knowledge base retrieval settings
+    KNOWLEDGE_TOP_K = int(os.environ.get('KNOWLEDGE_TOP_K', 3))
+    KNOWLEDGE_MIN_SCORE = float(os.environ.get('KNOWLEDGE_MIN_SCORE', 4.0))
+    KNOWLEDGE_MIN_COVERAGE = float(os.environ.get('KNOWLEDGE_MIN_COVERAGE', 0.6))
+
+    # Prompt size settings
+    PROMPT_TOKEN_BUDGET = int(os.environ.get('PROMPT_TOKEN_BUDGET', 8000))
+    TOKENIZER = os.environ.get('TOKENIZER', 'heuristic')  # 'heuristic' or 'gemini'
+
+    # Retrieved context assembly settings
+    CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', 1200))
+    CONTEXT_KNOWLEDGE_CANDIDATES = int(os.environ.get('CONTEXT_KNOWLEDGE_CANDIDATES', 6))
+    CONTEXT_DEDUP_THRESHOLD = float(os.environ.get('CONTEXT_DEDUP_THRESHOLD', 0.6))
+    CONTEXT_MIN_PASSAGE_TOKENS = int(os.environ.get('CONTEXT_MIN_PASSAGE_TOKENS', 40))
+
+    # WhatsApp background queue settings
+    WHATSAPP_QUEUE_ENABLED = os.environ.get('WHATSAPP_QUEUE_ENABLED', 'true').lower() == 'true'
+    WHATSAPP_QUEUE_PATH = os.environ.get('WHATSAPP_QUEUE_PATH', '/tmp/instance/whatsapp_queue.sqlite3')
+    WHATSAPP_QUEUE_WORKERS = int(os.environ.get('WHATSAPP_QUEUE_WORKERS', 4))
+    WHATSAPP_QUEUE_MAX_ATTEMPTS = int(os.environ.get('WHATSAPP_QUEUE_MAX_ATTEMPTS', 5))
+    WHATSAPP_QUEUE_BACKOFF_SECONDS = float(os.environ.get('WHATSAPP_QUEUE_BACKOFF_SECONDS', 2.0))
+
+    # WhatsApp message deduplication settings
+    WHATSAPP_DEDUP_WINDOW_SIZE = int(os.environ.get('WHATSAPP_DEDUP_WINDOW_SIZE', 10000))
+    WHATSAPP_DEDUP_TTL_SECONDS = float(os.environ.get('WHATSAPP_DEDUP_TTL_SECONDS', 7 * 24 * 3600))
+    WHATSAPP_DEDUP_CLEANUP_INTERVAL_SECONDS = float(os.environ.get('WHATSAPP_DEDUP_CLEANUP_INTERVAL_SECONDS', 3600))
+
+    # Answer cache settings
+    ANSWER_CACHE_SIZE = int(os.environ.get('ANSWER_CACHE_SIZE', 1000))
+    ANSWER_CACHE_TTL_SECONDS = float(os.environ.get('ANSWER_CACHE_TTL_SECONDS', 24 * 3600))
+    ANSWER_CACHE_SEMANTIC = os.environ.get('ANSWER_CACHE_SEMANTIC', 'false').lower() == 'true'
+    ANSWER_CACHE_SIMILARITY_THRESHOLD = float(os.environ.get('ANSWER_CACHE_SIMILARITY_THRESHOLD', 0.85))
+
+    # WhatsApp Cloud API client settings
+    WHATSAPP_GRAPH_API_URL = os.environ.get('WHATSAPP_GRAPH_API_URL', 'https://graph.facebook.com/v18.0')
+    WHATSAPP_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('WHATSAPP_CONNECT_TIMEOUT_SECONDS', 3.05))
+    WHATSAPP_READ_TIMEOUT_SECONDS = float(os.environ.get('WHATSAPP_READ_TIMEOUT_SECONDS', 15))
+    WHATSAPP_SEND_MAX_RETRIES = int(os.environ.get('WHATSAPP_SEND_MAX_RETRIES', 3))
+    WHATSAPP_SEND_BACKOFF_SECONDS = float(os.environ.get('WHATSAPP_SEND_BACKOFF_SECONDS', 0.5))
+    WHATSAPP_RATE_PER_NUMBER = float(os.environ.get('WHATSAPP_RATE_PER_NUMBER', 1.0))
+    WHATSAPP_BURST_PER_NUMBER = int(os.environ.get('WHATSAPP_BURST_PER_NUMBER', 5))
+    
+    # WhatsApp answer chunking (the Cloud API caps text bodies at 4096 characters)
+    WHATSAPP_MAX_CHUNK_CHARS = int(os.environ.get('WHATSAPP_MAX_CHUNK_CHARS', 1600))
+    WHATSAPP_FIRST_CHUNK_MIN_CHARS = int(os.environ.get('WHATSAPP_FIRST_CHUNK_MIN_CHARS', 200))
+    WHATSAPP_STREAM_RESPONSES = os.environ.get('WHATSAPP_STREAM_RESPONSES', 'true').lower() == 'true'
@@ -1,3 +1,4 @@
+import logging
 import os
 from dotenv import load_dotenv
 load_dotenv()
@@ -8,10 +9,18 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory
 from flask_cors import CORS
-from src.models.conversation import db
+from src.utils import logging_setup
+
+# Configure logging before the routes import and create their module state
+logging_setup.setup_logging()
+
+from src.models.conversation import db, create_missing_indexes, backfill_session_summaries
 from src.routes.chat import chat_bp
 from src.routes.knowledge import knowledge_bp
-from src.routes.whatsapp import whatsapp_bp
+from src.routes.whatsapp import whatsapp_bp, whatsapp_job_queue
+from src.config import Config
+from src.utils.conversation_writer import conversation_writer
+from src.utils.knowledge_base import knowledge_base
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
@@ -22,6 +31,9 @@ app.instance_path = '/tmp/instance' # Added this line
 # Enable CORS for all routes
 CORS(app)
 
+# Tag every request and its log lines with a correlation id
+logging_setup.init_app(app)
+
 app.register_blueprint(chat_bp, url_prefix='/api')
 app.register_blueprint(knowledge_bp, url_prefix='/api')
 app.register_blueprint(whatsapp_bp, url_prefix='/api/whatsapp')
@@ -32,6 +44,29 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 with app.app_context():
     db.create_all()
+    create_missing_indexes()
+    backfill_session_summaries()
+
+# Serve the first knowledge request without parsing the period files
+if Config.KNOWLEDGE_PRELOAD:
+    knowledge_base.preload()
+
+def start_background_workers(app):
+    """Start the threads that write conversations and drain the WhatsApp queue for app"""
+    # The SQL session backend reads histories from the Conversation rows, so it
+    # needs them written before the next turn
+    if Config.CONVERSATION_WRITE_BEHIND and Config.SESSION_BACKEND == 'sql':
+        # Named explicitly: __name__ is '__main__' when this file is run as a script
+        logging.getLogger('src.main').info("Conversation write-behind disabled: SESSION_BACKEND=sql reads the rows back")
+    elif Config.CONVERSATION_WRITE_BEHIND:
+        conversation_writer.init_app(app)
+    
+    if whatsapp_job_queue is not None:
+        whatsapp_job_queue.init_app(app)
+
+# Serving processes import this module, so the workers start here unless a script turned them off
+if Config.BACKGROUND_WORKERS_ENABLED:
+    start_background_workers(app)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -1,10 +1,20 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-import json
+from bisect import bisect_left
+import logging
+from src.utils.tokenizer import get_tokenizer
+
+logger = logging.getLogger(__name__)
 
 db = SQLAlchemy()
 
 class Conversation(db.Model):
+    # Serves keyset-paginated history reads in timestamp order. AUTOINCREMENT stops SQLite
+    # from handing out the id of a deleted newest row again, which archived rows keep.
+    __table_args__ = (
+        db.Index('ix_conversation_session_timestamp', 'session_id', 'timestamp', 'id'),
+        {'sqlite_autoincrement': True}
+    )
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(100), nullable=False, index=True)
     user_message = db.Column(db.Text, nullable=False)
@@ -26,38 +36,232 @@ class Conversation(db.Model):
             'timestamp': self.timestamp.isoformat()
         }
 
+class ConversationArchive(db.Model):
+    """A compressed archive file of old Conversation rows"""
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(512), nullable=False, unique=True)
+    month = db.Column(db.String(7), nullable=False, index=True)  # 'YYYY-MM' of the archived rows
+    row_count = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ArchivedConversation(db.Model):
+    """Slim index entry for an archived Conversation row, pointing at its session's block in the archive"""
+    __table_args__ = (db.Index('ix_archived_conversation_session_timestamp', 'session_id', 'timestamp', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)  # Id the row had in the conversation table
+    session_id = db.Column(db.String(100), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    archive_id = db.Column(db.Integer, db.ForeignKey('conversation_archive.id'), nullable=False)
+    block_offset = db.Column(db.BigInteger, nullable=False)
+    block_length = db.Column(db.Integer, nullable=False)
+
+class SessionSummary(db.Model):
+    """One row per chat session, maintained as Conversation rows are inserted"""
+    __tablename__ = 'sessions'
+    __table_args__ = (
+        db.Index('ix_sessions_recency', 'last_timestamp', 'id'),
+        db.Index('ix_sessions_platform_recency', 'platform', 'last_timestamp', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(100), nullable=False, unique=True)
+    platform = db.Column(db.String(20), default='web')
+    language = db.Column(db.String(10), default='en')  # Language of the latest exchange
+    first_timestamp = db.Column(db.DateTime, nullable=False)
+    last_timestamp = db.Column(db.DateTime, nullable=False)
+    message_count = db.Column(db.Integer, nullable=False, default=0)  # Exchanges, i.e. Conversation rows
+    
+    def to_dict(self):
+        return {
+            'session_id': self.session_id,
+            'platform': self.platform,
+            'language': self.language,
+            'first_timestamp': self.first_timestamp.isoformat(),
+            'last_timestamp': self.last_timestamp.isoformat(),
+            'message_count': self.message_count
+        }
+
+def _summary_insert(dialect_name):
+    """Dialect insert construct that supports ON CONFLICT, if the database has one"""
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+def record_session_activity(connection, rows):
+    """
+    Fold newly inserted exchanges into the sessions table, one statement per session.
+    
+    Args:
+        connection: Connection of the transaction that inserted the rows
+        rows (list): Dicts with session_id, platform, language and timestamp
+    """
+    sessions = {}
+    for row in sorted(rows, key=lambda r: r['timestamp']):
+        summary = sessions.setdefault(row['session_id'], {
+            'session_id': row['session_id'],
+            'platform': row.get('platform') or 'web',
+            'first_timestamp': row['timestamp'],
+            'message_count': 0
+        })
+        summary['language'] = row.get('language') or 'en'
+        summary['last_timestamp'] = row['timestamp']
+        summary['message_count'] += 1
+    
+    table = SessionSummary.__table__
+    insert = _summary_insert(connection.dialect.name)
+    for summary in sessions.values():
+        changes = {
+            'language': summary['language'],
+            'last_timestamp': db.case((table.c.last_timestamp > summary['last_timestamp'], table.c.last_timestamp),
+                                      else_=summary['last_timestamp']),
+            'message_count': table.c.message_count + summary['message_count']
+        }
+        if insert is not None:
+            connection.execute(insert(table).values(**summary).on_conflict_do_update(
+                index_elements=['session_id'], set_=changes))
+            continue
+        
+        updated = connection.execute(table.update().where(table.c.session_id == summary['session_id']).values(**changes))
+        if updated.rowcount == 0:
+            connection.execute(table.insert().values(**summary))
+
+@db.event.listens_for(db.session, 'after_flush')
+def _update_session_summaries(session, flush_context):
+    rows = [{
+        'session_id': obj.session_id,
+        'platform': obj.platform,
+        'language': obj.language,
+        'timestamp': obj.timestamp
+    } for obj in session.new if isinstance(obj, Conversation)]
+    if rows:
+        record_session_activity(session.connection(), rows)
+
+def backfill_session_summaries():
+    """Build the sessions table from existing Conversation rows if it is empty. Must run inside an app context."""
+    if db.session.query(SessionSummary.id).first() is not None:
+        return
+    if db.session.query(Conversation.id).first() is None:
+        return
+    
+    aggregates = db.session.query(
+        Conversation.session_id,
+        db.func.min(Conversation.platform),
+        db.func.min(Conversation.timestamp),
+        db.func.max(Conversation.timestamp),
+        db.func.count(Conversation.id),
+        db.func.max(Conversation.id)
+    ).group_by(Conversation.session_id).all()
+    latest = db.session.query(db.func.max(Conversation.id).label('id')).group_by(Conversation.session_id).subquery()
+    languages = dict(db.session.query(Conversation.id, Conversation.language).join(latest, Conversation.id == latest.c.id).all())
+    db.session.execute(SessionSummary.__table__.insert(), [{
+        'session_id': session_id,
+        'platform': platform or 'web',
+        'language': languages.get(latest_id) or 'en',
+        'first_timestamp': first_timestamp,
+        'last_timestamp': last_timestamp,
+        'message_count': count
+    } for session_id, platform, first_timestamp, last_timestamp, count, latest_id in aggregates])
+    db.session.commit()
+    logger.info("Backfilled %s session summaries", len(aggregates))
+
+def create_missing_indexes():
+    """Create indexes added to existing tables, which db.create_all() skips. Must run inside an app context."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+class ProcessedMessage(db.Model):
+    """WhatsApp message ids that have already been accepted, used to drop redeliveries"""
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.String(128), nullable=False, unique=True)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class OutboundDelivery(db.Model):
+    """An answer to one incoming WhatsApp message, sent as one or more chunks"""
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.String(128), nullable=False, unique=True)  # Incoming message being answered
+    phone_number = db.Column(db.String(20), nullable=False)
+    complete = db.Column(db.Boolean, default=False)  # Every chunk of the answer has been generated
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    chunks = db.relationship('OutboundChunk', backref='delivery', order_by='OutboundChunk.seq', lazy=True)
+
+class OutboundChunk(db.Model):
+    """One WhatsApp message of an outbound delivery and whether it has been sent"""
+    __table_args__ = (db.UniqueConstraint('delivery_id', 'seq'),)
+    id = db.Column(db.Integer, primary_key=True)
+    delivery_id = db.Column(db.Integer, db.ForeignKey('outbound_delivery.id'), nullable=False, index=True)
+    seq = db.Column(db.Integer, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    wamid = db.Column(db.String(128), nullable=True)  # Id the Cloud API assigned to the sent message
+    sent_at = db.Column(db.DateTime, nullable=True)
+
 class ConversationHistory:
-    def __init__(self):
+    # Tokens charged per message for its "Role: " prefix and line break in the prompt
+    MESSAGE_OVERHEAD_TOKENS = 2
+    
+    def __init__(self, max_length=None, messages=None, tokenizer=None):
+        self.max_length = max_length
+        self.tokenizer = tokenizer or get_tokenizer()
         self.history = []
+        # before[i] is the running token total of every message ever added before history[i]
+        self._before = []
+        self._total_tokens = 0
+        for message in messages or []:
+            self._append(message)
+        # Messages added since the history was loaded, not yet saved to the session backend
+        self.unsaved = []
+    
+    def _append(self, message):
+        # Token counts are cached on the message so backends that keep it never recount
+        if 'tokens' not in message:
+            message['tokens'] = self.tokenizer.count(message['content']) + self.MESSAGE_OVERHEAD_TOKENS
+        self.history.append(message)
+        self._before.append(self._total_tokens)
+        self._total_tokens += message['tokens']
+        
+        # Keep only the most recent messages
+        if self.max_length and len(self.history) > self.max_length:
+            excess = len(self.history) - self.max_length
+            del self.history[:excess]
+            del self._before[:excess]
     
     def add_message(self, role, content):
-        self.history.append({
+        message = {
             'role': role,
             'content': content
-        })
+        }
+        self._append(message)
+        self.unsaved.append(message)
     
     def get_history(self):
         return self.history
     
     def clear_history(self):
         self.history = []
+        self._before = []
+        self._total_tokens = 0
     
-    def get_context_for_ai(self, max_tokens=4000):
-        """Get conversation history formatted for AI, with token management"""
-        if not self.history:
-            return []
+    def get_context_for_ai(self, max_tokens=4000, exclude_latest=0):
+        """
+        Get the longest run of most recent messages that fits in max_tokens.
         
-        # Simple token estimation 
-        total_tokens = 0
-        context = []
+        The window is found by binary search over the running token totals, so
+        choosing it is O(log n).
         
-        # Start from the most recent messages and work backwards
-        for message in reversed(self.history):
-            estimated_tokens = len(message['content']) // 4  # Rough estimation
-            if total_tokens + estimated_tokens > max_tokens:
-                break
-            context.insert(0, message)
-            total_tokens += estimated_tokens
+        Args:
+            max_tokens (int): Token budget for the returned messages
+            exclude_latest (int): Number of most recent messages to leave out
+            
+        Returns:
+            list: Messages, oldest first
+        """
+        end = len(self.history) - exclude_latest
+        if end <= 0 or max_tokens <= 0:
+            return []
         
-        return context
-
+        # Tokens used by history[i:end] are end_total - before[i]
+        end_total = self._before[end - 1] + self.history[end - 1]['tokens']
+        start = bisect_left(self._before, end_total - max_tokens, 0, end)
+        return self.history[start:end]
@@ -1,140 +1,316 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import google.generativeai as genai
 import os
 import uuid
 from datetime import datetime
-from src.models.conversation import db, Conversation, ConversationHistory
+from src.config import Config
+from src.models.conversation import db
 from src.utils.wikipedia_search import wikipedia_searcher
+from src.utils.knowledge_index import get_knowledge_index
+from src.utils.session_store import SessionStore
+from src.utils.context_assembler import context_assembler
+from src.utils.context_window import ContextWindowBuilder
+from src.utils.gemini_client import GeminiModelManager
+from src.utils.answer_cache import AnswerCache
+from src.utils.blocking_executor import blocking_executor
+from src.utils.conversation_writer import conversation_writer
+from src.utils.history_pages import read_history_page, read_sessions_page
+from src.utils.logging_setup import in_current_context
+from src.utils.query_analysis import query_analyzer
+import asyncio
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 chat_bp = Blueprint("chat", __name__)
 
 # Configure Gemini API
-print(f" GEMINI_API_KEY from environment variables: {os.getenv("GEMINI_API_KEY")[:10] if os.getenv("GEMINI_API_KEY") else "Not found"}...")
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+logger.info("Gemini API key %s", "configured" if os.getenv("GEMINI_API_KEY") else "not found")
+if Config.GEMINI_API_ENDPOINT:
+    logger.info("Using Gemini API endpoint %s", Config.GEMINI_API_ENDPOINT)
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"), transport='rest',
+                    client_options={'api_endpoint': Config.GEMINI_API_ENDPOINT})
+else:
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+
+# Conversation histories, kept in the backend selected by Config.SESSION_BACKEND
+conversation_sessions = SessionStore()
+
+# Fits system prompt, retrieved context and history into the prompt token budget
+context_window_builder = ContextWindowBuilder()
+
+# Answers to first-turn questions, shared by web chat and WhatsApp
+answer_cache = AnswerCache()
 
-# Store conversation histories in memory (in production, use Redis or database)
-conversation_sessions = {}
+# The Chronicler persona, configured once on the model as its system instruction
+CHRONICLER_PROMPT = """You are "The Chronicler of the Nile," a sophisticated AI embodying the vast knowledge of Egyptian history spanning millennia. You are an authoritative, knowledgeable, and objective historical expert who can discuss any period of Egyptian history with depth and nuance.\n\nYour knowledge encompasses:\n- Ancient Egypt: Pharaohs, gods, monuments, daily life, dynasties\n- Graeco-Roman Egypt: Ptolemaic dynasty, Roman rule, early Christianity\n- Islamic Egypt: Arab conquest, Fatimid, Ayyubid, Mamluk periods\n- Ottoman Egypt: Ottoman rule, cultural developments\n- Modern Egypt: Muhammad Ali dynasty, British occupation, 1952 Revolution, Nasser, Sadat, Mubarak, and significant events\n\nGuidelines for your responses:\n1. Maintain an authoritative yet accessible tone - knowledgeable but not overly archaic\n2. Provide factual accuracy and balanced perspectives where historical debate exists\n3. Offer explanations of causes, effects, social impacts, and cultural significance\n4. Draw connections across different periods when relevant\n5. Use the conversation history to provide contextual understanding\n6. If uncertain about specific details, acknowledge limitations gracefully\n7. Avoid speculation about future events or current political opinions\n8. Structure responses clearly with paragraphs, bullet points, or headings as appropriate\n\nRespond in the same language as the user's query. If the user asks in Arabic, respond in Arabic. If in English, respond in English. Maintain this language consistency throughout the conversation unless explicitly asked to switch."""
 
 def get_chronicler_prompt():
     """Get the base prompt for the Chronicler of the Nile"""
-    return """You are "The Chronicler of the Nile," a sophisticated AI embodying the vast knowledge of Egyptian history spanning millennia. You are an authoritative, knowledgeable, and objective historical expert who can discuss any period of Egyptian history with depth and nuance.\n\nYour knowledge encompasses:\n- Ancient Egypt: Pharaohs, gods, monuments, daily life, dynasties\n- Graeco-Roman Egypt: Ptolemaic dynasty, Roman rule, early Christianity\n- Islamic Egypt: Arab conquest, Fatimid, Ayyubid, Mamluk periods\n- Ottoman Egypt: Ottoman rule, cultural developments\n- Modern Egypt: Muhammad Ali dynasty, British occupation, 1952 Revolution, Nasser, Sadat, Mubarak, and significant events\n\nGuidelines for your responses:\n1. Maintain an authoritative yet accessible tone - knowledgeable but not overly archaic\n2. Provide factual accuracy and balanced perspectives where historical debate exists\n3. Offer explanations of causes, effects, social impacts, and cultural significance\n4. Draw connections across different periods when relevant\n5. Use the conversation history to provide contextual understanding\n6. If uncertain about specific details, acknowledge limitations gracefully\n7. Avoid speculation about future events or current political opinions\n8. Structure responses clearly with paragraphs, bullet points, or headings as appropriate\n\nRespond in the same language as the user's query. If the user asks in Arabic, respond in Arabic. If in English, respond in English. Maintain this language consistency throughout the conversation unless explicitly asked to switch."""
+    return CHRONICLER_PROMPT
+
+# One configured Gemini model per worker, carrying the persona as system instruction
+chronicler_model = GeminiModelManager(system_instruction=CHRONICLER_PROMPT)
+
+def build_chronicler_prompt(user_message, conversation, language):
+    """
+    Build the full Gemini prompt with knowledge base, Wikipedia and conversation context.
+
+    Args:
+        user_message (str): User's message
+        conversation (ConversationHistory): Conversation history
+        language (str): Detected language
+
+    Returns:
+        str: Full prompt
+    """
+    # Ground the answer in the local knowledge base first
+    knowledge_passages, local_recall_strong = _retrieve_knowledge(user_message)
+    
+    # Get Wikipedia contextual information only when local recall is weak
+    if local_recall_strong:
+        logger.debug("Local knowledge base context is sufficient, skipping Wikipedia")
+        wikipedia_passages = []
+    else:
+        logger.debug("Searching Wikipedia for additional context")
+        wikipedia_passages = wikipedia_searcher.get_contextual_passages(user_message, language)
+    
+    return _assemble_prompt(user_message, conversation, knowledge_passages, wikipedia_passages)
+
+async def build_chronicler_prompt_async(user_message, conversation, language):
+    """Async variant of build_chronicler_prompt; Wikipedia is queried without holding a thread"""
+    # The knowledge base may reload its files and rebuild the index, so this runs off the event loop
+    knowledge_passages, local_recall_strong = await asyncio.to_thread(_retrieve_knowledge, user_message)
+    
+    if local_recall_strong:
+        logger.debug("Local knowledge base context is sufficient, skipping Wikipedia")
+        wikipedia_passages = []
+    else:
+        logger.debug("Searching Wikipedia for additional context")
+        wikipedia_passages = await wikipedia_searcher.get_contextual_passages_async(user_message, language)
+    
+    return _assemble_prompt(user_message, conversation, knowledge_passages, wikipedia_passages)
 
-def detect_language(text):
-    """Simple language detection - can be enhanced with proper language detection library"""
-    # Check for Arabic characters
-    arabic_chars = sum(1 for char in text if '\u0600' <= char <= '\u06FF')
-    if arabic_chars > len(text) * 0.3:  # If more than 30% Arabic characters
-        return 'ar'
-    return 'en'
+def _retrieve_knowledge(user_message):
+    """Candidate knowledge base passages and whether local recall is strong"""
+    return get_knowledge_index().retrieve(user_message, k=Config.CONTEXT_KNOWLEDGE_CANDIDATES)
+
+def _assemble_prompt(user_message, conversation, knowledge_passages, wikipedia_passages):
+    """Pack the retrieved passages and the history into the prompt"""
+    # Keep the most relevant, distinct passages within the context token budget
+    retrieved_context, context_stats = context_assembler.assemble(
+        user_message,
+        [(passage['title'], passage['text']) for _, passage in knowledge_passages],
+        wikipedia_passages
+    )
+    
+    # The persona travels as the model's system instruction; only its tokens are reserved here
+    full_prompt, token_stats = context_window_builder.build(
+        CHRONICLER_PROMPT, retrieved_context, conversation, user_message, inline_system_prompt=False
+    )
+    
+    logger.debug("Prompt built", extra={
+        "prompt_chars": len(full_prompt),
+        "prompt_tokens": token_stats['prompt_tokens'],
+        "history_messages": token_stats['history_messages'],
+        "knowledge_candidates": len(knowledge_passages),
+        "wikipedia_candidates": len(wikipedia_passages)
+    })
+    logger.info("Context assembled", extra=context_stats)
+    return full_prompt
+
+def _is_context_free(user_message, conversation):
+    """Whether the question is the first turn, so its answer does not depend on history"""
+    history = conversation.history
+    return not history or (len(history) == 1 and history[0]['content'] == user_message)
 
 def get_chronicler_response(user_message, conversation, language):
     """
     Generate a response from the Chronicler using Gemini AI with Wikipedia enhancement.\n    \n    Args:\n        user_message (str): User's message\n        conversation (ConversationHistory): Conversation history\n        language (str): Detected language\n        \n    Returns:\n        str: AI response\n    """
-    print(f" Generating Chronicler response for: {user_message[:50]}...")
+    logger.debug("Generating Chronicler response for: %.50s", user_message)
     
-    # Get Wikipedia contextual information
-    print(" Searching Wikipedia for additional context...")
-    wikipedia_context = wikipedia_searcher.get_contextual_information(user_message, language)
+    # Context-free questions can be answered from the answer cache
+    cacheable = _is_context_free(user_message, conversation)
+    if cacheable:
+        cached_response = answer_cache.get(user_message, language)
+        if cached_response is not None:
+            logger.info("Answer served from cache")
+            return cached_response
     
-    # Prepare context for AI
-    context = conversation.get_context_for_ai()
+    full_prompt = build_chronicler_prompt(user_message, conversation, language)
     
-    # Create the model
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    # Generate response
+    response = chronicler_model.generate(full_prompt)
     
-    # Prepare the full prompt with context and Wikipedia information
-    full_prompt = get_chronicler_prompt()
+    ai_response = response.text
+    logger.info("AI response generated", extra={"response_chars": len(ai_response)})
     
-    # Add Wikipedia context if available
-    if wikipedia_context:
-        full_prompt += f"\n\n{wikipedia_context}"
-        print(" Wikipedia context added to prompt")
+    if cacheable:
+        answer_cache.set(user_message, language, ai_response)
     
-    if context:
-        full_prompt += "\n\nConversation History:\n"
-        for msg in context:
-            role = "User" if msg['role'] == 'user' else "Chronicler"
-            full_prompt += f"{role}: {msg['content']}\n"
+    return ai_response
+
+def stream_chronicler_response(user_message, conversation, language):
+    """
+    Generate a response from the Chronicler, yielding text chunks as Gemini produces them.
+
+    Args:
+        user_message (str): User's message
+        conversation (ConversationHistory): Conversation history
+        language (str): Detected language
+
+    Yields:
+        str: Chunks of the AI response
+    """
+    logger.debug("Streaming Chronicler response for: %.50s", user_message)
     
-    full_prompt += f"\nUser: {user_message}\nChronicler:"
+    # Context-free questions can be answered from the answer cache
+    cacheable = _is_context_free(user_message, conversation)
+    if cacheable:
+        cached_response = answer_cache.get(user_message, language)
+        if cached_response is not None:
+            logger.info("Answer served from cache")
+            yield cached_response
+            return
     
-    print(f" Full prompt length: {len(full_prompt)} characters")
+    full_prompt = build_chronicler_prompt(user_message, conversation, language)
     
-    # Generate response
-    print(" Generating AI response...")
-    response = model.generate_content(
-        full_prompt,
-        generation_config=genai.types.GenerationConfig(
-            temperature=0.7,
-            top_p=0.8,
-            top_k=40,
-            max_output_tokens=1024,
-        )
-    )
+    chunks = []
+    for chunk in chronicler_model.generate(full_prompt, stream=True):
+        text = chunk.text
+        if text:
+            chunks.append(text)
+            yield text
+    
+    if cacheable:
+        answer_cache.set(user_message, language, ''.join(chunks))
+
+async def get_chronicler_response_async(user_message, conversation, language):
+    """Async variant of get_chronicler_response using the async Gemini client"""
+    cacheable = _is_context_free(user_message, conversation)
+    if cacheable:
+        cached_response = answer_cache.get(user_message, language)
+        if cached_response is not None:
+            logger.info("Answer served from cache")
+            return cached_response
+    
+    full_prompt = await build_chronicler_prompt_async(user_message, conversation, language)
+    response = await chronicler_model.generate_async(full_prompt)
     
     ai_response = response.text
-    print(f" AI response generated: {len(ai_response)} characters")
+    logger.info("AI response generated", extra={"response_chars": len(ai_response)})
+    
+    if cacheable:
+        answer_cache.set(user_message, language, ai_response)
     
     return ai_response
 
+async def stream_chronicler_response_async(user_message, conversation, language):
+    """Async variant of stream_chronicler_response, yielding text chunks as Gemini produces them"""
+    cacheable = _is_context_free(user_message, conversation)
+    if cacheable:
+        cached_response = answer_cache.get(user_message, language)
+        if cached_response is not None:
+            logger.info("Answer served from cache")
+            yield cached_response
+            return
+    
+    full_prompt = await build_chronicler_prompt_async(user_message, conversation, language)
+    
+    chunks = []
+    async for chunk in await chronicler_model.generate_async(full_prompt, stream=True):
+        text = chunk.text
+        if text:
+            chunks.append(text)
+            yield text
+    
+    if cacheable:
+        answer_cache.set(user_message, language, ''.join(chunks))
+
+def _sse_event(event, payload):
+    """Format a server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def _stream_chat(user_message, session_id, language, conversation):
+    """Stream a chat answer as server-sent events, then persist the exchange"""
+    def generate():
+        chunks = []
+        try:
+            for text in stream_chronicler_response(user_message, conversation, language):
+                chunks.append(text)
+                yield _sse_event('chunk', {'text': text})
+            
+            ai_response = ''.join(chunks)
+            logger.info("AI response streamed", extra={"response_chars": len(ai_response)})
+            
+            # Add AI response to history and save to database once the stream finishes
+            conversation.add_message('assistant', ai_response)
+            conversation_sessions.save(session_id, conversation)
+            conversation_writer.submit(
+                session_id=session_id,
+                user_message=user_message,
+                ai_response=ai_response,
+                language=language
+            )
+            
+            yield _sse_event('done', {
+                'session_id': session_id,
+                'language': language,
+                'timestamp': datetime.utcnow().isoformat()
+            })
+        except Exception as e:
+            logger.exception("Error occurred while streaming chat")
+            db.session.rollback()
+            yield _sse_event('error', {'error': str(e)})
+    
+    response = Response(stream_with_context(in_current_context(generate())), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @chat_bp.route('/chat', methods=['POST'])
 def chat():
-    print("=== Starting chat request processing ===")
     try:
-        print("1. Receiving data...")
         data = request.get_json()
-        print(f"Received data: {data}")
+        logger.debug("Received chat request", extra={"payload": data})
         
         user_message = data.get('message', '')
         session_id = data.get('session_id', str(uuid.uuid4()))
         
-        print(f"2. User message: {user_message}")
-        print(f"3. Session ID: {session_id}")
-        
         if not user_message:
-            print("Error: Empty message")
+            logger.info("Rejected chat request with an empty message")
             return jsonify({'error': 'Message is required'}), 400
         
         # Detect language
-        language = detect_language(user_message)
-        print(f"4. Detected language: {language}")
+        language = query_analyzer.analyze(user_message).language
         
         # Get or create conversation history for this session
-        if session_id not in conversation_sessions:
-            conversation_sessions[session_id] = ConversationHistory()
-            print(f"5. New conversation session created for {session_id}")
-        else:
-            print(f"5. Existing conversation session found for {session_id}")
-        
-        conversation = conversation_sessions[session_id]
+        conversation = conversation_sessions.get(session_id)
+        logger.info("Chat request", extra={"session_id": session_id, "language": language, "history_messages": len(conversation.history)})
         
         # Add user message to history
         conversation.add_message('user', user_message)
-        print("6. Added user message to history")
+        
+        # Stream the answer as server-sent events when the client asks for it
+        if request.accept_mimetypes.best == 'text/event-stream':
+            return _stream_chat(user_message, session_id, language, conversation)
         
         # Generate AI response with Wikipedia enhancement
-        print("7. Generating AI response with Wikipedia context...")
         ai_response = get_chronicler_response(user_message, conversation, language)
-        print(f"8. AI response: {ai_response[:100]}...")
         
         # Add AI response to history
         conversation.add_message('assistant', ai_response)
-        print("9. Added AI response to history")
+        conversation_sessions.save(session_id, conversation)
         
         # Save to database
-        print("10. Saving to database...")
-        conv_record = Conversation(
+        conversation_writer.submit(
             session_id=session_id,
             user_message=user_message,
             ai_response=ai_response,
             language=language
         )
-        db.session.add(conv_record)
-        db.session.commit()
-        print("11. Saved to database successfully")
         
-        print("=== Chat request completed successfully ===")
         return jsonify({
             'response': ai_response,
             'session_id': session_id,
@@ -143,54 +319,61 @@ def chat():
         })
         
     except Exception as e:
-        print(f" Error occurred in chat(): {str(e)}")
-        print(f" Error type: {type(e).__name__}")
-        import traceback
-        print(f" Traceback: {traceback.format_exc()}")
+        logger.exception("Error occurred in chat()")
         return jsonify({'error': str(e)}), 500
 
 @chat_bp.route('/history/<session_id>', methods=['GET'])
 def get_history(session_id):
-    print(f"=== Starting get_history request for session: {session_id} ===")
     try:
-        conversations = Conversation.query.filter_by(session_id=session_id).order_by(Conversation.timestamp).all()
-        history = []
+        limit = request.args.get('limit', Config.HISTORY_PAGE_SIZE, type=int)
+        limit = min(max(limit, 1), Config.HISTORY_MAX_PAGE_SIZE)
+        try:
+            page = read_history_page(session_id, before=request.args.get('before') or None,
+                                     after=request.args.get('after') or None, limit=limit)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        for conv in conversations:
-            history.append({
-                'user_message': conv.user_message,
-                'ai_response': conv.ai_response,
-                'timestamp': conv.timestamp.isoformat(),
-                'language': conv.language
-            })
-        print(f" Retrieved {len(history)} history records for session {session_id}")
+        logger.debug("Retrieved %d history records for session %s", len(page['history']), session_id)
         return jsonify({
             'session_id': session_id,
-            'history': history
+            'limit': limit,
+            **page
         })
         
     except Exception as e:
-        print(f" Error occurred in get_history(): {str(e)}")
-        print(f" Error type: {type(e).__name__}")
-        import traceback
-        print(f" Traceback: {traceback.format_exc()}")
+        logger.exception("Error occurred in get_history()")
         return jsonify({'error': str(e)}), 500
 
 @chat_bp.route('/sessions', methods=['GET'])
 def get_sessions():
-    print("=== Starting get_sessions request ===")
     try:
-        # Get unique session IDs from database
-        sessions = db.session.query(Conversation.session_id).distinct().all()
-        session_list = [session[0] for session in sessions]
-        print(f" Retrieved {len(session_list)} unique sessions")
+        limit = request.args.get('limit', Config.SESSIONS_PAGE_SIZE, type=int)
+        limit = min(max(limit, 1), Config.SESSIONS_MAX_PAGE_SIZE)
+        try:
+            page = read_sessions_page(cursor=request.args.get('cursor') or None,
+                                      platform=request.args.get('platform') or None, limit=limit)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        logger.debug("Retrieved %d sessions", len(page['sessions']))
         return jsonify({
-            'sessions': session_list
+            'limit': limit,
+            **page
         })
         
     except Exception as e:
-        print(f" Error occurred in get_sessions(): {str(e)}")
-        print(f" Error type: {type(e).__name__}")
-        import traceback
-        print(f" Traceback: {traceback.format_exc()}")
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        logger.exception("Error occurred in get_sessions()")
+        return jsonify({'error': str(e)}), 500
+
+@chat_bp.route('/stats', methods=['GET'])
+def get_stats():
+    """Get cache and session statistics for the chat pipeline"""
+    return jsonify({
+        'answer_cache': answer_cache.stats(),
+        'wikipedia_cache': wikipedia_searcher.cache.stats(),
+        'wikipedia_api': wikipedia_searcher.client.stats(),
+        'sessions': conversation_sessions.stats(),
+        'conversation_writer': conversation_writer.stats(),
+        'context_assembler': context_assembler.stats(),
+        'blocking_executor': blocking_executor.stats()
+    })
@@ -1,43 +1,32 @@
-from flask import Blueprint, jsonify
-import json
-import os
+from flask import Blueprint, Response, jsonify, request
+from src.config import Config
+from src.utils.knowledge_base import knowledge_base
+from src.utils.knowledge_query import knowledge_query, paginate, parse_year
 
 knowledge_bp = Blueprint('knowledge', __name__)
 
-def load_knowledge_base():
-    """Load historical knowledge from JSON files"""
-    knowledge_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'knowledge_base')
-    knowledge = {}
-    
-    knowledge_files = [
-        'ancient_egypt.json',
-        'graeco_roman.json', 
-        'islamic_ottoman.json',
-        'modern_egypt.json'
-    ]
-    
-    for filename in knowledge_files:
-        filepath = os.path.join(knowledge_dir, filename)
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    period_name = filename.replace('.json', '')
-                    knowledge[period_name] = json.load(f)
-            except Exception as e:
-                print(f"Error loading {filename}: {e}")
-                knowledge[period_name] = {}
-        else:
-            period_name = filename.replace('.json', '')
-            knowledge[period_name] = {}
-    
-    return knowledge
+def _json_response(body, etag):
+    """Serve a pre-serialized JSON body, answering 304 when the client's copy is current"""
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def _page_args():
+    """Read offset and limit query parameters, capping limit at Config.KNOWLEDGE_MAX_PAGE_SIZE"""
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = request.args.get('limit', Config.KNOWLEDGE_PAGE_SIZE, type=int)
+    return offset, min(max(limit, 1), Config.KNOWLEDGE_MAX_PAGE_SIZE)
+
+def _year_args():
+    """Read the from/to year range; years BCE are negative or suffixed, e.g. 300BCE"""
+    return parse_year(request.args.get('from')), parse_year(request.args.get('to'))
 
 @knowledge_bp.route('/knowledge', methods=['GET'])
 def get_all_knowledge():
     """Get all historical knowledge"""
     try:
-        knowledge = load_knowledge_base()
-        return jsonify(knowledge)
+        return _json_response(*knowledge_base.all_response())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -45,15 +34,25 @@ def get_all_knowledge():
 def get_period_knowledge(period):
     """Get knowledge for a specific historical period"""
     try:
-        knowledge = load_knowledge_base()
+        if not knowledge_base.has_period(period):
+            return jsonify({'error': f'Period {period} not found'}), 404
+        
+        field = request.args.get('field')
+        if not field:
+            return _json_response(*knowledge_base.period_response(period))
         
-        if period in knowledge:
-            return jsonify({
-                'period': period,
-                'data': knowledge[period]
-            })
+        # Select one field (dotted path or JSON pointer), paginating lists
+        try:
+            value = knowledge_query.select(period, field)
+        except KeyError:
+            return jsonify({'error': f'Field {field} not found in {period}'}), 404
+        
+        result = {'period': period, 'field': field}
+        if isinstance(value, list):
+            result.update(paginate(value, *_page_args()))
         else:
-            return jsonify({'error': f'Period {period} not found'}), 404
+            result['data'] = value
+        return jsonify(result)
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -62,14 +61,40 @@ def get_period_knowledge(period):
 def get_periods():
     """Get list of available historical periods"""
     try:
-        knowledge = load_knowledge_base()
-        periods = list(knowledge.keys())
+        return _json_response(knowledge_base.periods_body, knowledge_base.periods_etag)
         
-        return jsonify({
-            'periods': periods,
-            'count': len(periods)
-        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@knowledge_bp.route('/knowledge/rulers', methods=['GET'])
+def get_rulers():
+    """Find rulers by name and/or reign year range"""
+    try:
+        period = request.args.get('period')
+        if period and not knowledge_base.has_period(period):
+            return jsonify({'error': f'Period {period} not found'}), 404
+        start, end = _year_args()
+        
+        rulers = knowledge_query.rulers(request.args.get('name'), start, end, period)
+        return jsonify(paginate(rulers, *_page_args()))
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@knowledge_bp.route('/knowledge/timeline', methods=['GET'])
+def get_timeline():
+    """Get dated eras, reigns and events overlapping a year range"""
+    try:
+        period = request.args.get('period')
+        if period and not knowledge_base.has_period(period):
+            return jsonify({'error': f'Period {period} not found'}), 404
+        start, end = _year_args()
+        
+        return jsonify(paginate(knowledge_query.timeline(start, end, period), *_page_args()))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,12 +1,22 @@
 from flask import Blueprint, request, jsonify
 import os
-import requests
-import hmac
-import hashlib
-from datetime import datetime
-from src.models.conversation import db, Conversation, ConversationHistory
-from src.routes.chat import get_chronicler_response, detect_language
+from src.models.conversation import db
+from src.routes.chat import (get_chronicler_response, stream_chronicler_response,
+                             get_chronicler_response_async, stream_chronicler_response_async)
+from src.config import Config
+from src.utils.blocking_executor import blocking_executor
+from src.utils.conversation_writer import conversation_writer
+from src.utils.job_queue import JobQueue
+from src.utils.message_dedup import MessageDeduplicator
+from src.utils.query_analysis import query_analyzer
+from src.utils.session_store import SessionStore
+from src.utils.whatsapp_client import WhatsAppClient
+from src.utils.whatsapp_delivery import DeliveryError, StreamingChunker, WhatsAppDelivery, split_message
+import asyncio
 import uuid
+import logging
+
+logger = logging.getLogger(__name__)
 
 whatsapp_bp = Blueprint("whatsapp", __name__)
 
@@ -15,150 +25,195 @@ WHATSAPP_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
 WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")  
 WHATSAPP_VERIFY_TOKEN = os.getenv("WHATSAPP_VERIFY_TOKEN") 
 WHATSAPP_APP_SECRET = os.getenv("WHATSAPP_APP_SECRET")  
-# Store conversation histories for WhatsApp sessions
-whatsapp_conversations = {}
+
+# Pooled, retrying client for outbound Cloud API calls
+whatsapp_client = WhatsAppClient(WHATSAPP_TOKEN, WHATSAPP_PHONE_NUMBER_ID)
+# Sends answers as ordered chunks and remembers which chunks went out
+whatsapp_delivery = WhatsAppDelivery(whatsapp_client)
+# Conversation histories for WhatsApp sessions, kept in the backend selected by Config.SESSION_BACKEND
+whatsapp_conversations = SessionStore()
+
+# Remembers accepted WhatsApp message ids so redeliveries are dropped
+message_deduplicator = MessageDeduplicator()
 
 def verify_webhook_signature(payload, signature):
     """Verify the webhook signature from WhatsApp"""
     # For local testing without a domain, we will bypass signature verification.
     # In a production environment, this MUST be enabled and properly configured.
-    print(" Webhook signature verification bypassed for local testing.")
+    logger.debug("Webhook signature verification bypassed for local testing")
     return True
 
-def send_whatsapp_message(phone_number, message):
-    """Send a message via WhatsApp Cloud API"""
+def whatsapp_credentials_configured():
+    """Whether real WhatsApp Cloud API credentials are set"""
     if not WHATSAPP_TOKEN or not WHATSAPP_PHONE_NUMBER_ID or WHATSAPP_TOKEN == "YOUR_WHATSAPP_ACCESS_TOKEN" or WHATSAPP_PHONE_NUMBER_ID == "YOUR_WHATSAPP_PHONE_NUMBER_ID":
-        print(" WhatsApp credentials not configured or are default placeholders. Please set WHATSAPP_ACCESS_TOKEN and WHATSAPP_PHONE_NUMBER_ID.")
+        logger.warning("WhatsApp credentials not configured or are default placeholders. Please set WHATSAPP_ACCESS_TOKEN and WHATSAPP_PHONE_NUMBER_ID.")
+        return False
+    return True
+
+def send_whatsapp_message(phone_number, message):
+    """Send a message via WhatsApp Cloud API, split into chunks if it is too long"""
+    if not whatsapp_credentials_configured():
         return False
     
-    url = f"https://graph.facebook.com/v18.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
-    
-    headers = {
-        "Authorization": f"Bearer {WHATSAPP_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "messaging_product": "whatsapp",
-        "to": phone_number,
-        "type": "text",
-        "text": {
-            "body": message
-        }
-    }
+    for chunk in split_message(message):
+        if not whatsapp_client.send_text(phone_number, chunk):
+            logger.error("Failed to send WhatsApp message to %s", phone_number)
+            return False
     
-    try:
-        response = requests.post(url, json=data, headers=headers )
-        response.raise_for_status()
-        print(f" Message sent to {phone_number}")
-        return True
-    except requests.exceptions.RequestException as e:
-        print(f" Failed to send WhatsApp message: {e}")
-        return False
+    logger.info("Message sent to %s", phone_number)
+    return True
 
 @whatsapp_bp.route("/webhook", methods=["GET"])
 def verify_webhook():
     """Verify webhook endpoint for WhatsApp"""
-    print(" WhatsApp webhook verification request received")
     
     mode = request.args.get("hub.mode")
     token = request.args.get("hub.verify_token")
     challenge = request.args.get("hub.challenge")
     
-    print(f"Mode: {mode}, Token: {token}, Challenge: {challenge}")
+    logger.debug("Webhook verification request", extra={"mode": mode, "challenge": challenge})
     
     if mode == "subscribe" and token == WHATSAPP_VERIFY_TOKEN:
-        print(" Webhook verified successfully.")
+        logger.info("Webhook verified successfully")
         return challenge, 200
     else:
-        print(" Webhook verification failed. Invalid mode or token.")
+        logger.warning("Webhook verification failed. Invalid mode or token.")
         return "Verification failed", 403
 
 @whatsapp_bp.route("/webhook", methods=["POST"])
 def handle_webhook():
     """Handle incoming WhatsApp messages"""
-    print(" WhatsApp webhook message received")
     
     try:
         # Verify signature (bypassed for local testing)
         signature = request.headers.get("X-Hub-Signature-256")
         if signature and not verify_webhook_signature(request.data, signature):
-            print(" Invalid webhook signature")
+            logger.warning("Invalid webhook signature")
             return "Invalid signature", 403
         
         data = request.get_json()
-        print(f" Webhook data: {data}")
+        logger.debug("Webhook payload", extra={"payload": data})
         
-        # Process webhook data
+        # Enqueue each message for the background workers and acknowledge immediately
         if data.get("object") == "whatsapp_business_account":
             for entry in data.get("entry", []):
                 for change in entry.get("changes", []):
                     if change.get("field") == "messages":
-                        process_message(change.get("value", {}))
+                        for message in change.get("value", {}).get("messages", []):
+                            accept_message(message)
         
         return jsonify({"status": "success"}), 200
         
     except Exception as e:
-        print(f" Error processing webhook: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error processing webhook")
         return jsonify({"error": str(e)}), 500
 
+def accept_message(message):
+    """
+    Claim a message id and hand the message on. If the hand-off raises, the
+    claim is released so Meta's retry of the webhook is not dropped as a duplicate.
+    
+    Returns:
+        bool: False if the message was a redelivery and was skipped
+    """
+    # Drop redeliveries before any expensive work
+    message_id = message.get("id")
+    if message_id and not message_deduplicator.claim(message_id):
+        logger.info("Duplicate message %s, skipping", message_id)
+        return False
+    
+    try:
+        enqueue_message({"messages": [message]})
+    except Exception:
+        if message_id:
+            message_deduplicator.release(message_id)
+        raise
+    return True
+
+def enqueue_message(message_data):
+    """Hand a message to the background queue, or process it inline when the queue is disabled"""
+    if whatsapp_job_queue is not None:
+        job_id = whatsapp_job_queue.enqueue(message_data)
+        logger.info("Message queued as job %s", job_id)
+        return
+    
+    try:
+        process_message(message_data)
+    except Exception:
+        # Already logged by process_message; the webhook is still acknowledged
+        pass
+
 def process_message(message_data):
-    """Process incoming WhatsApp message"""
-    print(f" Processing message data: {message_data}")
+    """Process incoming WhatsApp message; raises so the queue can retry failed messages"""
+    logger.debug("Processing message", extra={"payload": message_data})
     
     try:
         messages = message_data.get("messages", [])
         
         for message in messages:
             if message.get("type") != "text":
-                print(f" Skipping non-text message: {message.get("type")}")
+                logger.info("Skipping non-text message: %s", message.get("type"))
                 continue
             
             # Extract message details
             from_number = message.get("from")
             message_id = message.get("id")
             text_body = message.get("text", {}).get("body", "")
-            timestamp = message.get("timestamp")
             
-            print(f" Message from {from_number}: {text_body}")
+            logger.info("WhatsApp message received", extra={"message_id": message_id, "chars": len(text_body)})
             
             if not text_body:
-                print(" Empty message body, skipping")
+                logger.info("Empty message body, skipping")
+                continue
+            
+            # A retry of a fully generated answer only resends the chunks that did not go out
+            delivery_id = message_id or str(uuid.uuid4())
+            previous_delivery = whatsapp_delivery.find_complete(delivery_id)
+            if previous_delivery is not None:
+                if not whatsapp_delivery.resend(previous_delivery):
+                    raise DeliveryError(f"Chunks of the answer to {delivery_id} are still unsent")
+                logger.info("Response to %s completed from stored chunks", delivery_id)
                 continue
             
             # Generate session ID for this phone number
             session_id = f"whatsapp_{from_number}"
             
-            # Get or create conversation history
-            if session_id not in whatsapp_conversations:
-                whatsapp_conversations[session_id] = ConversationHistory()
-            
-            conversation = whatsapp_conversations[session_id]
+            # Get or rehydrate conversation history
+            conversation = whatsapp_conversations.get(session_id)
             
             # Detect language
-            language = detect_language(text_body)
-            print(f" Detected language: {language}")
+            language = query_analyzer.analyze(text_body).language
             
             # Add user message to history
             conversation.add_message("user", text_body)
             
-            # Get AI response using the same logic as web chat
-            ai_response = get_chronicler_response(text_body, conversation, language)
+            # Get AI response using the same logic as web chat, sending chunks as they are ready
+            if Config.WHATSAPP_STREAM_RESPONSES:
+                answer_stream = stream_chronicler_response(text_body, conversation, language)
+            else:
+                answer_stream = iter([get_chronicler_response(text_body, conversation, language)])
             
-            # Add AI response to history
-            conversation.add_message("assistant", ai_response)
+            response_parts = []
+            def collect(stream):
+                for text in stream:
+                    response_parts.append(text)
+                    yield text
             
-            # Send response back via WhatsApp
-            if send_whatsapp_message(from_number, ai_response):
-                print(f" Response sent to {from_number}")
+            can_send = whatsapp_credentials_configured()
+            if can_send:
+                delivered = whatsapp_delivery.deliver(delivery_id, from_number, collect(answer_stream), language)
             else:
-                print(f" Failed to send response to {from_number}")
+                response_parts.extend(answer_stream)
+                delivered = False
+            ai_response = "".join(response_parts)
+            
+            # Add AI response to history
+            conversation.add_message("assistant", ai_response)
+            whatsapp_conversations.save(session_id, conversation)
             
             # Save to database
             try:
-                conv_record = Conversation(
+                conversation_writer.submit(
                     session_id=session_id,
                     user_message=text_body,
                     ai_response=ai_response,
@@ -166,17 +221,111 @@ def process_message(message_data):
                     platform="whatsapp",
                     phone_number=from_number
                 )
-                db.session.add(conv_record)
-                db.session.commit()
-                print(" Conversation saved to database")
             except Exception as db_error:
-                print(f" Database error: {db_error}")
+                logger.error("Database error: %s", db_error)
                 db.session.rollback()
+            
+            if delivered:
+                logger.info("Response sent", extra={"message_id": delivery_id})
+            elif can_send:
+                # Raise so the queue retries; the retry resends only the missing chunks
+                raise DeliveryError(f"Failed to send every chunk of the response to {from_number}")
+            else:
+                logger.error("Failed to send response", extra={"message_id": delivery_id})
     
-    except Exception as e:
-        print(f" Error processing message: {str(e)}")
-        import traceback
-        print(f" Traceback: {traceback.format_exc()}")
+    except Exception:
+        logger.exception("Error processing message")
+        raise
+
+def _record_exchange(session_id, conversation, text_body, ai_response, language, from_number):
+    """Save the session and queue the exchange for the database; run on the blocking executor"""
+    whatsapp_conversations.save(session_id, conversation)
+    try:
+        conversation_writer.submit(
+            session_id=session_id,
+            user_message=text_body,
+            ai_response=ai_response,
+            language=language,
+            platform="whatsapp",
+            phone_number=from_number
+        )
+    except Exception as db_error:
+        logger.error("Database error: %s", db_error)
+        db.session.rollback()
+
+async def process_message_async(message_data):
+    """
+    Process incoming WhatsApp message on the event loop (ASGI mode with the job queue disabled).
+    Chunks are sent while the answer streams; without the queue there is no retry, so the
+    delivery ledger is not used.
+    """
+    logger.debug("Processing message", extra={"payload": message_data})
+    
+    try:
+        for message in message_data.get("messages", []):
+            if message.get("type") != "text":
+                logger.info("Skipping non-text message: %s", message.get("type"))
+                continue
+            
+            from_number = message.get("from")
+            message_id = message.get("id")
+            text_body = message.get("text", {}).get("body", "")
+            
+            logger.info("WhatsApp message received", extra={"message_id": message_id, "chars": len(text_body)})
+            
+            if not text_body:
+                logger.info("Empty message body, skipping")
+                continue
+            
+            session_id = f"whatsapp_{from_number}"
+            conversation = await blocking_executor.run(whatsapp_conversations.get, session_id)
+            language = query_analyzer.analyze(text_body).language
+            conversation.add_message("user", text_body)
+            
+            # A sender task sends finished chunks while the rest of the answer is generated
+            outbox = asyncio.Queue()
+            async def send_chunks():
+                sent = True
+                while True:
+                    chunk = await outbox.get()
+                    if chunk is None:
+                        return sent
+                    if sent:
+                        sent = await whatsapp_client.send_text_async(from_number, chunk)
+            
+            can_send = whatsapp_credentials_configured()
+            sender = asyncio.ensure_future(send_chunks()) if can_send else None
+            chunker = StreamingChunker()
+            response_parts = []
+            try:
+                if Config.WHATSAPP_STREAM_RESPONSES:
+                    async for text in stream_chronicler_response_async(text_body, conversation, language):
+                        response_parts.append(text)
+                        for chunk in chunker.feed(text):
+                            outbox.put_nowait(chunk)
+                else:
+                    text = await get_chronicler_response_async(text_body, conversation, language)
+                    response_parts.append(text)
+                    for chunk in chunker.feed(text):
+                        outbox.put_nowait(chunk)
+                for chunk in chunker.flush():
+                    outbox.put_nowait(chunk)
+            finally:
+                outbox.put_nowait(None)
+            delivered = await sender if sender is not None else False
+            ai_response = "".join(response_parts)
+            
+            conversation.add_message("assistant", ai_response)
+            await blocking_executor.run(_record_exchange, session_id, conversation, text_body,
+                                        ai_response, language, from_number)
+            
+            if delivered:
+                logger.info("Response sent", extra={"message_id": message_id})
+            else:
+                logger.error("Failed to send response", extra={"message_id": message_id})
+    
+    except Exception:
+        logger.exception("Error processing message")
 
 @whatsapp_bp.route("/send", methods=["POST"])
 def send_message():
@@ -197,7 +346,7 @@ def send_message():
             return jsonify({"error": "Failed to send message"}), 500
             
     except Exception as e:
-        print(f" Error in send_message: {str(e)}")
+        logger.exception("Error in send_message")
         return jsonify({"error": str(e)}), 500
 
 @whatsapp_bp.route("/status", methods=["GET"])
@@ -208,7 +357,22 @@ def whatsapp_status():
         "phone_number_id_configured": bool(WHATSAPP_PHONE_NUMBER_ID) and WHATSAPP_PHONE_NUMBER_ID != "YOUR_WHATSAPP_PHONE_NUMBER_ID",
         "verify_token_configured": bool(WHATSAPP_VERIFY_TOKEN) and WHATSAPP_VERIFY_TOKEN != "YOUR_WHATSAPP_VERIFY_TOKEN",
         "app_secret_configured": bool(WHATSAPP_APP_SECRET) and WHATSAPP_APP_SECRET != "YOUR_WHATSAPP_APP_SECRET",
-        "active_conversations": len(whatsapp_conversations)
+        "active_conversations": len(whatsapp_conversations),
+        "sessions": whatsapp_conversations.stats(),
+        "queue": whatsapp_job_queue.stats() if whatsapp_job_queue is not None else None,
+        "deduplication": message_deduplicator.stats(),
+        "outbound": whatsapp_client.stats(),
+        "delivery": whatsapp_delivery.stats()
     }
     
     return jsonify(status)
+
+# Background queue that drains incoming WhatsApp messages; workers start in main.py
+whatsapp_job_queue = JobQueue(
+    "whatsapp",
+    Config.WHATSAPP_QUEUE_PATH,
+    process_message,
+    workers=Config.WHATSAPP_QUEUE_WORKERS,
+    max_attempts=Config.WHATSAPP_QUEUE_MAX_ATTEMPTS,
+    backoff=Config.WHATSAPP_QUEUE_BACKOFF_SECONDS
+) if Config.WHATSAPP_QUEUE_ENABLED else None
@@ -0,0 +1,182 @@
+import math
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Any, Dict, Optional
+from cachetools import TTLCache
+from src.config import Config
+from src.utils.query_analysis import extract_content_words, normalize
+
+
+# Question words change what is being asked, so they stay in the key
+QUESTION_WORDS = [
+    'who', 'what', 'when', 'where', 'why', 'how', 'which',
+    'من', 'ما', 'ماذا', 'متى', 'أين', 'لماذا', 'كيف', 'أي', 'كم'
+]
+
+# Ordinals that tell dynasties, centuries and rulers apart
+ORDINAL_WORDS = [
+    'first', 'second', 'third', 'fourth', 'fifth', 'sixth', 'seventh', 'eighth', 'ninth', 'tenth',
+    'eleventh', 'twelfth', 'thirteenth', 'fourteenth', 'fifteenth', 'sixteenth', 'seventeenth',
+    'eighteenth', 'nineteenth', 'twentieth', 'thirtieth',
+    'الأول', 'الأولى', 'الثاني', 'الثانية', 'الثالث', 'الثالثة', 'الرابع', 'الرابعة', 'الخامس',
+    'الخامسة', 'السادس', 'السادسة', 'السابع', 'السابعة', 'الثامن', 'الثامنة', 'التاسع', 'التاسعة',
+    'العاشر', 'العاشرة', 'عشر', 'عشرة', 'الحادي', 'الحادية', 'العشرين', 'الثلاثين'
+]
+
+_QUESTION_WORDS = frozenset(normalize(word) for word in QUESTION_WORDS)
+_ORDINAL_WORDS = frozenset(normalize(word) for word in ORDINAL_WORDS)
+_WORD_RE = re.compile(r'\w+')
+# Numbers like 18, 18th and 1952, and Roman numerals from 2 to 39 as in "Ramses II";
+# single letters are left out because "I" is far more often the pronoun
+_NUMBER_RE = re.compile(r'\d|^(?=[ivx]{2})x{0,3}(ix|iv|v?i{0,3})$')
+
+
+def _is_number(word: str) -> bool:
+    return word in _ORDINAL_WORDS or _NUMBER_RE.search(word) is not None
+
+
+def _distinguishing_words(normalized: str) -> frozenset:
+    """Question words and numbers of a normalized question, which a similar question must share"""
+    return frozenset(word for word in normalized.split() if word in _QUESTION_WORDS or _is_number(word))
+
+
+def normalize_question(question: str) -> Optional[str]:
+    """
+    Reduce a question to its sorted, deduplicated content words, question words and
+    numbers, so that rephrasings like "who built the pyramids" and "the pyramids were
+    built by who?" share a key while "when was Cleopatra born" and "where was Cleopatra
+    born" do not.
+
+    Args:
+        question (str): User question
+
+    Returns:
+        Optional[str]: Normalized form, or None if the question has no content words
+    """
+    content = set(extract_content_words(question))
+    if not content:
+        return None
+    kept = {word for word in _WORD_RE.findall(normalize(question)) if word in _QUESTION_WORDS or _is_number(word)}
+    return ' '.join(sorted(content | kept))
+
+
+def _embed(text: str, dimensions: int = 1 << 16) -> Dict[int, float]:
+    """Unit-length hashed character-trigram vector of text"""
+    padded = f" {text} "
+    counts = Counter(zlib.crc32(padded[i:i + 3].encode('utf-8')) % dimensions for i in range(len(padded) - 2))
+    norm = math.sqrt(sum(value * value for value in counts.values()))
+    return {index: value / norm for index, value in counts.items()} if norm else {}
+
+
+class AnswerCache:
+    """
+    Caches Chronicler answers to context-free questions, keyed by language and the
+    normalized question.
+
+    An optional semantic layer embeds each normalized question as a hashed
+    character-trigram vector (CPU only, no model download) and, on an exact-key
+    miss, reuses the answer of the most similar cached question above a threshold.
+    Trigram similarity cannot tell "18th dynasty" from "19th dynasty", so a similar
+    question must also have exactly the same question words and numbers.
+    """
+
+    def __init__(self, maxsize: int = Config.ANSWER_CACHE_SIZE, ttl: float = Config.ANSWER_CACHE_TTL_SECONDS,
+                 semantic: bool = Config.ANSWER_CACHE_SEMANTIC,
+                 similarity_threshold: float = Config.ANSWER_CACHE_SIMILARITY_THRESHOLD):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize (int): Maximum number of cached answers
+            ttl (float): Lifetime of a cached answer in seconds
+            semantic (bool): Whether to fall back to embedding similarity on a miss
+            similarity_threshold (float): Minimum cosine similarity for a semantic hit
+        """
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self._answers = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._vectors = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'semantic_hits': 0, 'misses': 0, 'stores': 0}
+
+    def get(self, question: str, language: str) -> Optional[str]:
+        """
+        Look up a cached answer.
+
+        Args:
+            question (str): User question
+            language (str): Detected language
+
+        Returns:
+            Optional[str]: Cached answer, or None on a miss
+        """
+        normalized = normalize_question(question)
+        if normalized is None:
+            return None
+        key = (language, normalized)
+
+        with self._lock:
+            answer = self._answers.get(key)
+            if answer is not None:
+                self._stats['hits'] += 1
+                return answer
+
+            if self.semantic:
+                answer = self._nearest(language, _embed(normalized), _distinguishing_words(normalized))
+                if answer is not None:
+                    self._stats['semantic_hits'] += 1
+                    return answer
+
+            self._stats['misses'] += 1
+            return None
+
+    def _nearest(self, language: str, vector: Dict[int, float], distinguishing: frozenset) -> Optional[str]:
+        """Answer of the most similar live cached question with the same distinguishing words, if similar enough"""
+        best_answer, best_similarity = None, self.similarity_threshold
+        for key in list(self._vectors):
+            answer = self._answers.get(key)
+            if answer is None:
+                # Expired or evicted from the answer cache
+                del self._vectors[key]
+                continue
+            if key[0] != language or _distinguishing_words(key[1]) != distinguishing:
+                continue
+            cached_vector = self._vectors[key]
+            similarity = sum(value * cached_vector.get(index, 0.0) for index, value in vector.items())
+            if similarity >= best_similarity:
+                best_answer, best_similarity = answer, similarity
+        return best_answer
+
+    def set(self, question: str, language: str, answer: str) -> None:
+        """
+        Cache an answer.
+
+        Args:
+            question (str): User question
+            language (str): Detected language
+            answer (str): Chronicler answer
+        """
+        normalized = normalize_question(question)
+        if normalized is None or not answer:
+            return
+        key = (language, normalized)
+
+        with self._lock:
+            self._answers[key] = answer
+            self._stats['stores'] += 1
+            if self.semantic:
+                self._vectors[key] = _embed(normalized)
+                if len(self._vectors) > self._answers.maxsize:
+                    for stale in [k for k in self._vectors if k not in self._answers]:
+                        del self._vectors[stale]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the hit rate"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._answers)
+        lookups = stats['hits'] + stats['semantic_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['semantic_hits']) / lookups if lookups else 0.0
+        return stats
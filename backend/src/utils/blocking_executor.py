@@ -0,0 +1,80 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from src.config import Config
+
+
+class BlockingExecutor:
+    """
+    Runs blocking work (SQLAlchemy sessions, SQLite files, the session store)
+    for async views on a bounded thread pool.
+
+    Every call runs inside the Flask app context and the caller's context
+    variables, so it can use db.session and logs with the request's
+    correlation id. At most ``max_workers`` calls run at once; the rest wait
+    on the event loop without holding a thread.
+    """
+
+    def __init__(self, max_workers: int = Config.ASYNC_BLOCKING_WORKERS):
+        """
+        Initialize the executor.
+
+        Args:
+            max_workers (int): Threads available for blocking calls
+        """
+        self.max_workers = max_workers
+        self.app = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='blocking')
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'running': 0, 'failures': 0}
+
+    def init_app(self, app) -> None:
+        """Use app's context for the calls"""
+        self.app = app
+
+    def _call(self, fn: Callable[..., Any]) -> Any:
+        with self._lock:
+            self._stats['running'] += 1
+        try:
+            if self.app is None:
+                return fn()
+            with self.app.app_context():
+                return fn()
+        except Exception:
+            with self._lock:
+                self._stats['failures'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats['running'] -= 1
+                self._stats['calls'] += 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Await a blocking call.
+
+        Args:
+            fn (Callable): Function to run on the pool
+            *args, **kwargs: Its arguments
+
+        Returns:
+            Any: What fn returned; its exceptions propagate
+        """
+        # Flask keeps its app context in a context variable too, so it is pushed inside the copy
+        context = contextvars.copy_context()
+        call = functools.partial(fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, context.run, self._call, call)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get call counters and the number of calls running"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['max_workers'] = self.max_workers
+        return stats
+
+
+# Global instance used by the ASGI entry point
+blocking_executor = BlockingExecutor()
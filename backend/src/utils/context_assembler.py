@@ -0,0 +1,219 @@
+import math
+import random
+import re
+import threading
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.config import Config
+from src.utils.query_analysis import extract_content_words, normalize
+from src.utils.tokenizer import Tokenizer, get_tokenizer
+
+# Section headers of the retrieved context, by passage source
+SECTION_HEADERS = {
+    'knowledge': "\n\n**Context from the Chronicler's Archives:**\n",
+    'wikipedia': "\n\n**Additional Context from Wikipedia:**\n"
+}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?؟])\s+')
+_WORD_RE = re.compile(r'\w+')
+
+
+class Passage:
+    """A retrieved passage competing for a place in the prompt"""
+    __slots__ = ('source', 'title', 'text', 'rank', 'score', 'tokens', 'signature')
+
+    def __init__(self, source: str, title: str, text: str, rank: int):
+        self.source = source
+        self.title = title
+        self.text = text
+        self.rank = rank
+        self.score = 0.0
+        self.tokens = 0
+        self.signature = None
+
+    def render(self, text: Optional[str] = None) -> str:
+        return f"**{self.title}**: {self.text if text is None else text}"
+
+
+class MinHasher:
+    """MinHash signatures of word shingles, for estimating the Jaccard similarity of passages"""
+
+    def __init__(self, num_hashes: int = 64, shingle_size: int = 3, seed: int = 1):
+        """
+        Initialize the hasher.
+
+        Args:
+            num_hashes (int): Signature length; the estimate's error shrinks with its square root
+            shingle_size (int): Words per shingle
+            seed (int): Seed of the hash family, fixed so signatures are comparable across runs
+        """
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._coefficients = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                              for _ in range(num_hashes)]
+
+    def shingles(self, text: str) -> set:
+        words = _WORD_RE.findall(normalize(text))
+        if len(words) <= self.shingle_size:
+            return {' '.join(words)} if words else set()
+        return {' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in self.shingles(text)]
+        if not hashes:
+            return ()
+        return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._coefficients)
+
+    @staticmethod
+    def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        if not first or not second:
+            return 0.0
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class ContextAssembler:
+    """
+    Chooses which retrieved passages go into the prompt.
+
+    Candidates from the knowledge base and Wikipedia are scored against the
+    question (IDF-weighted coverage of its content words, with the retriever's
+    own order as a tie-breaker), near-duplicates are dropped by MinHash
+    similarity of their word shingles, and the best passages are packed into a
+    token budget. A passage that no longer fits is cut at a sentence boundary
+    when enough budget is left, otherwise skipped.
+    """
+
+    def __init__(self, tokenizer: Optional[Tokenizer] = None,
+                 token_budget: int = Config.CONTEXT_TOKEN_BUDGET,
+                 dedup_threshold: float = Config.CONTEXT_DEDUP_THRESHOLD,
+                 min_passage_tokens: int = Config.CONTEXT_MIN_PASSAGE_TOKENS,
+                 hasher: Optional[MinHasher] = None):
+        """
+        Initialize the assembler.
+
+        Args:
+            tokenizer (Tokenizer): Tokenizer used for budgeting; defaults to Config.TOKENIZER
+            token_budget (int): Maximum tokens of retrieved context per prompt
+            dedup_threshold (float): Estimated Jaccard similarity above which a passage is a duplicate
+            min_passage_tokens (int): Smallest trimmed passage worth including
+            hasher (MinHasher): Signature function for deduplication
+        """
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.token_budget = token_budget
+        self.dedup_threshold = dedup_threshold
+        self.min_passage_tokens = min_passage_tokens
+        self.hasher = hasher or MinHasher()
+        self._count_static = lru_cache(maxsize=8)(self.tokenizer.count)
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'candidate_tokens': 0, 'context_tokens': 0, 'tokens_saved': 0,
+                       'duplicates_dropped': 0, 'passages_trimmed': 0, 'passages_skipped': 0}
+
+    def _score(self, question: str, candidates: List[Passage]) -> None:
+        """IDF-weighted fraction of the question's content words each candidate contains"""
+        query_terms = set(extract_content_words(question))
+        vocabularies = [set(extract_content_words(f"{passage.title} {passage.text}")) for passage in candidates]
+        weights = {}
+        for term in query_terms:
+            document_frequency = sum(1 for vocabulary in vocabularies if term in vocabulary)
+            weights[term] = math.log(1 + len(candidates) / (1 + document_frequency))
+        total = sum(weights.values())
+        for passage, vocabulary in zip(candidates, vocabularies):
+            matched = sum(weight for term, weight in weights.items() if term in vocabulary)
+            passage.score = matched / total if total else 0.0
+
+    def _trim(self, passage: Passage, budget: int) -> Optional[str]:
+        """Longest run of leading sentences whose rendering fits budget"""
+        kept = []
+        for sentence in _SENTENCE_END_RE.split(passage.text):
+            if self.tokenizer.count(passage.render(' '.join(kept + [sentence]))) > budget:
+                break
+            kept.append(sentence)
+        return ' '.join(kept) if kept else None
+
+    def assemble(self, question: str, knowledge_passages: Iterable[Tuple[str, str]] = (),
+                 wikipedia_passages: Iterable[Tuple[str, str]] = ()) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Select and format the retrieved context for a question.
+
+        Args:
+            question (str): User's message
+            knowledge_passages (Iterable[Tuple[str, str]]): (title, text) pairs from the knowledge base, best first
+            wikipedia_passages (Iterable[Tuple[str, str]]): (title, summary) pairs from Wikipedia, best first
+
+        Returns:
+            Tuple[List[str], Dict[str, Any]]: Formatted sections for the prompt and this
+            request's accounting (candidates, duplicates, tokens before and after, tokens saved)
+        """
+        candidates = [Passage('knowledge', title, text, rank) for rank, (title, text) in enumerate(knowledge_passages)]
+        candidates += [Passage('wikipedia', title, text, rank) for rank, (title, text) in enumerate(wikipedia_passages)]
+        for passage in candidates:
+            passage.tokens = self.tokenizer.count(passage.render())
+        self._score(question, candidates)
+
+        # Best first; the local archive wins ties, then the retriever's own order
+        candidates.sort(key=lambda passage: (-passage.score, passage.source != 'knowledge', passage.rank))
+
+        selected = []
+        opened = set()
+        duplicates = trimmed = skipped = 0
+        remaining = self.token_budget
+        for passage in candidates:
+            passage.signature = self.hasher.signature(passage.text)
+            if any(self.hasher.similarity(passage.signature, kept.signature) >= self.dedup_threshold
+                   for kept, _ in selected):
+                duplicates += 1
+                continue
+
+            # The first passage of a source also pays for its section header
+            available = remaining - (0 if passage.source in opened else self._count_static(SECTION_HEADERS[passage.source]))
+            rendered = passage.render()
+            tokens = passage.tokens
+            if tokens > available:
+                text = self._trim(passage, available) if available >= self.min_passage_tokens else None
+                if text is None:
+                    skipped += 1
+                    continue
+                rendered = passage.render(text)
+                tokens = self.tokenizer.count(rendered)
+                trimmed += 1
+            selected.append((passage, rendered))
+            opened.add(passage.source)
+            remaining = available - tokens
+
+        sections = []
+        for source, header in SECTION_HEADERS.items():
+            rendered = [text for passage, text in selected if passage.source == source]
+            if rendered:
+                sections.append(header + "\n\n".join(rendered))
+
+        candidate_tokens = sum(passage.tokens for passage in candidates)
+        context_tokens = sum(self.tokenizer.count(section) for section in sections)
+        stats = {
+            'candidates': len(candidates),
+            'selected': len(selected),
+            'duplicates_dropped': duplicates,
+            'passages_trimmed': trimmed,
+            'passages_skipped': skipped,
+            'candidate_tokens': candidate_tokens,
+            'context_tokens': context_tokens,
+            'tokens_saved': max(0, candidate_tokens - context_tokens)
+        }
+        with self._lock:
+            self._stats['requests'] += 1
+            for key in ('candidate_tokens', 'context_tokens', 'tokens_saved', 'duplicates_dropped',
+                        'passages_trimmed', 'passages_skipped'):
+                self._stats[key] += stats[key]
+        return sections, stats
+
+    def stats(self) -> Dict[str, Any]:
+        """Get totals across requests and the average tokens saved per request"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['average_tokens_saved'] = stats['tokens_saved'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+
+# Global instance used by the chat route
+context_assembler = ContextAssembler()
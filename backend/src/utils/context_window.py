@@ -0,0 +1,83 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from src.config import Config
+from src.utils.tokenizer import Tokenizer, get_tokenizer
+
+
+class ContextWindowBuilder:
+    """
+    Assembles the Chronicler prompt within a token budget.
+
+    The system prompt, the retrieved context and the current question are always
+    included; their tokens are reserved first and the conversation history gets
+    whatever budget remains, capped at ``max_history_tokens``.
+    """
+
+    def __init__(self, tokenizer: Optional[Tokenizer] = None,
+                 max_prompt_tokens: int = Config.PROMPT_TOKEN_BUDGET,
+                 max_history_tokens: int = Config.MAX_CONVERSATION_TOKENS):
+        """
+        Initialize the builder.
+
+        Args:
+            tokenizer (Tokenizer): Tokenizer used for budgeting; defaults to Config.TOKENIZER
+            max_prompt_tokens (int): Token budget for the whole prompt
+            max_history_tokens (int): Upper bound on tokens spent on conversation history
+        """
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_history_tokens = max_history_tokens
+        # The system prompt is the same on every request, so count it once
+        self._count_static = lru_cache(maxsize=8)(self.tokenizer.count)
+
+    def build(self, system_prompt: str, retrieved_context: List[str], conversation,
+              user_message: str, inline_system_prompt: bool = True) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the full prompt.
+
+        Args:
+            system_prompt (str): Chronicler persona and instructions
+            retrieved_context (List[str]): Formatted knowledge base / Wikipedia sections
+            conversation (ConversationHistory): Conversation history; a trailing copy of
+                the current question is not repeated
+            user_message (str): Current question
+            inline_system_prompt (bool): Whether to put the system prompt in the text; when the
+                model carries it as a system instruction its tokens are still reserved
+
+        Returns:
+            Tuple[str, Dict[str, Any]]: The prompt and its token accounting
+        """
+        question = f"\nUser: {user_message}\nChronicler:"
+        system_tokens = self._count_static(system_prompt) if system_prompt else 0
+        retrieved_tokens = sum(self.tokenizer.count(section) for section in retrieved_context)
+        question_tokens = self.tokenizer.count(question)
+
+        history_budget = min(
+            self.max_history_tokens,
+            self.max_prompt_tokens - system_tokens - retrieved_tokens - question_tokens
+        )
+
+        # The question is usually already the latest message in the history
+        latest = conversation.history[-1] if conversation.history else None
+        exclude_latest = 1 if latest and latest['role'] == 'user' and latest['content'] == user_message else 0
+        history = conversation.get_context_for_ai(history_budget, exclude_latest=exclude_latest)
+
+        parts = [system_prompt] if system_prompt and inline_system_prompt else []
+        parts.extend(retrieved_context)
+        if history:
+            parts.append("\n\nConversation History:\n")
+            for msg in history:
+                role = "User" if msg['role'] == 'user' else "Chronicler"
+                parts.append(f"{role}: {msg['content']}\n")
+        parts.append(question)
+
+        history_tokens = sum(msg['tokens'] for msg in history)
+        stats = {
+            'system_tokens': system_tokens,
+            'retrieved_tokens': retrieved_tokens,
+            'history_tokens': history_tokens,
+            'history_messages': len(history),
+            'prompt_tokens': system_tokens + retrieved_tokens + history_tokens + question_tokens
+        }
+        prompt = ''.join(parts)
+        return (prompt if inline_system_prompt else prompt.lstrip()), stats
@@ -0,0 +1,185 @@
+import gzip
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Any, Dict, Iterable, List, Optional
+from cachetools import LRUCache
+from sqlalchemy import func
+from src.config import Config
+from src.models.conversation import db, Conversation, ConversationArchive, ArchivedConversation
+
+logger = logging.getLogger(__name__)
+
+# Conversation columns kept in the archive files
+ARCHIVED_COLUMNS = ('id', 'session_id', 'user_message', 'ai_response', 'language', 'platform', 'phone_number', 'timestamp')
+
+
+def _chunks(items: List[Any], size: int = 500) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ConversationArchiver:
+    """
+    Moves Conversation rows older than ``max_age_days`` into gzip-compressed JSONL
+    files, one directory per month.
+
+    Within a file each session's rows form their own gzip member, so the file as
+    a whole is still an ordinary .jsonl.gz, yet one session can be read by seeking
+    to its block and decompressing only that. The database keeps a slim
+    ArchivedConversation entry per row (id, session_id, timestamp and the block
+    location) so history pages can be located without touching the archive.
+    """
+
+    def __init__(self, directory: str = Config.CONVERSATION_ARCHIVE_DIR,
+                 max_age_days: int = Config.CONVERSATION_ARCHIVE_AFTER_DAYS,
+                 batch_size: int = Config.CONVERSATION_ARCHIVE_BATCH_SIZE,
+                 cache_blocks: int = Config.CONVERSATION_ARCHIVE_CACHE_BLOCKS):
+        """
+        Initialize the archiver.
+
+        Args:
+            directory (str): Root directory of the archive files
+            max_age_days (int): Rows older than this many days are archived
+            batch_size (int): Maximum rows moved per archive file
+            cache_blocks (int): Number of decompressed session blocks kept in memory
+        """
+        self.directory = directory
+        self.max_age_days = max_age_days
+        self.batch_size = batch_size
+        self._blocks = LRUCache(maxsize=cache_blocks)
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def archive(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Archive every Conversation row older than the configured age, except the
+        newest row. Must run inside an app context.
+
+        Args:
+            now (datetime): Reference time, defaults to the current UTC time
+
+        Returns:
+            Dict[str, int]: Number of rows archived and files written
+        """
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.max_age_days)
+        result = {'rows': 0, 'files': 0}
+        columns = [getattr(Conversation, column) for column in ARCHIVED_COLUMNS]
+        # The newest row stays, so a SQLite table created before AUTOINCREMENT never reuses an archived id
+        newest_id = db.session.query(func.max(Conversation.id)).scalar()
+        if newest_id is None:
+            return result
+
+        while True:
+            # Ids grow with time, so walking the primary key finds old rows without a sort
+            rows = (db.session.query(*columns)
+                    .filter(Conversation.timestamp < cutoff, Conversation.id < newest_id)
+                    .order_by(Conversation.id)
+                    .limit(self.batch_size)
+                    .all())
+            if not rows:
+                break
+
+            rows = [dict(zip(ARCHIVED_COLUMNS, row)) for row in rows]
+            rows.sort(key=lambda row: row['timestamp'].strftime('%Y-%m'))
+            for month, month_rows in groupby(rows, key=lambda row: row['timestamp'].strftime('%Y-%m')):
+                month_rows = list(month_rows)
+                self._archive_month(month, month_rows)
+                result['rows'] += len(month_rows)
+                result['files'] += 1
+
+        logger.info("Archived %s conversations into %s files", result['rows'], result['files'])
+        return result
+
+    def _archive_month(self, month: str, rows: List[Dict[str, Any]]) -> None:
+        """Write one archive file for rows of the same month, then swap the rows for index entries"""
+        rows.sort(key=lambda row: (row['session_id'], row['timestamp'], row['id']))
+        month_dir = os.path.join(self.directory, month)
+        os.makedirs(month_dir, exist_ok=True)
+        path = os.path.join(month_dir, f"conversations-{month}-{rows[0]['id']}-{rows[-1]['id']}-{len(rows)}.jsonl.gz")
+
+        index_entries = []
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            for session_id, session_rows in groupby(rows, key=lambda row: row['session_id']):
+                session_rows = list(session_rows)
+                lines = ''.join(json.dumps(dict(row, timestamp=row['timestamp'].isoformat()), ensure_ascii=False) + '\n'
+                                for row in session_rows)
+                block = gzip.compress(lines.encode('utf-8'))
+                offset = f.tell()
+                f.write(block)
+                index_entries.extend({
+                    'id': row['id'],
+                    'session_id': session_id,
+                    'timestamp': row['timestamp'],
+                    'block_offset': offset,
+                    'block_length': len(block)
+                } for row in session_rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+        try:
+            archive = ConversationArchive(path=path, month=month, row_count=len(rows))
+            db.session.add(archive)
+            db.session.flush()
+            for entry in index_entries:
+                entry['archive_id'] = archive.id
+            db.session.execute(ArchivedConversation.__table__.insert(), index_entries)
+            for ids in _chunks([row['id'] for row in rows]):
+                db.session.execute(Conversation.__table__.delete().where(Conversation.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            os.remove(path)
+            raise
+
+    def _path(self, archive_id: int) -> str:
+        path = self._paths.get(archive_id)
+        if path is None:
+            path = db.session.query(ConversationArchive.path).filter_by(id=archive_id).scalar()
+            self._paths[archive_id] = path
+        return path
+
+    def _read_block(self, archive_id: int, offset: int, length: int) -> Dict[int, Dict[str, Any]]:
+        """Decompress one session block, keyed by row id"""
+        key = (archive_id, offset)
+        with self._lock:
+            block = self._blocks.get(key)
+        if block is not None:
+            return block
+
+        with open(self._path(archive_id), 'rb') as f:
+            f.seek(offset)
+            data = gzip.decompress(f.read(length))
+        block = {}
+        for line in data.decode('utf-8').splitlines():
+            row = json.loads(line)
+            block[row['id']] = row
+        with self._lock:
+            self._blocks[key] = block
+        return block
+
+    def load(self, entries: List[Any]) -> Dict[int, Dict[str, Any]]:
+        """
+        Read archived rows. Must run inside an app context.
+
+        Args:
+            entries (List[Any]): ArchivedConversation rows or tuples with id, archive_id,
+                block_offset and block_length attributes
+
+        Returns:
+            Dict[int, Dict[str, Any]]: Archived rows keyed by their original id
+        """
+        rows = {}
+        for entry in entries:
+            block = self._read_block(entry.archive_id, entry.block_offset, entry.block_length)
+            rows[entry.id] = block[entry.id]
+        return rows
+
+
+# Global instance used by the history routes and the archive script
+conversation_archiver = ConversationArchiver()
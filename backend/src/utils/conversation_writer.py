@@ -0,0 +1,176 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+from src.config import Config
+from src.models.conversation import db, Conversation, record_session_activity
+from src.utils.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationWriter:
+    """
+    Write-behind persistence for Conversation rows.
+
+    Routes submit exchanges to a bounded in-memory queue and return without
+    waiting for a commit. A background thread inserts them in bulk, one statement
+    and one transaction per batch, when ``batch_size`` rows are waiting or
+    ``flush_interval`` seconds after the oldest one arrived. Pending rows are
+    flushed on shutdown.
+
+    If the queue is full, or the writer has not been started, rows are written
+    synchronously instead.
+    """
+
+    def __init__(self, batch_size: int = Config.CONVERSATION_WRITE_BATCH_SIZE,
+                 flush_interval: float = Config.CONVERSATION_WRITE_FLUSH_INTERVAL_SECONDS,
+                 max_queue: int = Config.CONVERSATION_WRITE_QUEUE_SIZE, max_attempts: int = 3):
+        """
+        Initialize the writer.
+
+        Args:
+            batch_size (int): Rows per bulk insert
+            flush_interval (float): Maximum seconds a row waits before being flushed
+            max_queue (int): Maximum rows buffered in memory
+            max_attempts (int): Attempts to write a batch before it is dropped
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.app = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stopping = threading.Event()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._flush_latency = LatencyHistogram()
+        self._stats = {'submitted': 0, 'written': 0, 'flushes': 0, 'sync_writes': 0, 'failed_flushes': 0, 'dropped': 0}
+
+    def submit(self, **fields: Any) -> None:
+        """
+        Queue a Conversation row for insertion. Takes the Conversation column values;
+        the timestamp is taken now so rows keep their order.
+        """
+        row = {
+            'language': 'en',
+            'platform': 'web',
+            'phone_number': None,
+            'timestamp': datetime.utcnow(),
+            **fields
+        }
+        with self._lock:
+            self._stats['submitted'] += 1
+
+        if self._thread is not None and not self._stopping.is_set():
+            try:
+                self._queue.put_nowait(row)
+                return
+            except queue.Full:
+                pass
+
+        # Not running or backlogged: write on the caller's thread and app context
+        with self._lock:
+            self._stats['sync_writes'] += 1
+        self._write([row])
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        """Insert rows and fold them into the sessions table in one transaction"""
+        started = time.monotonic()
+        try:
+            db.session.execute(Conversation.__table__.insert(), rows)
+            record_session_activity(db.session.connection(), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        with self._lock:
+            self._flush_latency.observe((time.monotonic() - started) * 1000)
+            self._stats['written'] += len(rows)
+            self._stats['flushes'] += 1
+
+    def _flush(self, rows: List[Dict[str, Any]]) -> None:
+        """Write a batch from the background thread, retrying transient failures"""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with self.app.app_context():
+                    self._write(rows)
+                return
+            except Exception as e:
+                with self._lock:
+                    self._stats['failed_flushes'] += 1
+                logger.warning("Failed to write %s conversations (attempt %s): %s", len(rows), attempt, e)
+                if attempt < self.max_attempts:
+                    time.sleep(0.5 * 2 ** (attempt - 1))
+
+        with self._lock:
+            self._stats['dropped'] += len(rows)
+        logger.warning("Dropped %s conversations after %s attempts", len(rows), self.max_attempts)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            batch = [first]
+            with self._lock:
+                self._in_flight = 1
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if self._stopping.is_set():
+                    # Drain without waiting during shutdown
+                    remaining = 0
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                with self._lock:
+                    self._in_flight = len(batch)
+
+            self._flush(batch)
+            with self._lock:
+                self._in_flight = 0
+
+    def init_app(self, app) -> None:
+        """Start the background writer for app and flush pending rows at interpreter exit"""
+        if self._thread is not None:
+            return
+        self.app = app
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="conversation-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info("Conversation writer started (batch %s, interval %ss)", self.batch_size, self.flush_interval)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush every pending row and stop the background thread"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        thread.join(timeout)
+        self._thread = None
+        if thread.is_alive():
+            logger.warning("Conversation writer did not finish within %ss; %s rows left unwritten", timeout, self._queue.qsize())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get backlog depth, write counters and flush latency"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['backlog'] = self._queue.qsize() + self._in_flight
+            stats['flush_latency'] = self._flush_latency.to_dict()
+        stats['running'] = self._thread is not None
+        stats['average_batch_size'] = stats['written'] / stats['flushes'] if stats['flushes'] else 0.0
+        return stats
+
+
+# Global instance used by the chat and WhatsApp routes
+conversation_writer = ConversationWriter()
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+import threading
+import google.generativeai as genai
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiModelManager:
+    """
+    Owns one configured GenerativeModel per worker process.
+
+    The persona is set once as the model's system instruction, and the generation
+    settings come from Config, so a request only sends its own prompt. The model
+    is rebuilt if the process has been forked since it was created.
+    """
+
+    def __init__(self, system_instruction: str, model_name: str = Config.AI_MODEL_NAME,
+                 temperature: float = Config.AI_TEMPERATURE, top_p: float = Config.AI_TOP_P,
+                 top_k: int = Config.AI_TOP_K, max_output_tokens: int = Config.AI_MAX_OUTPUT_TOKENS):
+        """
+        Initialize the manager; the model itself is created on first use.
+
+        Args:
+            system_instruction (str): Persona and guidelines sent as the system instruction
+            model_name (str): Gemini model name
+            temperature (float): Sampling temperature
+            top_p (float): Nucleus sampling threshold
+            top_k (int): Top-k sampling size
+            max_output_tokens (int): Maximum tokens per answer
+        """
+        self.system_instruction = system_instruction
+        self.model_name = model_name
+        self.generation_config = genai.types.GenerationConfig(
+            temperature=temperature,
+            top_p=top_p,
+            top_k=top_k,
+            max_output_tokens=max_output_tokens,
+        )
+        self._model = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get_model(self) -> genai.GenerativeModel:
+        """Get this process's model, creating it on first use"""
+        if self._model is None or self._pid != os.getpid():
+            with self._lock:
+                if self._model is None or self._pid != os.getpid():
+                    logger.info("Creating Gemini model %s", self.model_name)
+                    self._model = genai.GenerativeModel(
+                        self.model_name,
+                        system_instruction=self.system_instruction,
+                        generation_config=self.generation_config,
+                    )
+                    self._pid = os.getpid()
+        return self._model
+
+    def generate(self, prompt: str, stream: bool = False):
+        """
+        Generate content for a prompt.
+
+        Args:
+            prompt (str): Request prompt, without the system instruction
+            stream (bool): Whether to return an iterator of partial responses
+
+        Returns:
+            GenerateContentResponse: The (possibly streaming) response
+        """
+        return self.get_model().generate_content(prompt, stream=stream)
+
+    async def generate_async(self, prompt: str, stream: bool = False):
+        """
+        Generate content for a prompt on the event loop, without holding a thread
+        for the duration of the call.
+
+        Args:
+            prompt (str): Request prompt, without the system instruction
+            stream (bool): Whether to return an async iterator of partial responses
+
+        Returns:
+            AsyncGenerateContentResponse: The (possibly streaming) response
+        """
+        if Config.GEMINI_API_ENDPOINT:
+            # The SDK's async client only speaks gRPC, so over REST the call runs on a thread
+            response = await asyncio.to_thread(self.generate, prompt, stream)
+            return _iterate_in_thread(response) if stream else response
+        return await self.get_model().generate_content_async(prompt, stream=stream)
+
+
+async def _iterate_in_thread(iterable):
+    """Async iterator over a blocking iterable, fetching each item on a thread"""
+    iterator = iter(iterable)
+    end = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, end)
+        if item is end:
+            return
+        yield item
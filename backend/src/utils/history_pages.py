@@ -0,0 +1,170 @@
+import base64
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import and_, or_
+from src.config import Config
+from src.models.conversation import db, Conversation, ArchivedConversation, SessionSummary
+from src.utils.conversation_archive import conversation_archiver
+
+# Columns returned by history pages; selecting them directly skips ORM object hydration
+HISTORY_COLUMNS = (
+    Conversation.id,
+    Conversation.user_message,
+    Conversation.ai_response,
+    Conversation.timestamp,
+    Conversation.language
+)
+
+# Slim index columns locating archived exchanges
+ARCHIVE_INDEX_COLUMNS = (
+    ArchivedConversation.id,
+    ArchivedConversation.timestamp,
+    ArchivedConversation.archive_id,
+    ArchivedConversation.block_offset,
+    ArchivedConversation.block_length
+)
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque page cursor for a row's position in (timestamp, id) order"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        timestamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def _page_query(query, model, session_id: str, cursor: Optional[Tuple[datetime, int]], forward: bool, limit: int):
+    """Rows of model (Conversation or its archive index) on the far side of cursor, nearest first"""
+    query = query.filter(model.session_id == session_id)
+    if cursor is not None:
+        timestamp, row_id = cursor
+        if forward:
+            query = query.filter(or_(model.timestamp > timestamp, and_(model.timestamp == timestamp, model.id > row_id)))
+        else:
+            query = query.filter(or_(model.timestamp < timestamp, and_(model.timestamp == timestamp, model.id < row_id)))
+    if forward:
+        query = query.order_by(model.timestamp.asc(), model.id.asc())
+    else:
+        query = query.order_by(model.timestamp.desc(), model.id.desc())
+    return query.limit(limit).all()
+
+
+def read_history_page(session_id: str, before: Optional[str] = None, after: Optional[str] = None,
+                      limit: int = Config.HISTORY_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Read one page of a session's exchanges using keyset pagination.
+
+    Pages are located with the (session_id, timestamp, id) indexes of the live
+    table and of the archive index, so the cost of a page does not depend on how
+    long the session is; archived exchanges are read from their archive block
+    only when they fall on the requested page. Without a cursor the most
+    recent page is returned; 'before' pages back towards older exchanges and
+    'after' pages forward towards newer ones.
+
+    Args:
+        session_id (str): Session identifier
+        before (str): Cursor; return exchanges older than it
+        after (str): Cursor; return exchanges newer than it
+        limit (int): Maximum exchanges per page
+
+    Returns:
+        Dict[str, Any]: 'history' (oldest first), 'has_more' in the paging direction,
+        and the 'next_before'/'next_after' cursors of the page edges
+
+    Raises:
+        ValueError: If a cursor is malformed
+    """
+    forward = after is not None
+    cursor = decode_cursor(after if forward else before) if (forward or before is not None) else None
+
+    # One extra row tells whether another page follows
+    live_rows = _page_query(db.session.query(*HISTORY_COLUMNS), Conversation, session_id, cursor, forward, limit + 1)
+    archived_entries = _page_query(db.session.query(*ARCHIVE_INDEX_COLUMNS), ArchivedConversation,
+                                   session_id, cursor, forward, limit + 1)
+
+    # Merge the live and archived candidates and keep the page nearest the cursor
+    candidates = [(row.timestamp, row.id, row, False) for row in live_rows] + \
+                 [(entry.timestamp, entry.id, entry, True) for entry in archived_entries]
+    candidates.sort(key=lambda candidate: candidate[:2], reverse=not forward)
+    has_more = len(candidates) > limit
+    candidates = candidates[:limit]
+    if not forward:
+        candidates.reverse()
+
+    # Only archive blocks holding exchanges on this page are read
+    archived_rows = conversation_archiver.load([row for _, _, row, is_archived in candidates if is_archived])
+    history = []
+    for timestamp, row_id, row, is_archived in candidates:
+        if is_archived:
+            row = archived_rows[row_id]
+        else:
+            row = row._asdict()
+        history.append({
+            'id': row_id,
+            'user_message': row['user_message'],
+            'ai_response': row['ai_response'],
+            'timestamp': timestamp.isoformat(),
+            'language': row['language']
+        })
+    edges = [(timestamp, row_id) for timestamp, row_id, _, _ in candidates]
+
+    first_cursor = encode_cursor(*edges[0]) if edges else None
+    last_cursor = encode_cursor(*edges[-1]) if edges else after
+    return {
+        'history': history,
+        'has_more': has_more,
+        # Older exchanges exist before this page unless we paged back and ran out
+        'next_before': first_cursor if (forward or has_more) else None,
+        # Newer exchanges may always arrive, so the newest edge is always returned
+        'next_after': last_cursor
+    }
+
+
+def read_sessions_page(cursor: Optional[str] = None, platform: Optional[str] = None,
+                       limit: int = Config.SESSIONS_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Read one page of sessions, most recently active first.
+
+    Pages come from the maintained sessions table through its (platform,)
+    last_timestamp index, so a page costs O(limit) regardless of table size.
+
+    Args:
+        cursor (str): Cursor from a previous page; return sessions active before it
+        platform (str): Only return sessions of this platform ('web' or 'whatsapp')
+        limit (int): Maximum sessions per page
+
+    Returns:
+        Dict[str, Any]: 'sessions', 'has_more' and the 'next_cursor' of the next page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    query = SessionSummary.query
+    if platform:
+        query = query.filter(SessionSummary.platform == platform)
+    if cursor is not None:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(or_(SessionSummary.last_timestamp < timestamp,
+                                 and_(SessionSummary.last_timestamp == timestamp, SessionSummary.id < row_id)))
+
+    rows = query.order_by(SessionSummary.last_timestamp.desc(), SessionSummary.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'sessions': [row.to_dict() for row in rows],
+        'has_more': has_more,
+        'next_cursor': encode_cursor(rows[-1].last_timestamp, rows[-1].id) if has_more else None
+    }
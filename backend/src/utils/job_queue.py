@@ -0,0 +1,234 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from src.utils.logging_setup import correlation_id, new_correlation_id
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    A persistent job queue backed by a local SQLite file, drained by a pool of
+    background worker threads.
+
+    Jobs that raise are retried with exponential backoff and jitter; after
+    ``max_attempts`` failures they are moved to a dead-letter table. Several
+    processes may share the same file: jobs are claimed atomically, and claims
+    that are not finished within ``visibility_timeout`` become available again.
+    """
+
+    def __init__(self, name: str, path: str, handler: Callable[[Any], None], workers: int = 4,
+                 max_attempts: int = 5, backoff: float = 2.0, max_backoff: float = 300.0,
+                 poll_interval: float = 0.5, visibility_timeout: float = 300.0):
+        """
+        Initialize the queue.
+
+        Args:
+            name (str): Queue name, used for thread names and logging
+            path (str): Path of the SQLite file holding the queue
+            handler (Callable[[Any], None]): Called with each job payload; raising marks the attempt failed
+            workers (int): Number of worker threads
+            max_attempts (int): Attempts before a job is dead-lettered
+            backoff (float): Base retry delay in seconds, doubled on every attempt
+            max_backoff (float): Upper bound on the retry delay in seconds
+            poll_interval (float): How long idle workers sleep between polls
+            visibility_timeout (float): Seconds after which an unfinished claim is retried
+        """
+        self.name = name
+        self.path = path
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {'enqueued': 0, 'processed': 0, 'retried': 0, 'dead_lettered': 0}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL, '
+            'claimed_at REAL, last_error TEXT, created_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_jobs_available_at ON jobs (available_at)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS dead_letters ('
+            'id INTEGER PRIMARY KEY, payload TEXT NOT NULL, attempts INTEGER NOT NULL, '
+            'last_error TEXT, created_at REAL NOT NULL, failed_at REAL NOT NULL)'
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection to the queue file"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def enqueue(self, payload: Any) -> int:
+        """
+        Persist a job and wake a worker.
+
+        Args:
+            payload (Any): JSON-serializable job payload
+
+        Returns:
+            int: Job id
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO jobs (payload, available_at, created_at) VALUES (?, ?, ?)',
+            (json.dumps(payload, ensure_ascii=False), now, now)
+        )
+        self._count('enqueued')
+        with self._wakeup:
+            self._wakeup.notify()
+        return cursor.lastrowid
+
+    def _claim(self) -> Optional[tuple]:
+        """Atomically claim the oldest job that is due"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT id, payload, attempts, created_at FROM jobs '
+                'WHERE available_at <= ? AND (claimed_at IS NULL OR claimed_at <= ?) '
+                'ORDER BY available_at, id LIMIT 1',
+                (now, now - self.visibility_timeout)
+            ).fetchone()
+            if row is not None:
+                conn.execute('UPDATE jobs SET claimed_at = ?, attempts = attempts + 1 WHERE id = ?', (now, row[0]))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def _complete(self, job_id: int) -> None:
+        self._connection().execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        self._count('processed')
+
+    def _fail(self, job_id: int, payload: str, attempts: int, created_at: float, error: str) -> None:
+        conn = self._connection()
+        if attempts >= self.max_attempts:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'INSERT INTO dead_letters (id, payload, attempts, last_error, created_at, failed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, payload, attempts, error, created_at, time.time())
+            )
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+            conn.execute('COMMIT')
+            self._count('dead_lettered')
+            logger.warning("%s job %s moved to dead letters after %s attempts", self.name, job_id, attempts)
+            return
+
+        delay = min(self.max_backoff, self.backoff * (2 ** (attempts - 1)))
+        delay *= random.uniform(0.5, 1.5)
+        conn.execute(
+            'UPDATE jobs SET claimed_at = NULL, available_at = ?, last_error = ? WHERE id = ?',
+            (time.time() + delay, error, job_id)
+        )
+        self._count('retried')
+        logger.warning("%s job %s failed (attempt %s), retrying in %.1fs", self.name, job_id, attempts, delay)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.error("%s queue claim error: %s", self.name, e)
+                job = None
+
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            job_id, payload, attempts, created_at = job
+            attempts += 1
+            # Every log line of the job, across retries, carries the same id
+            token = new_correlation_id(f"{self.name}-{job_id}")
+            try:
+                self._handle(job_id, payload, attempts, created_at)
+            finally:
+                correlation_id.reset(token)
+
+    def _handle(self, job_id: int, payload: str, attempts: int, created_at: float) -> None:
+        try:
+            self.handler(json.loads(payload))
+        except Exception as e:
+            logger.error("Error in %s job %s: %s", self.name, job_id, e)
+            try:
+                self._fail(job_id, payload, attempts, created_at, f"{type(e).__name__}: {e}")
+            except sqlite3.Error as db_error:
+                logger.error("%s queue error recording failure: %s", self.name, db_error)
+            return
+
+        try:
+            self._complete(job_id)
+        except sqlite3.Error as e:
+            logger.error("%s queue error completing job %s: %s", self.name, job_id, e)
+
+    def start(self) -> None:
+        """Start the worker threads"""
+        if self._threads:
+            return
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("%s queue started with %s workers", self.name, self.workers)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the worker threads, letting in-flight jobs finish"""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def init_app(self, app) -> None:
+        """Run every job inside the Flask application context and start the workers"""
+        handler = self.handler
+
+        def handler_with_app_context(payload):
+            with app.app_context():
+                handler(payload)
+
+        self.handler = handler_with_app_context
+        self.start()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth, dead-letter count and processing counters"""
+        conn = self._connection()
+        stats = {
+            'pending': conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0],
+            'dead_letters': conn.execute('SELECT COUNT(*) FROM dead_letters').fetchone()[0],
+            'workers': len(self._threads)
+        }
+        with self._stats_lock:
+            stats.update(self._stats)
+        return stats
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Knowledge base files, in the order the periods are listed
+KNOWLEDGE_FILES = [
+    'ancient_egypt.json',
+    'graeco_roman.json',
+    'islamic_ottoman.json',
+    'modern_egypt.json'
+]
+
+
+def _default_knowledge_dir() -> str:
+    """backend/knowledge_base if it exists (e.g. copied into a container), else the repository's knowledge_base"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    candidates = [os.path.join(backend_dir, 'knowledge_base'), os.path.join(os.path.dirname(backend_dir), 'knowledge_base')]
+    for candidate in candidates:
+        if os.path.isdir(candidate):
+            return candidate
+    return candidates[0]
+
+
+def serialize(payload: Any) -> Tuple[bytes, str]:
+    """
+    Serialize a JSON response body once, with its ETag.
+
+    Args:
+        payload (Any): JSON-serializable value
+
+    Returns:
+        Tuple[bytes, str]: UTF-8 body and a strong ETag derived from it
+    """
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return body, hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class _Period:
+    """A loaded knowledge file and its pre-serialized /knowledge/<period> response"""
+    __slots__ = ('mtime', 'data', 'body', 'etag')
+
+    def __init__(self, mtime: Optional[float], data: Dict[str, Any], period: str):
+        self.mtime = mtime
+        self.data = data
+        self.body, self.etag = serialize({'period': period, 'data': data})
+
+
+class KnowledgeBase:
+    """
+    The historical knowledge base, parsed once and kept in memory.
+
+    Each period file is loaded on first use and reloaded only when its mtime
+    changes; mtimes are checked at most once per check_interval seconds. The period
+    list and the JSON bodies of the knowledge endpoints are precomputed, so serving
+    them costs no parsing or serialization.
+    """
+
+    def __init__(self, directory: Optional[str] = None, files: List[str] = KNOWLEDGE_FILES,
+                 check_interval: float = Config.KNOWLEDGE_RELOAD_CHECK_SECONDS):
+        """
+        Initialize the knowledge base.
+
+        Args:
+            directory (str): Directory holding the JSON files
+            files (List[str]): File names, one per period
+            check_interval (float): Minimum seconds between mtime checks of a file
+        """
+        self.directory = directory or Config.KNOWLEDGE_BASE_DIR or _default_knowledge_dir()
+        self.check_interval = check_interval
+        self.period_names = [filename.replace('.json', '') for filename in files]
+        self.periods_body, self.periods_etag = serialize({'periods': self.period_names, 'count': len(self.period_names)})
+        # Incremented whenever a period is (re)loaded, so derived data knows when to rebuild
+        self.version = 0
+        self._periods = {}
+        self._checked_at = {}
+        self._all = None
+        self._all_version = -1
+        self._lock = threading.Lock()
+
+    def _path(self, period: str) -> str:
+        return os.path.join(self.directory, f"{period}.json")
+
+    def _mtime(self, period: str) -> Optional[float]:
+        try:
+            return os.stat(self._path(period)).st_mtime
+        except OSError:
+            return None
+
+    def _load(self, period: str) -> _Period:
+        """Get a period, (re)loading it if its file changed since it was last read"""
+        now = time.monotonic()
+        entry = self._periods.get(period)
+        if entry is not None and now - self._checked_at.get(period, 0.0) < self.check_interval:
+            return entry
+
+        with self._lock:
+            entry = self._periods.get(period)
+            mtime = self._mtime(period)
+            self._checked_at[period] = now
+            if entry is not None and entry.mtime == mtime:
+                return entry
+
+            data = {}
+            if mtime is not None:
+                try:
+                    with open(self._path(period), 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except Exception as e:
+                    logger.error("Error loading %s.json: %s", period, e)
+                    if entry is not None:
+                        # Keep serving the last good copy, e.g. while the file is being rewritten
+                        return entry
+
+            entry = _Period(mtime, data, period)
+            self._periods[period] = entry
+            self.version += 1
+            if mtime is not None:
+                logger.info("Loaded knowledge period %s", period)
+            return entry
+
+    def has_period(self, period: str) -> bool:
+        return period in self.period_names
+
+    def get(self, period: str) -> Dict[str, Any]:
+        """
+        Get the parsed document of a period.
+
+        Args:
+            period (str): Period key, e.g. 'ancient_egypt'
+
+        Returns:
+            Dict[str, Any]: Parsed JSON, empty if the file is missing
+        """
+        return self._load(period).data
+
+    def period_response(self, period: str) -> Tuple[bytes, str]:
+        """Pre-serialized body and ETag of /knowledge/<period>"""
+        entry = self._load(period)
+        return entry.body, entry.etag
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        """Get every period's document, keyed by period"""
+        return {period: self.get(period) for period in self.period_names}
+
+    def all_response(self) -> Tuple[bytes, str]:
+        """Pre-serialized body and ETag of /knowledge, rebuilt only after a reload"""
+        knowledge = self.all()
+        with self._lock:
+            if self._all is None or self._all_version != self.version:
+                self._all = serialize(knowledge)
+                self._all_version = self.version
+            return self._all
+
+    def preload(self) -> None:
+        """Load every period now instead of on first use"""
+        for period in self.period_names:
+            self._load(period)
+
+
+# Global instance shared by the knowledge routes and the knowledge index
+knowledge_base = KnowledgeBase()
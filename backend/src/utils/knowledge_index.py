@@ -0,0 +1,222 @@
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Tuple
+from src.config import Config
+from src.utils.knowledge_base import knowledge_base
+from src.utils.query_analysis import COMMON_WORDS, normalize
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no retrieval signal for questions about Egyptian history
+STOPWORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with',
+    'by', 'about', 'tell', 'me', 'what', 'how', 'when', 'where', 'why', 'who', 'which',
+    'can', 'could', 'would', 'should', 'will', 'was', 'were', 'is', 'are', 'am', 'be',
+    'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'get', 'got', 'give',
+    'from', 'that', 'this', 'these', 'those', 'it', 'its', 'as', 'during', 'egypt', 'egyptian'
+} | {normalize(word) for word in COMMON_WORDS}
+
+# The knowledge base is written in English, so Arabic names and terms in a question
+# are looked up under their English index terms
+ARABIC_GLOSSARY = {
+    'مصر': 'egypt', 'مصر القديمة': 'ancient', 'الدولة القديمة': 'old kingdom', 'الدولة الوسطى': 'middle kingdom',
+    'الدولة الحديثة': 'new kingdom', 'الأسرة': 'dynasty', 'فرعون': 'pharaoh', 'فراعنة': 'pharaoh',
+    'أهرام': 'pyramid', 'هرم': 'pyramid', 'أبو الهول': 'sphinx', 'هيروغليف': 'hieroglyph', 'النيل': 'nile',
+    'خوفو': 'khufu', 'حتشبسوت': 'hatshepsut', 'أخناتون': 'akhenaten', 'نفرتيتي': 'nefertiti',
+    'توت عنخ آمون': 'tutankhamun', 'رمسيس': 'ramesses ramses', 'الجيزة': 'giza', 'سقارة': 'saqqara',
+    'الأقصر': 'luxor', 'الكرنك': 'karnak', 'طيبة': 'thebes', 'منف': 'memphis',
+    'الإسكندر': 'alexander', 'الإسكندرية': 'alexandria', 'البطالمة': 'ptolemaic', 'البطلمي': 'ptolemaic',
+    'بطليموس': 'ptolemy', 'كليوباترا': 'cleopatra', 'يوليوس قيصر': 'julius caesar', 'أنطونيو': 'antony',
+    'أوكتافيوس': 'octavian', 'الرومان': 'roman', 'الروماني': 'roman', 'المكتبة': 'library',
+    'المنارة': 'lighthouse pharos', 'إقليدس': 'euclid', 'إراتوستينس': 'eratosthenes', 'فيلون': 'philo',
+    'قبطي': 'coptic', 'أقباط': 'coptic', 'المسيحية': 'christianity',
+    'الفتح العربي': 'arab conquest', 'عمرو بن العاص': 'amr', 'الأموي': 'umayyad', 'العباسي': 'abbasid',
+    'الفاطمي': 'fatimid', 'الفاطميين': 'fatimid', 'المعز لدين الله': 'izz', 'الحاكم بأمر الله': 'hakim',
+    'الأزهر': 'azhar', 'القاهرة': 'cairo', 'القلعة': 'citadel', 'صلاح الدين': 'saladin', 'الأيوبي': 'ayyubid',
+    'الأيوبيين': 'ayyubid', 'المماليك': 'mamluk', 'مملوك': 'mamluk', 'بيبرس': 'baibars',
+    'قلاوون': 'qalawun', 'العثماني': 'ottoman', 'العثمانية': 'ottoman', 'العثمانيين': 'ottoman',
+    'نابليون': 'napoleon', 'الحملة الفرنسية': 'french campaign', 'محمد علي': 'muhammad ali',
+    'إسماعيل': 'ismail', 'قناة السويس': 'suez canal', 'السويس': 'suez', 'بريطاني': 'british',
+    'فؤاد': 'fuad', 'فاروق': 'farouk', 'ثورة': 'revolution', 'عبد الناصر': 'nasser', 'ناصر': 'nasser',
+    'السد العالي': 'aswan high dam', 'أسوان': 'aswan', 'العدوان الثلاثي': 'suez crisis',
+    'الجمهورية العربية المتحدة': 'united arab republic', 'حرب الأيام الستة': 'six day war',
+    'النكسة': 'six day war', 'حرب أكتوبر': 'october war', 'السادات': 'sadat', 'كامب ديفيد': 'camp david',
+    'مبارك': 'mubarak', 'مرسي': 'morsi', 'السيسي': 'sisi'
+}
+
+_TOKEN_RE = re.compile(r'\w+')
+_GLOSSARY = {normalize(arabic): english for arabic, english in ARABIC_GLOSSARY.items()}
+_GLOSSARY_RE = re.compile('|'.join(re.escape(term) for term in sorted(_GLOSSARY, key=len, reverse=True)))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms: normalized words without stopwords, with simple plural
+    folding. Arabic names and terms in the glossary become their English index terms.
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        List[str]: Index terms in order of appearance
+    """
+    text = _GLOSSARY_RE.sub(lambda match: f" {_GLOSSARY[match.group(0)]} ", normalize(text))
+    terms = []
+    for word in _TOKEN_RE.findall(text):
+        if word in STOPWORDS or (len(word) < 3 and not word.isdigit()):
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def _humanize(key: str) -> str:
+    return key.replace('_', ' ').title()
+
+
+def flatten_period(period_key: str, data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Flatten one knowledge base document into self-contained passages.
+
+    Every object becomes a passage made of its scalar fields and lists of strings;
+    nested objects and the entries of lists of objects (rulers, events, scholars)
+    become passages of their own, titled with their breadcrumb.
+
+    Args:
+        period_key (str): Knowledge base period key (e.g. 'modern_egypt')
+        data (Dict[str, Any]): Parsed JSON document for the period
+
+    Returns:
+        List[Dict[str, str]]: Passages with 'period', 'path', 'title' and 'text' keys
+    """
+    passages = []
+    root_title = data.get('period') if isinstance(data.get('period'), str) else _humanize(period_key)
+
+    def visit(node: Dict[str, Any], path: List[str], title: List[str]):
+        facts = []
+        for key, value in node.items():
+            if isinstance(value, dict):
+                visit(value, path + [key], title + [_humanize(key)])
+            elif isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+                for index, item in enumerate(value):
+                    name = item.get('name') or item.get('event') or _humanize(key)
+                    visit(item, path + [key, str(index)], title + [str(name)])
+            elif isinstance(value, list):
+                facts.append(f"{_humanize(key)}: {', '.join(str(item) for item in value)}")
+            elif value not in (None, ''):
+                facts.append(f"{_humanize(key)}: {value}")
+
+        if facts:
+            passages.append({
+                'period': period_key,
+                'path': '.'.join(path),
+                'title': ' > '.join(title),
+                'text': '; '.join(facts)
+            })
+
+    visit(data, [], [root_title])
+    return passages
+
+
+class KnowledgeIndex:
+    """
+    An in-memory BM25 inverted index over the passages of the local knowledge base,
+    used to ground the Chronicler's answers without a network round-trip.
+    """
+
+    def __init__(self, knowledge: Dict[str, Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        """
+        Build the index.
+
+        Args:
+            knowledge (Dict[str, Dict[str, Any]]): Period key to parsed JSON document
+            k1 (float): BM25 term frequency saturation
+            b (float): BM25 document length normalization
+        """
+        self.passages = []
+        for period_key, data in knowledge.items():
+            if isinstance(data, dict):
+                self.passages.extend(flatten_period(period_key, data))
+
+        postings = defaultdict(list)
+        lengths = []
+        self._vocabularies = []
+        for doc_id, passage in enumerate(self.passages):
+            terms = tokenize(f"{passage['title']} {passage['text']}")
+            lengths.append(len(terms))
+            self._vocabularies.append(frozenset(terms))
+            for term, frequency in Counter(terms).items():
+                postings[term].append((doc_id, frequency))
+
+        count = len(self.passages)
+        average_length = (sum(lengths) / count) if count else 0.0
+
+        # Precompute per-posting BM25 weights so a query is a sum over postings
+        self._postings = {}
+        for term, entries in postings.items():
+            idf = math.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+            self._postings[term] = [
+                (doc_id, idf * frequency * (k1 + 1) /
+                 (frequency + k1 * (1 - b + b * lengths[doc_id] / average_length)))
+                for doc_id, frequency in entries
+            ]
+
+    def _rank(self, query_terms, k: int) -> List[Tuple[int, float]]:
+        scores = defaultdict(float)
+        for term in query_terms:
+            for doc_id, weight in self._postings.get(term, ()):
+                scores[doc_id] += weight
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def retrieve(self, user_message: str, k: int = Config.KNOWLEDGE_TOP_K,
+                 min_score: float = Config.KNOWLEDGE_MIN_SCORE,
+                 min_coverage: float = Config.KNOWLEDGE_MIN_COVERAGE) -> Tuple[List[Tuple[float, Dict[str, str]]], bool]:
+        """
+        Find the passages for a question and judge whether local recall is strong.
+
+        Local recall counts as strong when the best passage scores at least ``min_score``
+        and contains at least ``min_coverage`` of the query terms.
+
+        Args:
+            user_message (str): User's message/question
+            k (int): Maximum number of passages to return
+            min_score (float): Minimum BM25 score of the best passage
+            min_coverage (float): Minimum fraction of query terms found in the best passage
+
+        Returns:
+            Tuple[List[Tuple[float, Dict[str, str]]], bool]: (score, passage) pairs, best
+            first, and whether local recall was strong enough to skip remote lookups
+        """
+        query_terms = set(tokenize(user_message))
+        ranked = self._rank(query_terms, k)
+        if not ranked:
+            return [], False
+
+        best_doc_id, best_score = ranked[0]
+        coverage = len(query_terms & self._vocabularies[best_doc_id]) / len(query_terms)
+        return [(score, self.passages[doc_id]) for doc_id, score in ranked], best_score >= min_score and coverage >= min_coverage
+
+
+_knowledge_index = None
+_knowledge_index_version = -1
+_knowledge_index_lock = threading.Lock()
+
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """Get the shared knowledge index, building it on first use and rebuilding it after the knowledge base reloads"""
+    global _knowledge_index, _knowledge_index_version
+    # Reading the documents picks up changed files and bumps the version
+    knowledge = knowledge_base.all()
+    if _knowledge_index is None or _knowledge_index_version != knowledge_base.version:
+        with _knowledge_index_lock:
+            if _knowledge_index is None or _knowledge_index_version != knowledge_base.version:
+                version = knowledge_base.version
+                index = KnowledgeIndex(knowledge)
+                logger.info("Knowledge index built: %s passages", len(index.passages))
+                _knowledge_index, _knowledge_index_version = index, version
+    return _knowledge_index
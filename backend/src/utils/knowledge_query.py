@@ -0,0 +1,264 @@
+import bisect
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from src.utils.knowledge_base import knowledge_base
+
+_ERA = r'(BCE|BC|CE|AD)'
+_RANGE_RE = re.compile(rf'(\d+)\s*{_ERA}?\s*[-–]\s*(\d+|present)\s*{_ERA}?', re.IGNORECASE)
+_YEAR_WITH_ERA_RE = re.compile(rf'(\d+)\s*{_ERA}', re.IGNORECASE)
+_BARE_YEAR_RE = re.compile(r'(?<!\d)(-?\d{3,4})(?!\d)')
+
+# Fields whose values say when something happened
+DATE_FIELDS = ('reign', 'period', 'timeframe', 'date')
+# Lists whose entries are rulers even when they carry no reign of their own
+RULER_LIST_KEYS = {'rulers', 'notable_rulers'}
+# Common spellings of ruler names, mapped to the knowledge base's spelling
+RULER_ALIASES = {
+    'ramses': 'ramesses', 'rameses': 'ramesses', 'ramsis': 'ramesses',
+    'tutankhamen': 'tutankhamun', 'tutankhamon': 'tutankhamun',
+    'akhenaton': 'akhenaten', 'akhnaton': 'akhenaten',
+    'thutmosis': 'thutmose', 'tuthmosis': 'thutmose', 'tuthmose': 'thutmose',
+    'sesostris': 'senusret', 'senwosret': 'senusret', 'amenemhet': 'amenemhat',
+    'cheops': 'khufu', 'chephren': 'khafre', 'khafra': 'khafre', 'mycerinus': 'menkaure',
+    'mohamed': 'muhammad', 'mohammed': 'muhammad', 'mohammad': 'muhammad', 'muhammed': 'muhammad',
+    'farouq': 'farouk', 'faruk': 'farouk', 'faruq': 'farouk', 'fouad': 'fuad', 'ismael': 'ismail',
+    'salahuddin': 'saladin', 'baybars': 'baibars', 'qalawoon': 'qalawun', 'qalaun': 'qalawun'
+}
+# Shorter query words, such as the numeral in "Ptolemy I", must match a whole name word
+MIN_PREFIX_CHARS = 4
+
+_missing = object()
+
+
+def _signed(year: str, era: Optional[str]) -> int:
+    return -int(year) if era and era.upper() in ('BCE', 'BC') else int(year)
+
+
+def parse_year_range(text: Any) -> Optional[Tuple[int, int]]:
+    """
+    Parse a knowledge base date such as 'c. 3100-2686 BCE', '30 BCE - 641 CE',
+    '1805 - Present' or 'July 23, 1952'. Years BCE are negative.
+
+    Args:
+        text (Any): Value of a reign/period/timeframe/date field
+
+    Returns:
+        Optional[Tuple[int, int]]: First and last year, or None if no year was found
+    """
+    if not isinstance(text, str):
+        return None
+
+    match = _RANGE_RE.search(text)
+    if match:
+        start, start_era, end, end_era = match.groups()
+        # 'c. 3100-2686 BCE' puts one era after both years
+        start_era = start_era or end_era
+        end_era = end_era or start_era
+        first = _signed(start, start_era)
+        last = datetime.utcnow().year if end.lower() == 'present' else _signed(end, end_era)
+        return (first, last) if first <= last else (last, first)
+
+    match = _YEAR_WITH_ERA_RE.search(text) or _BARE_YEAR_RE.search(text)
+    if match:
+        year = _signed(match.group(1), match.group(2) if match.re is _YEAR_WITH_ERA_RE else None)
+        return year, year
+    return None
+
+
+def parse_year(text: Optional[str]) -> Optional[int]:
+    """
+    Parse a year query parameter such as '1805', '-300', '300BCE' or '300 BC'.
+
+    Raises:
+        ValueError: If text is not a year
+    """
+    if text is None or text == '':
+        return None
+    match = re.fullmatch(rf'\s*(-?\d+)\s*{_ERA}?\s*', text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid year: {text}")
+    return _signed(match.group(1), match.group(2))
+
+
+def parse_field(field: str) -> List[str]:
+    """
+    Split a dotted path ('muhammad_ali_dynasty.rulers.0') or a JSON pointer
+    ('/muhammad_ali_dynasty/rulers/0') into its keys.
+    """
+    if field.startswith('/'):
+        return [part.replace('~1', '/').replace('~0', '~') for part in field[1:].split('/')]
+    return [part for part in field.split('.') if part]
+
+
+class PeriodIndex:
+    """
+    Lookup tables over one period document, built once per load: every node by
+    path, rulers by name token (with the tokens sorted for prefix lookups), and
+    dated entries sorted by first year.
+    """
+
+    def __init__(self, period: str, data: Dict[str, Any]):
+        self.period = period
+        self.nodes = {}
+        self.rulers = []
+        self.ruler_tokens = {}
+        dated = []
+
+        def visit(node: Any, path: Tuple[str, ...], container_years: Optional[Tuple[int, int]], list_key: Optional[str]):
+            self.nodes[path] = node
+            if isinstance(node, dict):
+                when_field = next((f for f in DATE_FIELDS if parse_year_range(node.get(f))), None)
+                years = parse_year_range(node[when_field]) if when_field else None
+                if years and path:
+                    title = node.get('name') or node.get('event') or path[-1].replace('_', ' ').title()
+                    dated.append((years[0], years[1], {
+                        'period': period,
+                        'path': '.'.join(path),
+                        'title': str(title),
+                        'when': node[when_field],
+                        'start': years[0],
+                        'end': years[1]
+                    }))
+                if 'name' in node and (list_key in RULER_LIST_KEYS or 'reign' in node):
+                    reign_years = parse_year_range(node.get('reign')) or container_years
+                    self._add_ruler(dict(node, period=period, path='.'.join(path),
+                                         start=reign_years[0] if reign_years else None,
+                                         end=reign_years[1] if reign_years else None))
+                for key, value in node.items():
+                    visit(value, path + (key,), years or container_years, None)
+            elif isinstance(node, list):
+                for position, item in enumerate(node):
+                    if isinstance(item, str) and path and path[-1] in RULER_LIST_KEYS:
+                        # Rulers listed by name only take the years of their section
+                        self._add_ruler({
+                            'name': item,
+                            'period': period,
+                            'path': '.'.join(path + (str(position),)),
+                            'start': container_years[0] if container_years else None,
+                            'end': container_years[1] if container_years else None
+                        })
+                    visit(item, path + (str(position),), container_years, path[-1] if path else None)
+
+        visit(data, (), parse_year_range(data.get('timeframe')) if isinstance(data, dict) else None, None)
+        dated.sort(key=lambda entry: (entry[0], entry[1]))
+        self.dated_starts = [entry[0] for entry in dated]
+        self.dated = [entry[2] for entry in dated]
+        # No entry starting more than this before a year can still be running in it
+        self.max_span = max((entry[1] - entry[0] for entry in dated), default=0)
+        self.sorted_tokens = sorted(self.ruler_tokens)
+
+    def _add_ruler(self, ruler: Dict[str, Any]) -> None:
+        ruler_id = len(self.rulers)
+        self.rulers.append(ruler)
+        for token in re.findall(r'\w+', str(ruler['name']).lower()):
+            self.ruler_tokens.setdefault(token, set()).add(ruler_id)
+
+    def select(self, keys: List[str]) -> Any:
+        """Node at the given path, or a sentinel if there is none"""
+        return self.nodes.get(tuple(keys), _missing)
+
+    def _ruler_ids(self, token: str) -> set:
+        """Rulers with a name word that is token, or starts with it if token is long enough"""
+        token = RULER_ALIASES.get(token, token)
+        if len(token) < MIN_PREFIX_CHARS:
+            return self.ruler_tokens.get(token, set())
+        ruler_ids = set()
+        position = bisect.bisect_left(self.sorted_tokens, token)
+        while position < len(self.sorted_tokens) and self.sorted_tokens[position].startswith(token):
+            ruler_ids |= self.ruler_tokens[self.sorted_tokens[position]]
+            position += 1
+        return ruler_ids
+
+    def find_rulers(self, name: Optional[str], start: Optional[int], end: Optional[int]) -> List[Dict[str, Any]]:
+        """Rulers whose names match every word of name and whose reign overlaps [start, end]"""
+        ruler_ids = set(range(len(self.rulers)))
+        for token in re.findall(r'\w+', (name or '').lower()):
+            ruler_ids &= self._ruler_ids(token)
+        rulers = [self.rulers[ruler_id] for ruler_id in sorted(ruler_ids)]
+        if start is None and end is None:
+            return rulers
+        return [ruler for ruler in rulers if ruler['start'] is not None and _overlaps(ruler['start'], ruler['end'], start, end)]
+
+    def find_dated(self, start: Optional[int], end: Optional[int]) -> List[Dict[str, Any]]:
+        """Dated entries overlapping [start, end], ordered by first year"""
+        first = 0 if start is None else bisect.bisect_left(self.dated_starts, start - self.max_span)
+        stop = len(self.dated) if end is None else bisect.bisect_right(self.dated_starts, end)
+        return [entry for entry in self.dated[first:stop] if start is None or entry['end'] >= start]
+
+
+def _overlaps(first: int, last: int, start: Optional[int], end: Optional[int]) -> bool:
+    return (start is None or last >= start) and (end is None or first <= end)
+
+
+def paginate(items: List[Any], offset: int, limit: int) -> Dict[str, Any]:
+    """One page of items with the paging metadata"""
+    return {
+        'items': items[offset:offset + limit],
+        'total': len(items),
+        'offset': offset,
+        'limit': limit,
+        'has_more': offset + limit < len(items)
+    }
+
+
+class KnowledgeQuery:
+    """Field selection, pagination and ruler/year filters over the loaded knowledge base"""
+
+    def __init__(self, knowledge=knowledge_base):
+        self.knowledge = knowledge
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def index(self, period: str) -> PeriodIndex:
+        """Get the index of a period, rebuilding it after the period reloads"""
+        data = self.knowledge.get(period)
+        cached = self._indexes.get(period)
+        if cached is not None and cached[0] is data:
+            return cached[1]
+        with self._lock:
+            cached = self._indexes.get(period)
+            if cached is None or cached[0] is not data:
+                cached = (data, PeriodIndex(period, data))
+                self._indexes[period] = cached
+            return cached[1]
+
+    def select(self, period: str, field: str) -> Any:
+        """
+        Get one field of a period.
+
+        Args:
+            period (str): Period key
+            field (str): Dotted path or JSON pointer
+
+        Returns:
+            Any: The selected value
+
+        Raises:
+            KeyError: If the field does not exist
+        """
+        value = self.index(period).select(parse_field(field))
+        if value is _missing:
+            raise KeyError(field)
+        return value
+
+    def _periods(self, period: Optional[str]) -> List[str]:
+        return [period] if period else self.knowledge.period_names
+
+    def rulers(self, name: Optional[str] = None, start: Optional[int] = None, end: Optional[int] = None,
+               period: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Rulers matching a name and/or reigning during a year range, across periods"""
+        return [ruler for p in self._periods(period) for ruler in self.index(p).find_rulers(name, start, end)]
+
+    def timeline(self, start: Optional[int] = None, end: Optional[int] = None,
+                 period: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Dated sections, reigns and events overlapping a year range, across periods"""
+        entries = [entry for p in self._periods(period) for entry in self.index(p).find_dated(start, end)]
+        if period is None:
+            entries.sort(key=lambda entry: (entry['start'], entry['end']))
+        return entries
+
+
+# Global instance used by the knowledge routes
+knowledge_query = KnowledgeQuery()
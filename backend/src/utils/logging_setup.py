@@ -0,0 +1,166 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+from src.config import Config
+
+# Correlation id of the request or job being handled by the current thread/context
+correlation_id = contextvars.ContextVar('correlation_id', default=None)
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'correlation_id'}
+
+_listener = None
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamps each record with the current correlation id"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Lets through only a sample of DEBUG records, which carry payload dumps"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps the traceback apart from the message so formatters can place it"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the level, logger, message, correlation id and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        if getattr(record, 'correlation_id', None):
+            entry['correlation_id'] = record.correlation_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = Config.LOG_LEVEL, fmt: str = Config.LOG_FORMAT,
+                  debug_sample_rate: float = Config.LOG_DEBUG_SAMPLE_RATE) -> None:
+    """
+    Route the application's loggers through a queue to a background writer.
+
+    Callers only enqueue records, so logging never blocks a request on stdout.
+    Records below ``level`` are dropped before they are formatted, and DEBUG
+    records are sampled at ``debug_sample_rate``.
+
+    Args:
+        level (str): Minimum level, e.g. 'INFO' or 'DEBUG'
+        fmt (str): 'json' for structured records or 'text' for human-readable lines
+        debug_sample_rate (float): Fraction of DEBUG records kept
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if fmt == 'json':
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(correlation_id)s] %(name)s: %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+    queue_handler.addFilter(CorrelationIdFilter())
+
+    logger = logging.getLogger('src')
+    logger.setLevel(level.upper())
+    logger.handlers = [queue_handler]
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def new_correlation_id(value: Optional[str] = None) -> contextvars.Token:
+    """
+    Set the correlation id for the current context.
+
+    Args:
+        value (str): Id to use, e.g. an incoming X-Request-ID; a random one is generated otherwise
+
+    Returns:
+        contextvars.Token: Token to pass to correlation_id.reset()
+    """
+    return correlation_id.set(value or uuid.uuid4().hex[:16])
+
+
+def in_current_context(iterable: Iterable) -> Iterator:
+    """
+    Iterate in a copy of the caller's context, so a streamed response body logs
+    with the correlation id of the request that created it.
+    """
+    context = contextvars.copy_context()
+    iterator = iter(iterable)
+
+    def generate():
+        while True:
+            try:
+                item = context.run(next, iterator)
+            except StopIteration:
+                return
+            yield item
+
+    return generate()
+
+
+def init_app(app) -> None:
+    """Give every request a correlation id, taken from X-Request-ID when the client sends one"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request():
+        g.correlation_token = new_correlation_id(request.headers.get('X-Request-ID'))
+
+    @app.after_request
+    def _tag_response(response):
+        response.headers['X-Request-ID'] = correlation_id.get() or ''
+        return response
+
+    @app.teardown_request
+    def _end_request(exc):
+        token = g.pop('correlation_token', None)
+        if token is not None:
+            correlation_id.reset(token)
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from src.config import Config
+from src.utils.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Parameters of every action=query request
+QUERY_PARAMS = {'action': 'query', 'format': 'json', 'formatversion': 2}
+
+
+class MediaWikiError(Exception):
+    """Raised when the API answers with an error object or an unusable response"""
+
+
+class WikiPage:
+    """One page of a MediaWiki reply"""
+    __slots__ = ('pageid', 'title', 'extract', 'rank', 'disambiguation')
+
+    def __init__(self, pageid: Optional[int], title: str, extract: Optional[str], rank: int, disambiguation: bool):
+        self.pageid = pageid
+        self.title = title
+        self.extract = extract
+        self.rank = rank
+        self.disambiguation = disambiguation
+
+    @classmethod
+    def from_api(cls, page: Dict[str, Any]) -> 'WikiPage':
+        return cls(
+            pageid=page.get('pageid'),
+            title=page['title'],
+            extract=(page.get('extract') or '').strip() or None,
+            # Search hits carry their rank in 'index'
+            rank=page.get('index', 0),
+            disambiguation='disambiguation' in page.get('pageprops', {})
+        )
+
+
+class MediaWikiClient:
+    """
+    Client for the MediaWiki action API.
+
+    A search and the intro extracts of its hits come back from one request
+    (generator=search + prop=extracts), so a lookup costs a single round trip.
+    The language is chosen per call, which keeps concurrent English and Arabic
+    lookups independent. Requests share a pooled keep-alive session, and
+    ``api_url`` can point at a local fixture server.
+    """
+
+    def __init__(self, api_url: str = Config.WIKIPEDIA_API_URL,
+                 connect_timeout: float = Config.WIKIPEDIA_CONNECT_TIMEOUT_SECONDS,
+                 read_timeout: float = Config.WIKIPEDIA_READ_TIMEOUT_SECONDS,
+                 user_agent: str = Config.WIKIPEDIA_USER_AGENT,
+                 pool_size: int = Config.WIKIPEDIA_MAX_WORKERS):
+        """
+        Initialize the client.
+
+        Args:
+            api_url (str): URL of api.php; '{language}' is replaced by the language of each call
+            connect_timeout (float): TCP/TLS connect timeout in seconds
+            read_timeout (float): Response read timeout in seconds
+            user_agent (str): User-Agent sent with every request, as Wikimedia asks of API clients
+            pool_size (int): Maximum pooled connections per host
+        """
+        self.api_url = api_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        # Async mode keeps one httpx client per event loop
+        self._async_sessions = weakref.WeakKeyDictionary()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "User-Agent": user_agent,
+            "Accept-Encoding": "gzip"
+        })
+
+        self._lock = threading.Lock()
+        self._latency = LatencyHistogram()
+        self._stats = {'requests': 0, 'failures': 0}
+
+    def _record(self, started: float, succeeded: bool) -> None:
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['failures'] += not succeeded
+            self._latency.observe((time.monotonic() - started) * 1000)
+
+    @staticmethod
+    def _parse(data: Dict[str, Any]) -> List[WikiPage]:
+        if 'error' in data:
+            raise MediaWikiError(f"{data['error'].get('code')}: {data['error'].get('info')}")
+        pages = [WikiPage.from_api(page) for page in data.get('query', {}).get('pages', []) if not page.get('missing')]
+        pages.sort(key=lambda page: page.rank)
+        return pages
+
+    def _query(self, language: str, params: Dict[str, Any]) -> List[WikiPage]:
+        """
+        Run an action=query request and parse its pages.
+
+        Raises:
+            MediaWikiError: If the request fails or the API reports an error
+        """
+        params = dict(params, **QUERY_PARAMS)
+        started = time.monotonic()
+        succeeded = False
+        try:
+            response = self.session.get(self.api_url.format(language=language), params=params, timeout=self.timeout)
+            response.raise_for_status()
+            pages = self._parse(response.json())
+            succeeded = True
+            return pages
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise MediaWikiError(str(e)) from e
+        finally:
+            self._record(started, succeeded)
+
+    def _async_session(self):
+        """The httpx client of the running event loop, created on first use"""
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        session = self._async_sessions.get(loop)
+        if session is None:
+            session = httpx.AsyncClient(
+                headers=dict(self.session.headers),
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+            self._async_sessions[loop] = session
+        return session
+
+    async def aclose(self) -> None:
+        """Close the running event loop's httpx client, if one was opened"""
+        session = self._async_sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.aclose()
+
+    async def _query_async(self, language: str, params: Dict[str, Any]) -> List[WikiPage]:
+        """
+        Run an action=query request without blocking the event loop.
+
+        Raises:
+            MediaWikiError: If the request fails or the API reports an error
+        """
+        import httpx
+
+        params = dict(params, **QUERY_PARAMS)
+        started = time.monotonic()
+        succeeded = False
+        try:
+            response = await self._async_session().get(self.api_url.format(language=language), params=params)
+            response.raise_for_status()
+            pages = self._parse(response.json())
+            succeeded = True
+            return pages
+        except (httpx.HTTPError, ValueError) as e:
+            raise MediaWikiError(str(e)) from e
+        finally:
+            self._record(started, succeeded)
+
+    @staticmethod
+    def _search_params(query: str, limit: int, sentences: int) -> Dict[str, Any]:
+        return {
+            'generator': 'search',
+            'gsrsearch': query,
+            'gsrlimit': limit,
+            'gsrnamespace': 0,
+            'prop': 'extracts|pageprops',
+            'ppprop': 'disambiguation',
+            'exintro': 1,
+            'explaintext': 1,
+            'exsentences': sentences,
+            'exlimit': 'max',
+            'redirects': 1
+        }
+
+    def search(self, query: str, language: str = 'en', limit: int = 10, sentences: int = 2) -> List[WikiPage]:
+        """
+        Search pages and fetch the intro extract of every hit in the same request.
+
+        Args:
+            query (str): Search query
+            language (str): Wikipedia language code, e.g. 'en' or 'ar'
+            limit (int): Maximum hits, at most 20 (the extracts limit)
+            sentences (int): Sentences of each intro to return
+
+        Returns:
+            List[WikiPage]: Hits in search rank order
+
+        Raises:
+            MediaWikiError: If the request fails
+        """
+        return self._query(language, self._search_params(query, limit, sentences))
+
+    async def search_async(self, query: str, language: str = 'en', limit: int = 10, sentences: int = 2) -> List[WikiPage]:
+        """Async variant of search()"""
+        return await self._query_async(language, self._search_params(query, limit, sentences))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get request counters and the latency histogram"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['latency'] = self._latency.to_dict()
+        return stats
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict
+from cachetools import TTLCache
+from sqlalchemy.exc import IntegrityError
+from src.config import Config
+from src.models.conversation import db, ProcessedMessage
+
+logger = logging.getLogger(__name__)
+
+
+class MessageDeduplicator:
+    """
+    Drops WhatsApp messages that have already been accepted.
+
+    A bounded in-memory window answers most lookups in O(1); the unique index on
+    ProcessedMessage.message_id catches redeliveries that reach another worker or
+    arrive after a restart. Rows older than the TTL are cleaned up periodically.
+    """
+
+    def __init__(self, window_size: int = Config.WHATSAPP_DEDUP_WINDOW_SIZE,
+                 ttl: float = Config.WHATSAPP_DEDUP_TTL_SECONDS,
+                 cleanup_interval: float = Config.WHATSAPP_DEDUP_CLEANUP_INTERVAL_SECONDS):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            window_size (int): Maximum number of message ids remembered in memory
+            ttl (float): How long a message id is remembered, in seconds
+            cleanup_interval (float): Minimum seconds between deletions of expired rows
+        """
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self._window = TTLCache(maxsize=window_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._last_cleanup = time.monotonic()
+        self._stats = {'checked': 0, 'accepted': 0, 'memory_duplicates': 0, 'db_duplicates': 0, 'released': 0, 'expired_rows_deleted': 0}
+
+    def claim(self, message_id: str) -> bool:
+        """
+        Record a message id, telling whether it is new. Must run inside an app context.
+
+        Args:
+            message_id (str): WhatsApp message id (wamid)
+
+        Returns:
+            bool: True if the message has not been seen before and should be processed
+        """
+        with self._lock:
+            self._stats['checked'] += 1
+            if message_id in self._window:
+                self._stats['memory_duplicates'] += 1
+                return False
+            self._window[message_id] = True
+
+        try:
+            db.session.add(ProcessedMessage(message_id=message_id))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            with self._lock:
+                self._stats['db_duplicates'] += 1
+            return False
+        except Exception as e:
+            # Let the message through rather than lose it when the store is unavailable
+            logger.error("Error recording message id %s: %s", message_id, e)
+            db.session.rollback()
+
+        with self._lock:
+            self._stats['accepted'] += 1
+        self._cleanup_expired()
+        return True
+
+    def release(self, message_id: str) -> None:
+        """
+        Forget a claimed message id, so a redelivery of a message that could not
+        be handed on is processed. Must run inside an app context.
+
+        Args:
+            message_id (str): WhatsApp message id (wamid)
+        """
+        with self._lock:
+            self._window.pop(message_id, None)
+            self._stats['released'] += 1
+
+        try:
+            ProcessedMessage.query.filter_by(message_id=message_id).delete()
+            db.session.commit()
+        except Exception as e:
+            logger.error("Error releasing message id %s: %s", message_id, e)
+            db.session.rollback()
+
+    def _cleanup_expired(self) -> None:
+        """Delete expired rows, at most once per cleanup interval"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_cleanup < self.cleanup_interval:
+                return
+            self._last_cleanup = now
+
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+            deleted = ProcessedMessage.query.filter(ProcessedMessage.received_at < cutoff).delete()
+            db.session.commit()
+            with self._lock:
+                self._stats['expired_rows_deleted'] += deleted
+        except Exception as e:
+            logger.error("Error cleaning up processed message ids: %s", e)
+            db.session.rollback()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get duplicate-hit counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['window_size'] = len(self._window)
+        stats['duplicates'] = stats['memory_duplicates'] + stats['db_duplicates']
+        return stats
@@ -0,0 +1,189 @@
+import re
+import threading
+from typing import Iterable, List, Pattern, Tuple
+from cachetools import LRUCache
+
+# Common English and Arabic words that carry no search signal
+COMMON_WORDS = [
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with',
+    'by', 'about', 'tell', 'me', 'what', 'how', 'when', 'where', 'why', 'who', 'which',
+    'can', 'could', 'would', 'should', 'will', 'was', 'were', 'is', 'are', 'am', 'be',
+    'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'get', 'got', 'give',
+    'أخبرني', 'عن', 'ما', 'هو', 'هي', 'كيف', 'متى', 'أين', 'لماذا', 'من', 'التي', 'الذي',
+    'في', 'على', 'إلى', 'من', 'مع', 'عند', 'كان', 'كانت', 'يكون', 'تكون', 'هل', 'لا', 'نعم'
+]
+
+# Multi-word names of periods, kept whole as search terms
+EGYPTIAN_PHRASES = [
+    'ancient egypt', 'old kingdom', 'middle kingdom', 'new kingdom', 'ptolemaic period',
+    'roman egypt', 'islamic egypt', 'ottoman egypt', 'modern egypt', 'pharaonic period',
+    'coptic period', 'mamluk period', 'fatimid period', 'ayyubid period',
+    'مصر القديمة', 'الدولة القديمة', 'الدولة الوسطى', 'الدولة الحديثة', 'العصر البطلمي',
+    'مصر الرومانية', 'مصر الإسلامية', 'مصر العثمانية', 'مصر الحديثة'
+]
+
+# Words that mark a title or question as being about Egyptian history
+EGYPTIAN_KEYWORDS = [
+    'egypt', 'egyptian', 'pharaoh', 'pyramid', 'nile', 'cairo', 'alexandria',
+    'cleopatra', 'tutankhamun', 'ramses', 'ptolemy', 'hieroglyph', 'sphinx',
+    'luxor', 'karnak', 'thebes', 'memphis', 'giza', 'saqqara', 'abydos',
+    'coptic', 'mamluk', 'fatimid', 'ayyubid', 'ottoman egypt', 'muhammad ali',
+    'suez', 'aswan', 'nubia', 'kush', 'dynasty', 'kingdom egypt',
+    'مصر', 'فرعون', 'فراعنة', 'هرم', 'أهرام', 'النيل', 'القاهرة', 'الإسكندرية',
+    'كليوباترا', 'توت عنخ آمون', 'رمسيس', 'بطليموس', 'البطالمة', 'هيروغليف', 'أبو الهول',
+    'الأقصر', 'الكرنك', 'طيبة', 'منف', 'الجيزة', 'سقارة', 'أبيدوس', 'قبطي', 'أقباط',
+    'المماليك', 'الفاطمي', 'الأيوبي', 'محمد علي', 'السويس', 'أسوان', 'النوبة', 'كوش', 'الأسرة'
+]
+
+# Harakat, superscript alef and tatweel
+_ARABIC_MARKS_RE = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+# Hamza-carrying alefs fold to bare alef, alef maksura to ya, ta marbuta to ha
+_ARABIC_FOLDING = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي', 'ة': 'ه'})
+_ARABIC_CHAR_RE = re.compile(r'[\u0600-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFF]')
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize_arabic(text: str) -> str:
+    """Strip diacritics and tatweel and fold alef, ya and ta marbuta variants"""
+    return _ARABIC_MARKS_RE.sub('', text).translate(_ARABIC_FOLDING)
+
+
+def normalize(text: str) -> str:
+    """Lowercase text and normalize its Arabic so spelling variants compare equal"""
+    return normalize_arabic(text.lower())
+
+
+def _normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """normalize() text, also returning the index in text of every normalized character"""
+    chars = []
+    offsets = []
+    for index, char in enumerate(text):
+        for normalized_char in normalize(char):
+            chars.append(normalized_char)
+            offsets.append(index)
+    return ''.join(chars), offsets
+
+
+def _compile_alternation(patterns: Iterable[str]) -> Pattern:
+    """One regex matching any of the (normalized) patterns, longest first"""
+    normalized = sorted({normalize(pattern) for pattern in patterns}, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(pattern) for pattern in normalized))
+
+
+_STOPWORDS = frozenset(normalize(word) for word in COMMON_WORDS)
+_PHRASE_RE = _compile_alternation(EGYPTIAN_PHRASES)
+_KEYWORD_RE = _compile_alternation(EGYPTIAN_KEYWORDS)
+
+
+def detect_language(text: str, arabic_ratio: float = 0.3) -> str:
+    """
+    Classify text by script: 'ar' when Arabic characters make up more than
+    ``arabic_ratio`` of it, 'en' otherwise.
+    """
+    return 'ar' if len(_ARABIC_CHAR_RE.findall(text)) > len(text) * arabic_ratio else 'en'
+
+
+def _content_words(normalized: str) -> List[str]:
+    return [word for word in _WORD_RE.findall(normalized) if len(word) > 2 and word not in _STOPWORDS]
+
+
+def extract_content_words(text: str) -> List[str]:
+    """
+    Split text into normalized words, dropping common words and words of two letters or fewer.
+
+    Args:
+        text (str): Text to split
+
+    Returns:
+        List[str]: Content words in order of appearance
+    """
+    return _content_words(normalize(text))
+
+
+def is_egyptian_related(text: str) -> bool:
+    """
+    Check if a title or phrase is related to Egyptian history.
+
+    Args:
+        text (str): Text to check, e.g. a Wikipedia page title
+
+    Returns:
+        bool: True if it contains an Egyptian history keyword
+    """
+    return _KEYWORD_RE.search(normalize(text)) is not None
+
+
+class QueryAnalysis:
+    """
+    Language, search terms and Egyptian history entities of one message.
+
+    Terms are spelled as in the message, since they are sent to search engines
+    that do their own normalization; the other fields are normalized.
+    """
+    __slots__ = ('language', 'normalized', 'terms', 'entities')
+
+    def __init__(self, language: str, normalized: str, terms: List[str], entities: List[str]):
+        self.language = language
+        self.normalized = normalized
+        self.terms = terms
+        self.entities = entities
+
+
+class QueryAnalyzer:
+    """
+    Analyzes user messages with patterns compiled once at import: the script
+    classifier, Arabic normalization, stopword filtering and one alternation
+    regex each for the Egyptian phrase and keyword lists.
+
+    Results are memoized, so the routes and the Wikipedia searcher can each ask
+    for the analysis of the same message and only the first pays for it.
+    """
+
+    def __init__(self, max_terms: int = 5, cache_size: int = 1024):
+        """
+        Initialize the analyzer.
+
+        Args:
+            max_terms (int): Maximum search terms returned per message
+            cache_size (int): Number of analyses memoized
+        """
+        self.max_terms = max_terms
+        self._cache = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+
+    def analyze(self, text: str) -> QueryAnalysis:
+        """
+        Analyze a message.
+
+        Args:
+            text (str): User message
+
+        Returns:
+            QueryAnalysis: Detected language; key terms (content words, then period
+            phrases, deduplicated on their normalized form and spelled as in the
+            message); and the Egyptian phrases and keywords mentioned
+        """
+        with self._lock:
+            analysis = self._cache.get(text)
+        if analysis is not None:
+            return analysis
+
+        normalized, offsets = _normalize_with_offsets(text)
+        words = [match for match in _WORD_RE.finditer(normalized)
+                 if len(match.group()) > 2 and match.group() not in _STOPWORDS]
+        phrases = list(_PHRASE_RE.finditer(normalized))
+        # Matched on the normalized form, but the first spelling in the message is kept
+        surfaces = {}
+        for match in words + phrases:
+            surfaces.setdefault(match.group(), text[offsets[match.start()]:offsets[match.end() - 1] + 1])
+        terms = list(surfaces.values())[:self.max_terms]
+        entities = list(dict.fromkeys([match.group() for match in phrases] + _KEYWORD_RE.findall(normalized)))
+        analysis = QueryAnalysis(detect_language(text), normalized, terms, entities)
+
+        with self._lock:
+            self._cache[text] = analysis
+        return analysis
+
+
+# Global instance shared by the chat and WhatsApp routes and the Wikipedia searcher
+query_analyzer = QueryAnalyzer()
@@ -0,0 +1,438 @@
+import json
+import logging
+import select
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from src.config import Config
+from src.models.conversation import Conversation
+
+logger = logging.getLogger(__name__)
+
+
+class SessionBackend(ABC):
+    """
+    Storage for per-session message histories.
+
+    Messages are dictionaries with 'role' and 'content' keys. Backends offer
+    batched appends and windowed reads of the most recent messages.
+    """
+
+    # Whether every worker sees the same histories
+    shared = False
+
+    @abstractmethod
+    def read(self, session_id: str, limit: int) -> List[Dict[str, str]]:
+        """
+        Read the most recent messages of a session.
+
+        Args:
+            session_id (str): Session identifier
+            limit (int): Maximum number of messages to return
+
+        Returns:
+            List[Dict[str, str]]: Messages, oldest first
+        """
+
+    @abstractmethod
+    def append(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        """
+        Append messages to a session in one batch.
+
+        Args:
+            session_id (str): Session identifier
+            messages (List[Dict[str, str]]): Messages to append, oldest first
+        """
+
+    def stats(self) -> Dict[str, Any]:
+        """Get backend counters"""
+        return {}
+
+
+class SQLSessionBackend(SessionBackend):
+    """
+    Reads histories from the Conversation table. Exchanges are already persisted as
+    Conversation rows by the routes, so appends need no extra writes; main.py turns
+    off conversation write-behind with this backend, so those rows are committed
+    before the route returns and the next turn reads them. Must be used inside an
+    app context.
+    """
+
+    shared = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {'reads': 0, 'errors': 0}
+
+    def read(self, session_id: str, limit: int) -> List[Dict[str, str]]:
+        try:
+            records = (Conversation.query
+                       .with_entities(Conversation.user_message, Conversation.ai_response)
+                       .filter_by(session_id=session_id)
+                       .order_by(Conversation.timestamp.desc(), Conversation.id.desc())
+                       .limit((limit + 1) // 2)
+                       .all())
+        except Exception as e:
+            logger.error("Error reading session %s from database: %s", session_id, e)
+            with self._lock:
+                self._stats['errors'] += 1
+            return []
+
+        with self._lock:
+            self._stats['reads'] += 1
+
+        messages = []
+        for user_message, ai_response in reversed(records):
+            messages.append({'role': 'user', 'content': user_message})
+            messages.append({'role': 'assistant', 'content': ai_response})
+        return messages[-limit:] if limit else []
+
+    def append(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        # The routes' synchronous conversation_writer.submit() already wrote the turn
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+
+class InMemorySessionBackend(SessionBackend):
+    """
+    Keeps histories in this process, in least-recently-used order.
+
+    Sessions are evicted when the store is full or idle longer than the TTL, and
+    rehydrated lazily from ``fallback`` (the Conversation table by default) the next
+    time they are read.
+    """
+
+    def __init__(self, max_sessions: int = Config.SESSION_STORE_MAX_SESSIONS,
+                 ttl: float = Config.SESSION_STORE_TTL_SECONDS,
+                 max_history_length: int = Config.MAX_HISTORY_LENGTH,
+                 fallback: Optional[SessionBackend] = None):
+        """
+        Initialize the backend.
+
+        Args:
+            max_sessions (int): Maximum number of sessions held in memory
+            ttl (float): Idle time in seconds after which a session is evicted
+            max_history_length (int): Maximum number of messages kept per session
+            fallback (SessionBackend): Durable backend used to rehydrate evicted sessions
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_history_length = max_history_length
+        self.fallback = fallback if fallback is not None else SQLSessionBackend()
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'created': 0, 'rehydrated': 0, 'evicted': 0, 'expired': 0}
+
+    def _touch(self, session_id: str, messages: deque, now: float) -> None:
+        self._sessions[session_id] = (messages, now)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self._stats['evicted'] += 1
+
+    def _expire(self, now: float) -> None:
+        """Drop sessions idle for longer than the TTL; the oldest are at the front"""
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            if now - last_access < self.ttl:
+                break
+            del self._sessions[session_id]
+            self._stats['expired'] += 1
+
+    def _get_or_load(self, session_id: str) -> deque:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._touch(session_id, entry[0], now)
+                self._stats['hits'] += 1
+                return entry[0]
+
+        # Load outside the lock so one slow query does not block other sessions
+        loaded = self.fallback.read(session_id, self.max_history_length)
+
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                # Another thread loaded the session first
+                messages = entry[0]
+            else:
+                messages = deque(loaded, maxlen=self.max_history_length)
+                self._stats['rehydrated' if loaded else 'created'] += 1
+            self._touch(session_id, messages, now)
+            return messages
+
+    def read(self, session_id: str, limit: int) -> List[Dict[str, str]]:
+        messages = self._get_or_load(session_id)
+        with self._lock:
+            return list(messages)[-limit:] if limit else []
+
+    def append(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        history = self._get_or_load(session_id)
+        with self._lock:
+            history.extend(messages)
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.monotonic())
+            stats = dict(self._stats)
+            stats['sessions'] = len(self._sessions)
+            stats['messages'] = sum(len(entry[0]) for entry in self._sessions.values())
+            stats['content_bytes'] = sum(
+                len(message['content'].encode('utf-8'))
+                for entry in self._sessions.values()
+                for message in entry[0]
+            )
+        return stats
+
+
+class RedisError(Exception):
+    """Error reply or protocol failure from a Redis-protocol server"""
+
+
+class RespClient:
+    """
+    A minimal client for the Redis serialization protocol (RESP2) with pipelining.
+    Each thread keeps its own connection.
+    """
+
+    def __init__(self, url: str, timeout: float = 2.0):
+        """
+        Initialize the client.
+
+        Args:
+            url (str): Server URL, e.g. 'redis://:password@localhost:6379/0'
+            timeout (float): Socket connect/read timeout in seconds
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        reader = sock.makefile('rb')
+        self._local.connection = (sock, reader)
+
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            self._send(setup)
+        return self._local.connection
+
+    def _close(self) -> None:
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            try:
+                connection[1].close()
+                connection[0].close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _encode(command) -> bytes:
+        parts = [f"*{len(command)}\r\n".encode()]
+        for argument in command:
+            data = argument if isinstance(argument, bytes) else str(argument).encode('utf-8')
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b''.join(parts)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('Connection closed by server')
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode('utf-8')
+        if kind == b'-':
+            return RedisError(body.decode('utf-8'))
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length == -1:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(body)
+            if count == -1:
+                return None
+            return [self._read_reply(reader) for _ in range(count)]
+        raise RedisError(f"Unexpected reply type: {line!r}")
+
+    def _send(self, commands) -> list:
+        sock, reader = self._local.connection
+        sock.sendall(b''.join(self._encode(command) for command in commands))
+        replies = [self._read_reply(reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    @staticmethod
+    def _dropped(sock) -> bool:
+        """Whether the server closed an idle connection; it has nothing to say until sent a command"""
+        try:
+            return bool(select.select([sock], [], [], 0)[0])
+        except (OSError, ValueError):
+            return True
+
+    def pipeline(self, commands, idempotent: bool = False) -> list:
+        """
+        Send several commands in one round-trip.
+
+        A kept-alive connection the server has closed is replaced before sending. A
+        connection that fails mid-exchange is retried once only for idempotent
+        commands: a write such as RPUSH may already have been applied.
+
+        Args:
+            commands: Sequence of commands, each a tuple of arguments
+            idempotent (bool): Whether the commands can safely run twice
+
+        Returns:
+            list: One reply per command
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._dropped(connection[0]):
+            self._close()
+
+        for attempt in range(2 if idempotent else 1):
+            try:
+                if getattr(self._local, 'connection', None) is None:
+                    self._connect()
+                return self._send(commands)
+            except OSError:
+                self._close()
+                if attempt or not idempotent:
+                    raise
+
+    def execute(self, *command, idempotent: bool = False):
+        """Send a single command and return its reply"""
+        return self.pipeline([command], idempotent)[0]
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Keeps histories in capped Redis lists shared by every worker. Sessions missing
+    from Redis are rehydrated from ``fallback`` (the Conversation table by default).
+    """
+
+    shared = True
+
+    def __init__(self, url: str = Config.SESSION_REDIS_URL,
+                 ttl: float = Config.SESSION_STORE_TTL_SECONDS,
+                 max_history_length: int = Config.MAX_HISTORY_LENGTH,
+                 key_prefix: str = 'chronicler:session:',
+                 fallback: Optional[SessionBackend] = None):
+        """
+        Initialize the backend.
+
+        Args:
+            url (str): Redis server URL
+            ttl (float): Idle time in seconds after which a session key expires
+            max_history_length (int): Maximum number of messages kept per session
+            key_prefix (str): Prefix of the Redis keys holding histories
+            fallback (SessionBackend): Durable backend used to rehydrate expired sessions
+        """
+        self.client = RespClient(url)
+        self.ttl = int(ttl)
+        self.max_history_length = max_history_length
+        self.key_prefix = key_prefix
+        self.fallback = fallback if fallback is not None else SQLSessionBackend()
+        self._lock = threading.Lock()
+        self._stats = {'reads': 0, 'appends': 0, 'rehydrated': 0, 'errors': 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _push_commands(self, key: str, messages: List[Dict[str, str]]) -> list:
+        encoded = [json.dumps(message, ensure_ascii=False) for message in messages]
+        return [
+            ('RPUSH', key, *encoded),
+            ('LTRIM', key, -self.max_history_length, -1),
+            ('EXPIRE', key, self.ttl)
+        ]
+
+    def read(self, session_id: str, limit: int) -> List[Dict[str, str]]:
+        if not limit:
+            return []
+        key = self.key_prefix + session_id
+        try:
+            items, _ = self.client.pipeline([('LRANGE', key, -limit, -1), ('EXPIRE', key, self.ttl)], idempotent=True)
+        except (OSError, RedisError) as e:
+            logger.error("Redis session read error for %s: %s", session_id, e)
+            self._count('errors')
+            return self.fallback.read(session_id, limit)
+
+        self._count('reads')
+        if items:
+            return [json.loads(item) for item in items]
+
+        messages = self.fallback.read(session_id, self.max_history_length)
+        if messages:
+            self._count('rehydrated')
+            try:
+                # Rebuilds the list from scratch, so running it twice is harmless
+                self.client.pipeline([('DEL', key)] + self._push_commands(key, messages), idempotent=True)
+            except (OSError, RedisError) as e:
+                logger.error("Redis session rehydration error for %s: %s", session_id, e)
+                self._count('errors')
+        return messages[-limit:]
+
+    def append(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        if not messages:
+            return
+        try:
+            self.client.pipeline(self._push_commands(self.key_prefix + session_id, messages))
+            self._count('appends')
+        except (OSError, RedisError) as e:
+            logger.error("Redis session append error for %s: %s", session_id, e)
+            self._count('errors')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+
+def create_session_backend(name: str = Config.SESSION_BACKEND) -> SessionBackend:
+    """
+    Create a session backend by name.
+
+    Args:
+        name (str): 'memory', 'sql' or 'redis'
+
+    Returns:
+        SessionBackend: The configured backend
+    """
+    if name == 'memory':
+        return InMemorySessionBackend()
+    if name == 'sql':
+        return SQLSessionBackend()
+    if name == 'redis':
+        return RedisSessionBackend()
+    raise ValueError(f"Unknown session backend: {name}")
@@ -0,0 +1,62 @@
+from typing import Any, Dict, Optional
+from src.config import Config
+from src.models.conversation import ConversationHistory
+from src.utils.session_backends import SessionBackend, InMemorySessionBackend, create_session_backend
+
+
+class SessionStore:
+    """
+    Hands out per-session conversation histories backed by a pluggable SessionBackend
+    (in-process LRU by default, or SQL/Redis to share sessions across workers).
+
+    A history is read as one window of recent messages; the messages added while
+    handling a request are written back in one batch by ``save``.
+    """
+
+    def __init__(self, backend: Optional[SessionBackend] = None,
+                 max_history_length: int = Config.MAX_HISTORY_LENGTH):
+        """
+        Initialize the session store.
+
+        Args:
+            backend (SessionBackend): Storage for histories; defaults to Config.SESSION_BACKEND
+            max_history_length (int): Maximum number of messages kept per session
+        """
+        self.backend = backend if backend is not None else create_session_backend()
+        self.max_history_length = max_history_length
+
+    def get(self, session_id: str) -> ConversationHistory:
+        """
+        Get the recent conversation history for a session. Must run inside an app context.
+
+        Args:
+            session_id (str): Session identifier
+
+        Returns:
+            ConversationHistory: The session's conversation history
+        """
+        messages = self.backend.read(session_id, self.max_history_length)
+        return ConversationHistory(max_length=self.max_history_length, messages=messages)
+
+    def save(self, session_id: str, conversation: ConversationHistory) -> None:
+        """
+        Append the messages added to a history since it was loaded.
+
+        Args:
+            session_id (str): Session identifier
+            conversation (ConversationHistory): History returned by ``get``
+        """
+        if conversation.unsaved:
+            self.backend.append(session_id, conversation.unsaved)
+            conversation.unsaved = []
+
+    def __len__(self) -> int:
+        """Number of sessions held in this process (always 0 for shared backends)"""
+        return len(self.backend) if isinstance(self.backend, InMemorySessionBackend) else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get backend counters, including memory and eviction stats for the in-process backend"""
+        stats = self.backend.stats()
+        stats['backend'] = type(self.backend).__name__
+        stats['shared'] = self.backend.shared
+        return stats
@@ -0,0 +1,101 @@
+import logging
+import math
+import re
+import threading
+from abc import ABC, abstractmethod
+from cachetools import LRUCache
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Words in Latin script, words in Arabic script, digit runs, and any other symbol
+_PIECE_RE = re.compile(r'[A-Za-z\u00C0-\u024F]+|[\u0600-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFF]+|\d+|\S')
+
+
+class Tokenizer(ABC):
+    """Counts the tokens a piece of text costs in a model prompt"""
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """
+        Count tokens in text.
+
+        Args:
+            text (str): Text to measure
+
+        Returns:
+            int: Number of tokens
+        """
+
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    A local, script-aware token estimate. Subword tokenizers split Arabic words into
+    far more pieces than English words of the same length, so Arabic is charged
+    per ~2.5 characters and Latin script per ~4 characters, with every digit group
+    and symbol costing at least one token.
+    """
+
+    def __init__(self, latin_chars_per_token: float = 4.0, arabic_chars_per_token: float = 2.5,
+                 digits_per_token: float = 3.0):
+        self.latin_chars_per_token = latin_chars_per_token
+        self.arabic_chars_per_token = arabic_chars_per_token
+        self.digits_per_token = digits_per_token
+
+    def count(self, text: str) -> int:
+        tokens = 0
+        for piece in _PIECE_RE.findall(text):
+            first = piece[0]
+            if first.isdigit():
+                tokens += math.ceil(len(piece) / self.digits_per_token)
+            elif '\u0600' <= first <= '\uFEFF':
+                tokens += math.ceil(len(piece) / self.arabic_chars_per_token)
+            elif first.isalpha():
+                tokens += math.ceil(len(piece) / self.latin_chars_per_token)
+            else:
+                tokens += 1
+        return tokens
+
+
+class GeminiTokenizer(Tokenizer):
+    """
+    Exact counts from the Gemini count_tokens API. Each new text costs a network
+    call, so counts are memoized and the heuristic is used if the call fails.
+    """
+
+    def __init__(self, model_name: str = Config.AI_MODEL_NAME, cache_size: int = 4096):
+        import google.generativeai as genai
+        self.model = genai.GenerativeModel(model_name)
+        self.fallback = HeuristicTokenizer()
+        self._cache = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        with self._lock:
+            cached = self._cache.get(text)
+        if cached is not None:
+            return cached
+
+        try:
+            tokens = self.model.count_tokens(text).total_tokens
+        except Exception as e:
+            logger.warning("Gemini token count failed, using estimate: %s", e)
+            return self.fallback.count(text)
+
+        with self._lock:
+            self._cache[text] = tokens
+        return tokens
+
+
+_default_tokenizer = None
+_default_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer() -> Tokenizer:
+    """Get the tokenizer selected by Config.TOKENIZER ('heuristic' or 'gemini')"""
+    global _default_tokenizer
+    if _default_tokenizer is None:
+        with _default_tokenizer_lock:
+            if _default_tokenizer is None:
+                _default_tokenizer = GeminiTokenizer() if Config.TOKENIZER == 'gemini' else HeuristicTokenizer()
+    return _default_tokenizer
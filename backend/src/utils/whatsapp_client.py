@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError
+from cachetools import TTLCache
+from src.config import Config
+from src.utils.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Returned by send() when the request may have reached the API but no answer came
+# back; the message may have been delivered, so callers must not send it again
+UNCONFIRMED = {'unconfirmed': True}
+
+
+def _never_sent(error: requests.exceptions.RequestException) -> bool:
+    """Whether a failed request certainly never reached the API, so resending cannot duplicate it"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    # A connection dropped mid-exchange surfaces as a ConnectionError wrapping a ProtocolError
+    return (isinstance(error, requests.exceptions.ConnectionError)
+            and not (error.args and isinstance(error.args[0], ProtocolError)))
+
+
+def _outcome_unknown(error: requests.exceptions.RequestException) -> bool:
+    """Whether a failed request may have been processed by the API"""
+    return isinstance(error, (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError,
+                              requests.exceptions.ChunkedEncodingError))
+
+
+def text_payload(phone_number: str, message: str) -> Dict[str, Any]:
+    """Cloud API message object for a plain text message"""
+    return {
+        "messaging_product": "whatsapp",
+        "to": phone_number,
+        "type": "text",
+        "text": {
+            "body": message
+        }
+    }
+
+
+class RateLimiter:
+    """Token-bucket rate limiter with one bucket per key"""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000, idle_ttl: float = 3600):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate (float): Tokens added per second for each key
+            burst (int): Bucket capacity
+            max_keys (int): Maximum number of buckets tracked
+            idle_ttl (float): Seconds after which an idle bucket is forgotten
+        """
+        self.rate = rate
+        self.burst = burst
+        self._buckets = TTLCache(maxsize=max_keys, ttl=idle_ttl)
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str) -> float:
+        """
+        Take a token for key without waiting for it.
+
+        Args:
+            key (str): Bucket key, e.g. the recipient's phone number
+
+        Returns:
+            float: Seconds the caller must wait before using the token
+        """
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            # Reserve the token now; a negative balance means the caller must wait for it
+            tokens -= 1
+            self._buckets[key] = (tokens, now)
+        return -tokens / self.rate if tokens < 0 else 0.0
+
+    def acquire(self, key: str) -> float:
+        """
+        Take a token for key, sleeping until one is available.
+
+        Args:
+            key (str): Bucket key, e.g. the recipient's phone number
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        wait = self.reserve(key)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class WhatsAppClient:
+    """
+    Outbound client for the WhatsApp Cloud API.
+
+    Uses a pooled keep-alive session with connect/read timeouts, retries 429 and
+    5xx responses and failed connections with jittered exponential backoff, paces
+    messages per recipient, and records send latency histograms. A request that
+    may have reached the API, such as one that timed out waiting for the response,
+    is never retried, so a message is not delivered twice. ``base_url`` can point at a local mock of
+    the Graph API.
+    """
+
+    def __init__(self, token: Optional[str], phone_number_id: Optional[str],
+                 base_url: str = Config.WHATSAPP_GRAPH_API_URL,
+                 connect_timeout: float = Config.WHATSAPP_CONNECT_TIMEOUT_SECONDS,
+                 read_timeout: float = Config.WHATSAPP_READ_TIMEOUT_SECONDS,
+                 max_retries: int = Config.WHATSAPP_SEND_MAX_RETRIES,
+                 backoff: float = Config.WHATSAPP_SEND_BACKOFF_SECONDS,
+                 rate_per_number: float = Config.WHATSAPP_RATE_PER_NUMBER,
+                 burst_per_number: int = Config.WHATSAPP_BURST_PER_NUMBER,
+                 pool_size: int = 20):
+        """
+        Initialize the client.
+
+        Args:
+            token (str): WhatsApp access token
+            phone_number_id (str): Sending phone number id
+            base_url (str): Graph API base URL including the version
+            connect_timeout (float): TCP/TLS connect timeout in seconds
+            read_timeout (float): Response read timeout in seconds
+            max_retries (int): Retries after the first attempt for 429/5xx and failed connections
+            backoff (float): Base retry delay in seconds, doubled on every retry
+            rate_per_number (float): Messages per second allowed to one recipient
+            burst_per_number (int): Messages one recipient may receive back to back
+            pool_size (int): Maximum pooled connections
+        """
+        self.token = token
+        self.phone_number_id = phone_number_id
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = RateLimiter(rate_per_number, burst_per_number)
+        self.pool_size = pool_size
+        # Async mode keeps one httpx client per event loop
+        self._async_sessions = weakref.WeakKeyDictionary()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        })
+
+        self._lock = threading.Lock()
+        self._histograms = {'success': LatencyHistogram(), 'failure': LatencyHistogram(),
+                            'unconfirmed': LatencyHistogram()}
+        self._stats = {'sent': 0, 'failed': 0, 'unconfirmed': 0, 'retries': 0, 'rate_limited_waits': 0}
+
+    @property
+    def messages_url(self) -> str:
+        return f"{self.base_url}/{self.phone_number_id}/messages"
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return min(float(response.headers['Retry-After']), 60.0)
+        return self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def _record(self, outcome: str, started: float, retries: int) -> None:
+        with self._lock:
+            self._histograms[outcome].observe((time.monotonic() - started) * 1000)
+            self._stats[{'success': 'sent', 'failure': 'failed'}.get(outcome, outcome)] += 1
+            self._stats['retries'] += retries
+
+    def send(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Post a message payload to the Cloud API.
+
+        Args:
+            payload (Dict[str, Any]): Message object; 'to' is used for rate limiting
+
+        Returns:
+            Optional[Dict[str, Any]]: Parsed API response, UNCONFIRMED if the message may
+            have been delivered but the API did not answer, or None if sending failed
+        """
+        if self.rate_limiter.acquire(payload.get('to', '')):
+            with self._lock:
+                self._stats['rate_limited_waits'] += 1
+
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = self.session.post(self.messages_url, json=payload, timeout=self.timeout)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    self._record('success', started, attempt)
+                    try:
+                        return response.json()
+                    except ValueError:
+                        return {}
+                error = f"HTTP {response.status_code}"
+            except requests.exceptions.HTTPError as e:
+                # Other 4xx errors will not succeed on retry
+                logger.warning("WhatsApp API rejected message: %s", e)
+                self._record('failure', started, attempt)
+                return None
+            except requests.exceptions.RequestException as e:
+                if not _never_sent(e):
+                    if _outcome_unknown(e):
+                        logger.warning("WhatsApp send outcome unknown, not resending: %s", e)
+                        self._record('unconfirmed', started, attempt)
+                        return UNCONFIRMED
+                    logger.warning("WhatsApp send failed: %s", e)
+                    self._record('failure', started, attempt)
+                    return None
+                error = str(e)
+
+            if attempt < self.max_retries:
+                delay = self._retry_delay(attempt, response)
+                logger.warning("WhatsApp send failed (%s), retrying in %.1fs", error, delay)
+                time.sleep(delay)
+            else:
+                logger.error("WhatsApp send failed after %s attempts: %s", attempt + 1, error)
+
+        self._record('failure', started, self.max_retries)
+        return None
+
+    def _async_session(self):
+        """The httpx client of the running event loop, created on first use"""
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        session = self._async_sessions.get(loop)
+        if session is None:
+            session = httpx.AsyncClient(
+                headers=dict(self.session.headers),
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+            self._async_sessions[loop] = session
+        return session
+
+    async def aclose(self) -> None:
+        """Close the running event loop's httpx client, if one was opened"""
+        session = self._async_sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.aclose()
+
+    async def send_async(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Post a message payload to the Cloud API without blocking the event loop.
+        Retries, pacing and accounting are the same as send().
+
+        Args:
+            payload (Dict[str, Any]): Message object; 'to' is used for rate limiting
+
+        Returns:
+            Optional[Dict[str, Any]]: Parsed API response, UNCONFIRMED if the message may
+            have been delivered but the API did not answer, or None if sending failed
+        """
+        import httpx
+
+        wait = self.rate_limiter.reserve(payload.get('to', ''))
+        if wait:
+            with self._lock:
+                self._stats['rate_limited_waits'] += 1
+            await asyncio.sleep(wait)
+
+        session = self._async_session()
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = await session.post(self.messages_url, json=payload)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    self._record('success', started, attempt)
+                    try:
+                        return response.json()
+                    except ValueError:
+                        return {}
+                error = f"HTTP {response.status_code}"
+            except httpx.HTTPStatusError as e:
+                # Other 4xx errors will not succeed on retry
+                logger.warning("WhatsApp API rejected message: %s", e)
+                self._record('failure', started, attempt)
+                return None
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # The request was never written, so it is safe to send again
+                error = str(e)
+            except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+                logger.warning("WhatsApp send outcome unknown, not resending: %s", e)
+                self._record('unconfirmed', started, attempt)
+                return UNCONFIRMED
+            except httpx.HTTPError as e:
+                logger.warning("WhatsApp send failed: %s", e)
+                self._record('failure', started, attempt)
+                return None
+
+            if attempt < self.max_retries:
+                delay = self._retry_delay(attempt, response)
+                logger.warning("WhatsApp send failed (%s), retrying in %.1fs", error, delay)
+                await asyncio.sleep(delay)
+            else:
+                logger.error("WhatsApp send failed after %s attempts: %s", attempt + 1, error)
+
+        self._record('failure', started, self.max_retries)
+        return None
+
+    def send_text(self, phone_number: str, message: str) -> bool:
+        """
+        Send a text message.
+
+        Args:
+            phone_number (str): Recipient phone number
+            message (str): Message body
+
+        Returns:
+            bool: True if the message was accepted by the API
+        """
+        return self.send(text_payload(phone_number, message)) is not None
+
+    async def send_text_async(self, phone_number: str, message: str) -> bool:
+        """Send a text message without blocking the event loop"""
+        return await self.send_async(text_payload(phone_number, message)) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get send counters and latency histograms"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['latency'] = {outcome: histogram.to_dict() for outcome, histogram in self._histograms.items()}
+        return stats
@@ -0,0 +1,343 @@
+import contextvars
+import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.config import Config
+from src.models.conversation import db, OutboundDelivery, OutboundChunk
+from src.utils.metrics import LatencyHistogram
+from src.utils.whatsapp_client import WhatsAppClient, text_payload
+
+logger = logging.getLogger(__name__)
+
+_PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+_LINE_BREAK_RE = re.compile(r'\s*\n\s*')
+# Sentence ends in English and Arabic ('؟' is the Arabic question mark, '۔' the full stop)
+_SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?؟۔…])\s+')
+_WORD_BREAK_RE = re.compile(r'\s+')
+
+# Each level splits the pieces of the one above that are still too long
+_SPLIT_LEVELS = [(_PARAGRAPH_BREAK_RE, '\n\n'), (_LINE_BREAK_RE, '\n'), (_SENTENCE_BREAK_RE, ' '), (_WORD_BREAK_RE, ' ')]
+
+
+def _pack(text: str, max_chars: int, level: int = 0) -> List[str]:
+    """Greedily pack the pieces of text at the given split level into chunks of at most max_chars"""
+    if len(text) <= max_chars:
+        return [text]
+    if level == len(_SPLIT_LEVELS):
+        # A single word longer than a message; cut it
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+    pattern, joiner = _SPLIT_LEVELS[level]
+    chunks = []
+    current = ''
+    for piece in pattern.split(text):
+        if not piece:
+            continue
+        for part in _pack(piece, max_chars, level + 1):
+            candidate = f"{current}{joiner}{part}" if current else part
+            if len(candidate) <= max_chars:
+                current = candidate
+            else:
+                if current:
+                    chunks.append(current)
+                current = part
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_message(text: str, max_chars: int = Config.WHATSAPP_MAX_CHUNK_CHARS) -> List[str]:
+    """
+    Split text into WhatsApp-sized chunks, breaking between paragraphs where possible,
+    then between lines, then between sentences, then between words.
+
+    Args:
+        text (str): Text to split
+        max_chars (int): Maximum characters per chunk
+
+    Returns:
+        List[str]: Chunks in order
+    """
+    text = text.strip()
+    return _pack(text, max_chars) if text else []
+
+
+class StreamingChunker:
+    """
+    Cuts a streamed answer into chunks as it arrives.
+
+    A chunk is released once later text proves it cannot change: every chunk that
+    split_message would produce except the last. The first chunk is also released
+    early at a paragraph break once it is long enough to stand on its own, so a slow
+    generation still produces a fast first message.
+    """
+
+    def __init__(self, max_chars: int = Config.WHATSAPP_MAX_CHUNK_CHARS,
+                 first_chunk_min_chars: int = Config.WHATSAPP_FIRST_CHUNK_MIN_CHARS):
+        self.max_chars = max_chars
+        self.first_chunk_min_chars = first_chunk_min_chars
+        self._buffer = ''
+        self._released = 0
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Add streamed text.
+
+        Args:
+            text (str): Next piece of the answer
+
+        Returns:
+            List[str]: Chunks that are now final
+        """
+        self._buffer += text
+        ready = []
+
+        if self._released == 0:
+            breaks = [m.start() for m in _PARAGRAPH_BREAK_RE.finditer(self._buffer)]
+            early = [b for b in breaks if self.first_chunk_min_chars <= b <= self.max_chars]
+            if early:
+                first = self._buffer[:early[-1]].strip()
+                self._buffer = self._buffer[early[-1]:].lstrip()
+                ready.append(first)
+
+        chunks = split_message(self._buffer, self.max_chars)
+        if len(chunks) > 1:
+            ready.extend(chunks[:-1])
+            # Keep trailing whitespace, which may be the start of a paragraph break
+            self._buffer = chunks[-1] + self._buffer[len(self._buffer.rstrip()):]
+
+        self._released += len(ready)
+        return ready
+
+    def flush(self) -> List[str]:
+        """Release whatever remains once the stream has ended"""
+        chunks = split_message(self._buffer, self.max_chars)
+        self._buffer = ''
+        self._released += len(chunks)
+        return chunks
+
+
+class DeliveryError(Exception):
+    """Raised when some chunks of an answer could not be sent"""
+    pass
+
+
+class _Progress:
+    """What one deliver() or resend() call has sent so far; updated by its sender"""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = False
+        self.first_sent_at = None
+        self._lock = threading.Lock()
+        self._unrecorded = []
+
+    def record(self, seq: int, result: Dict[str, Any]) -> None:
+        """Note a sent chunk until the ledger is next written"""
+        wamid = (result.get('messages') or [{}])[0].get('id')
+        with self._lock:
+            self.sent += 1
+            if self.first_sent_at is None:
+                self.first_sent_at = time.monotonic()
+            self._unrecorded.append((seq, datetime.utcnow(), wamid))
+
+    def take_unrecorded(self) -> List[Tuple[int, datetime, Optional[str]]]:
+        """Get the sent chunks not yet written to the ledger"""
+        with self._lock:
+            unrecorded, self._unrecorded = self._unrecorded, []
+        return unrecorded
+
+
+# Sent before a regenerated answer when the recipient already saw part of an earlier one
+RESTART_NOTICES = {
+    'en': "(My previous answer was cut off. Here is the full answer again.)",
+    'ar': "(انقطعت إجابتي السابقة. إليك الإجابة كاملة من جديد.)"
+}
+
+
+class WhatsAppDelivery:
+    """
+    Delivers Chronicler answers over WhatsApp as ordered chunks.
+
+    Each chunk is stored with its send state, keyed by the incoming message it
+    answers, so when a delivery is retried only the chunks that were not sent go out
+    again and a fully generated answer is never regenerated. While an answer is
+    generated, its chunks are sent in order by a sender on a shared thread pool, so
+    generation never waits on the Graph API; what was sent is written to the ledger
+    together with the next stored chunk.
+    """
+
+    def __init__(self, client: WhatsAppClient, max_chars: int = Config.WHATSAPP_MAX_CHUNK_CHARS,
+                 first_chunk_min_chars: int = Config.WHATSAPP_FIRST_CHUNK_MIN_CHARS,
+                 sender_workers: int = Config.WHATSAPP_QUEUE_WORKERS):
+        """
+        Initialize the delivery pipeline.
+
+        Args:
+            client (WhatsAppClient): Client used to send the chunks
+            max_chars (int): Maximum characters per chunk
+            first_chunk_min_chars (int): Minimum length of an early first chunk
+            sender_workers (int): Deliveries that can send at once, one per queue worker
+        """
+        self.client = client
+        self.max_chars = max_chars
+        self.first_chunk_min_chars = first_chunk_min_chars
+        self._senders = ThreadPoolExecutor(max_workers=sender_workers, thread_name_prefix='whatsapp-sender')
+        self._lock = threading.Lock()
+        self._first_chunk_latency = LatencyHistogram()
+        self._stats = {'deliveries': 0, 'resumed': 0, 'restarted': 0, 'chunks_sent': 0, 'failed_deliveries': 0}
+
+    def find_complete(self, message_id: str) -> Optional[OutboundDelivery]:
+        """
+        Get a previous delivery for message_id whose answer was fully generated.
+
+        Args:
+            message_id (str): Incoming message id
+
+        Returns:
+            Optional[OutboundDelivery]: The delivery, or None if the answer must be generated
+        """
+        delivery = OutboundDelivery.query.filter_by(message_id=message_id).first()
+        return delivery if delivery is not None and delivery.complete else None
+
+    def deliver(self, message_id: str, phone_number: str, answer_stream: Iterable[str],
+                language: str = 'en') -> bool:
+        """
+        Chunk an answer as it is generated and send each chunk as soon as it is final.
+        Must run inside an app context.
+
+        A regenerated answer is worded differently from the one an interrupted attempt
+        started, so its chunks cannot continue that attempt's chunks. If the recipient
+        already received part of the earlier answer, the new one is sent in full after
+        a notice saying so; chunks of the earlier attempt that were not sent are dropped.
+
+        Args:
+            message_id (str): Incoming message being answered
+            phone_number (str): Recipient phone number
+            answer_stream (Iterable[str]): Pieces of the answer as they are generated
+            language (str): Language of the answer, for the restart notice
+
+        Returns:
+            bool: True if every chunk was sent
+        """
+        started = time.monotonic()
+        delivery = OutboundDelivery.query.filter_by(message_id=message_id).first()
+        if delivery is None:
+            delivery = OutboundDelivery(message_id=message_id, phone_number=phone_number)
+            db.session.add(delivery)
+            db.session.commit()
+
+        # Only the record of what already reached the recipient is kept from an interrupted attempt
+        already_sent = [chunk for chunk in delivery.chunks if chunk.sent_at is not None]
+        for chunk in delivery.chunks:
+            if chunk.sent_at is None:
+                db.session.delete(chunk)
+        db.session.commit()
+        seq = already_sent[-1].seq + 1 if already_sent else 0
+
+        progress = _Progress()
+        stored = {}
+        outbox = queue.Queue()
+        # The sender runs in a copy of this context to keep the message's correlation id
+        sender = self._senders.submit(contextvars.copy_context().run, self._send_outbox,
+                                      delivery.phone_number, outbox, progress)
+        try:
+            if already_sent:
+                logger.info("Restarting the answer to %s after %s sent chunks", message_id, len(already_sent))
+                notice = RESTART_NOTICES.get(language, RESTART_NOTICES['en'])
+                self._store(delivery, seq, notice, stored, progress)
+                outbox.put((seq, notice))
+                seq += 1
+
+            chunker = StreamingChunker(self.max_chars, self.first_chunk_min_chars)
+            for text in answer_stream:
+                for body in chunker.feed(text):
+                    self._store(delivery, seq, body, stored, progress)
+                    outbox.put((seq, body))
+                    seq += 1
+            for body in chunker.flush():
+                self._store(delivery, seq, body, stored, progress)
+                outbox.put((seq, body))
+                seq += 1
+            delivery.complete = True
+        finally:
+            # Even when generation fails, record what the sender got out before it stopped
+            outbox.put(None)
+            sender.result()
+            self._record_sent(stored, progress)
+        return self._finish(progress, started, resumed=False, restarted=bool(already_sent))
+
+    def resend(self, delivery: OutboundDelivery) -> bool:
+        """
+        Send the chunks of a fully generated delivery that have not been sent yet.
+
+        Args:
+            delivery (OutboundDelivery): Delivery returned by find_complete
+
+        Returns:
+            bool: True if every chunk has now been sent
+        """
+        started = time.monotonic()
+        pending = {chunk.seq: chunk for chunk in delivery.chunks if chunk.sent_at is None}
+        logger.info("Resending %s of %s chunks for %s", len(pending), len(delivery.chunks), delivery.message_id)
+        progress = _Progress()
+        for seq, chunk in pending.items():
+            if not self._send(delivery.phone_number, seq, chunk.body, progress):
+                break
+        self._record_sent(pending, progress)
+        return self._finish(progress, started, resumed=True)
+
+    def _store(self, delivery: OutboundDelivery, seq: int, body: str,
+               stored: Dict[int, OutboundChunk], progress: '_Progress') -> None:
+        """Record a final chunk, in the same commit as the chunks sent since the last one"""
+        chunk = OutboundChunk(delivery_id=delivery.id, seq=seq, body=body)
+        db.session.add(chunk)
+        stored[seq] = chunk
+        self._record_sent(stored, progress)
+
+    def _record_sent(self, chunks: Dict[int, OutboundChunk], progress: '_Progress') -> None:
+        for seq, sent_at, wamid in progress.take_unrecorded():
+            chunks[seq].sent_at = sent_at
+            chunks[seq].wamid = wamid
+        db.session.commit()
+
+    def _send_outbox(self, phone_number: str, outbox: 'queue.Queue', progress: '_Progress') -> None:
+        """Send queued (seq, body) chunks in order until the None that ends the answer"""
+        while True:
+            item = outbox.get()
+            if item is None:
+                return
+            # Stop at the first failure so the recipient never sees chunks out of order
+            if not progress.failed:
+                self._send(phone_number, *item, progress)
+
+    def _send(self, phone_number: str, seq: int, body: str, progress: '_Progress') -> bool:
+        result = self.client.send(text_payload(phone_number, body))
+        if result is None:
+            progress.failed = True
+            return False
+        progress.record(seq, result)
+        return True
+
+    def _finish(self, progress: '_Progress', started: float, resumed: bool, restarted: bool = False) -> bool:
+        with self._lock:
+            self._stats['resumed' if resumed else 'deliveries'] += 1
+            self._stats['restarted'] += restarted
+            self._stats['chunks_sent'] += progress.sent
+            if progress.failed:
+                self._stats['failed_deliveries'] += 1
+            if progress.first_sent_at is not None and not resumed:
+                self._first_chunk_latency.observe((progress.first_sent_at - started) * 1000)
+        return not progress.failed
+
+    def stats(self) -> Dict[str, Any]:
+        """Get delivery counters and the time to the first sent chunk"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['first_chunk_latency'] = self._first_chunk_latency.to_dict()
+        return stats
@@ -0,0 +1,175 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Tuple
+from cachetools import TTLCache
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Returned by WikipediaCache.get when nothing usable is cached
+MISS = object()
+
+
+class WikipediaCache:
+    """
+    A two-tier cache for Wikipedia lookups: an in-process TTL/LRU cache in front of
+    a SQLite file that every worker on the host shares.
+
+    Entries whose value is None are negative entries (a page that does not exist or
+    a disambiguation that could not be resolved) and expire after a shorter TTL.
+    """
+
+    def __init__(self, path: str = Config.WIKIPEDIA_CACHE_PATH,
+                 ttl: float = Config.WIKIPEDIA_CACHE_TTL_SECONDS,
+                 negative_ttl: float = Config.WIKIPEDIA_CACHE_NEGATIVE_TTL_SECONDS,
+                 maxsize: int = Config.WIKIPEDIA_CACHE_MEMORY_SIZE,
+                 purge_interval: float = Config.WIKIPEDIA_CACHE_PURGE_INTERVAL_SECONDS):
+        """
+        Initialize the cache.
+
+        Args:
+            path (str): Path of the shared SQLite file, or None to keep only the memory tier
+            ttl (float): Lifetime of positive entries in seconds
+            negative_ttl (float): Lifetime of negative entries in seconds
+            maxsize (int): Maximum number of entries held in memory
+            purge_interval (float): Seconds between deletions of expired entries from the file
+        """
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.purge_interval = purge_interval
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Guards the memory tier and counters only; each thread has its own SQLite connection
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'negative_hits': 0, 'misses': 0, 'writes': 0, 'purged': 0}
+        self._next_purge = time.monotonic() + purge_interval
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                conn = self._connection()
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS wikipedia_cache ('
+                    'key TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL)'
+                )
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Wikipedia cache store unavailable, using memory only: %s", e)
+                self.path = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection to the shared file"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _make_key(key: Tuple) -> str:
+        return json.dumps(list(key), ensure_ascii=False)
+
+    def get(self, key: Tuple) -> Any:
+        """
+        Look up a cached value.
+
+        Args:
+            key (Tuple): Entry key, e.g. ('search', language, query, max_results)
+
+        Returns:
+            Any: The cached value (None for a negative entry), or MISS
+        """
+        key = self._make_key(key)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] > now:
+                self._record_hit('memory_hits', entry[0])
+                return entry[0]
+
+        if self.path:
+            try:
+                row = self._connection().execute(
+                    'SELECT value, expires_at FROM wikipedia_cache WHERE key = ?', (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error("Wikipedia cache read error: %s", e)
+                row = None
+
+            if row is not None and row[1] > now:
+                value = json.loads(row[0])
+                with self._lock:
+                    self._memory[key] = (value, row[1])
+                    self._record_hit('disk_hits', value)
+                return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return MISS
+
+    def set(self, key: Tuple, value: Any) -> None:
+        """
+        Store a value in both tiers, and purge expired entries from the file once
+        every ``purge_interval`` seconds.
+
+        Args:
+            key (Tuple): Entry key, e.g. ('pages', language, query, max_results, sentences)
+            value (Any): JSON-serializable value, or None for a negative entry
+        """
+        key = self._make_key(key)
+        expires_at = time.time() + (self.negative_ttl if value is None else self.ttl)
+
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._stats['writes'] += 1
+            purge_due = time.monotonic() >= self._next_purge
+            if purge_due:
+                self._next_purge = time.monotonic() + self.purge_interval
+
+        if self.path:
+            try:
+                self._connection().execute(
+                    'INSERT OR REPLACE INTO wikipedia_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(value, ensure_ascii=False), expires_at)
+                )
+            except sqlite3.Error as e:
+                logger.error("Wikipedia cache write error: %s", e)
+            if purge_due:
+                self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """Delete expired entries from the shared store and return how many were removed"""
+        if not self.path:
+            return 0
+        try:
+            removed = self._connection().execute(
+                'DELETE FROM wikipedia_cache WHERE expires_at <= ?', (time.time(),)
+            ).rowcount
+        except sqlite3.Error as e:
+            logger.error("Wikipedia cache purge error: %s", e)
+            return 0
+        with self._lock:
+            self._stats['purged'] += removed
+        if removed:
+            logger.info("Purged %s expired Wikipedia cache entries", removed)
+        return removed
+
+    def _record_hit(self, tier: str, value: Any) -> None:
+        self._stats[tier] += 1
+        if value is None:
+            self._stats['negative_hits'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for the cache"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
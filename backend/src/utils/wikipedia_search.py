@@ -1,6 +1,14 @@
-import wikipedia
-import re
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import List, Dict, Optional, Tuple
+from src.config import Config
+from src.utils.mediawiki_client import MediaWikiClient, MediaWikiError, WikiPage
+from src.utils.query_analysis import is_egyptian_related, query_analyzer
+from src.utils.wikipedia_cache import WikipediaCache, MISS
+
+logger = logging.getLogger(__name__)
 
 class WikipediaSearcher:
     """
@@ -8,293 +16,200 @@ class WikipediaSearcher:
     to enhance the Chronicler of the Nile's knowledge base.
     """
     
-    def __init__(self, language='en'):
+    def __init__(self, language='en', max_workers: int = Config.WIKIPEDIA_MAX_WORKERS,
+                 deadline: float = Config.WIKIPEDIA_DEADLINE_SECONDS, cache: Optional[WikipediaCache] = None,
+                 client: Optional[MediaWikiClient] = None):
         """
-        Initialize the Wikipedia searcher with a specific language.
+        Initialize the Wikipedia searcher with a default language.
         
         Args:
-            language (str): Language code for Wikipedia (e.g., 'en', 'ar')
+            language (str): Language code used when a call does not give one (e.g., 'en', 'ar')
+            max_workers (int): Size of the thread pool used for concurrent lookups
+            deadline (float): Overall time budget in seconds for one retrieval
+            cache (WikipediaCache): Cache for search results and their intros
+            client (MediaWikiClient): MediaWiki API client
         """
         self.language = language
-        wikipedia.set_lang(language)
-        
-    def set_language(self, language: str):
-        """Set the Wikipedia language"""
-        self.language = language
-        wikipedia.set_lang(language)
+        self.deadline = deadline
+        self.cache = cache if cache is not None else WikipediaCache()
+        self.client = client if client is not None else MediaWikiClient(pool_size=max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='wikipedia')
         
-    def search_topics(self, query: str, max_results: int = 5) -> List[str]:
+    def search_pages(self, query: str, max_results: int = 5, sentences: int = 2,
+                     language: Optional[str] = None) -> List[Tuple[str, str]]:
         """
-        Search for Wikipedia topics related to the query.
+        Search Wikipedia and get the intro of every hit in one request.
         
         Args:
             query (str): Search query
             max_results (int): Maximum number of results to return
+            sentences (int): Number of sentences of each intro
+            language (str): Language code, defaults to the searcher's language
             
         Returns:
-            List[str]: List of Wikipedia page titles
+            List[Tuple[str, str]]: (title, intro) pairs in search rank order;
+            disambiguation pages and pages without an intro are left out
         """
+        language = language or self.language
+        cache_key = ('pages', language, query, max_results, sentences)
+        cached = self._cached_pages(cache_key, query)
+        if cached is not None:
+            return cached
+        
         try:
-            print(f"🔍 Searching Wikipedia for: {query}")
-            results = wikipedia.search(query, results=max_results)
-            print(f"📋 Found {len(results)} results: {results}")
-            return results
-        except Exception as e:
-            print(f"❌ Wikipedia search error: {e}")
+            logger.debug("Searching Wikipedia for: %s", query)
+            pages = self.client.search(query, language, limit=max_results, sentences=sentences)
+        except MediaWikiError as e:
+            logger.error("Wikipedia search error: %s", e)
             return []
+        return self._store_pages(cache_key, pages)
     
-    def get_page_summary(self, title: str, sentences: int = 3) -> Optional[str]:
-        """
-        Get a summary of a Wikipedia page.
+    async def search_pages_async(self, query: str, max_results: int = 5, sentences: int = 2,
+                                 language: Optional[str] = None) -> List[Tuple[str, str]]:
+        """Async variant of search_pages(), sharing its cache; the SQLite tier is read and written off the event loop"""
+        language = language or self.language
+        cache_key = ('pages', language, query, max_results, sentences)
+        cached = await asyncio.to_thread(self._cached_pages, cache_key, query)
+        if cached is not None:
+            return cached
         
-        Args:
-            title (str): Wikipedia page title
-            sentences (int): Number of sentences to include in summary
-            
-        Returns:
-            Optional[str]: Page summary or None if not found
-        """
         try:
-            print(f"📖 Getting summary for: {title}")
-            summary = wikipedia.summary(title, sentences=sentences)
-            print(f"✅ Summary retrieved: {len(summary)} characters")
-            return summary
-        except wikipedia.exceptions.DisambiguationError as e:
-            print(f"🔀 Disambiguation page for '{title}', trying first option")
-            if e.options:
-                try:
-                    return wikipedia.summary(e.options[0], sentences=sentences)
-                except Exception as inner_e:
-                    print(f"❌ Error with disambiguation option: {inner_e}")
-                    return None
-            return None
-        except wikipedia.exceptions.PageError:
-            print(f"❌ Page not found: {title}")
-            return None
-        except Exception as e:
-            print(f"❌ Error getting summary for '{title}': {e}")
-            return None
+            logger.debug("Searching Wikipedia for: %s", query)
+            pages = await self.client.search_async(query, language, limit=max_results, sentences=sentences)
+        except MediaWikiError as e:
+            logger.error("Wikipedia search error: %s", e)
+            return []
+        return await asyncio.to_thread(self._store_pages, cache_key, pages)
     
-    def get_page_content(self, title: str, max_chars: int = 2000) -> Optional[str]:
-        """
-        Get the full content of a Wikipedia page (truncated).
-        
-        Args:
-            title (str): Wikipedia page title
-            max_chars (int): Maximum characters to return
-            
-        Returns:
-            Optional[str]: Page content or None if not found
-        """
-        try:
-            print(f"📄 Getting content for: {title}")
-            page = wikipedia.page(title)
-            content = page.content[:max_chars]
-            if len(page.content) > max_chars:
-                content += "..."
-            print(f"✅ Content retrieved: {len(content)} characters")
-            return content
-        except wikipedia.exceptions.DisambiguationError as e:
-            print(f"🔀 Disambiguation page for '{title}', trying first option")
-            if e.options:
-                try:
-                    page = wikipedia.page(e.options[0])
-                    content = page.content[:max_chars]
-                    if len(page.content) > max_chars:
-                        content += "..."
-                    return content
-                except Exception as inner_e:
-                    print(f"❌ Error with disambiguation option: {inner_e}")
-                    return None
-            return None
-        except wikipedia.exceptions.PageError:
-            print(f"❌ Page not found: {title}")
-            return None
-        except Exception as e:
-            print(f"❌ Error getting content for '{title}': {e}")
+    def _cached_pages(self, cache_key: Tuple, query: str) -> Optional[List[Tuple[str, str]]]:
+        cached = self.cache.get(cache_key)
+        if cached is MISS:
             return None
+        logger.debug("Cached Wikipedia search for: %s", query)
+        return [tuple(pair) for pair in cached or []]
     
-    def search_egyptian_history(self, query: str) -> Dict[str, str]:
+    def _store_pages(self, cache_key: Tuple, pages: List[WikiPage]) -> List[Tuple[str, str]]:
+        results = [(page.title, page.extract) for page in pages if page.extract and not page.disambiguation]
+        logger.debug("Found %s results: %s", len(results), [title for title, _ in results])
+        self.cache.set(cache_key, [list(pair) for pair in results] if results else None)
+        return results
+    
+    def _search_query(self, term: str) -> str:
+        """Steer a term towards Egyptian history unless it already names it"""
+        return term if is_egyptian_related(term) else f"{term} Egypt"
+    
+    def _retrieve(self, terms: List[str], language: Optional[str] = None, max_per_term: int = 5) -> List[Dict[str, str]]:
         """
-        Search for Egyptian history-related topics and return relevant information.
+        Look up every term concurrently, one search-with-extracts request each,
+        and keep the Egyptian-related hits.
+        
+        Titles are deduplicated across terms, earlier terms first. Whatever has
+        completed when the deadline expires is returned; late calls are abandoned.
         
         Args:
-            query (str): Search query related to Egyptian history
+            terms (List[str]): Search terms
+            language (str): Language code, defaults to the searcher's language
+            max_per_term (int): Maximum number of topics to keep per term
             
         Returns:
-            Dict[str, str]: Dictionary with topic titles as keys and summaries as values
+            List[Dict[str, str]]: One dictionary of topic titles to summaries per term,
+            in the same order as ``terms``
         """
-        print(f"🏺 Searching Egyptian history for: {query}")
+        language = language or self.language
         
-        # Enhance query with Egyptian history keywords
-        enhanced_queries = [
-            query,
-            f"{query} Egypt",
-            f"{query} Egyptian",
-            f"{query} ancient Egypt",
-            f"{query} pharaoh",
-            f"{query} Nile"
+        # Workers run in a copy of the caller's context to keep its correlation id.
+        # Extra hits are requested since those not about Egypt are filtered out.
+        futures = [
+            self._executor.submit(contextvars.copy_context().run, self.search_pages,
+                                  self._search_query(term), max_per_term * 2, 2, language)
+            for term in terms
         ]
+        done, pending = wait(futures, timeout=self.deadline)
         
-        results = {}
-        seen_titles = set()
-        
-        for enhanced_query in enhanced_queries:
-            try:
-                search_results = self.search_topics(enhanced_query, max_results=3)
-                
-                for title in search_results:
-                    if title.lower() in seen_titles:
-                        continue
-                    
-                    seen_titles.add(title.lower())
-                    
-                    # Check if the title is related to Egypt/Egyptian history
-                    if self._is_egyptian_related(title):
-                        summary = self.get_page_summary(title, sentences=2)
-                        if summary:
-                            results[title] = summary
-                            print(f"✅ Added Egyptian topic: {title}")
-                    
-                    # Limit total results
-                    if len(results) >= 5:
-                        break
-                
-                if len(results) >= 5:
-                    break
-                    
-            except Exception as e:
-                print(f"❌ Error in enhanced search for '{enhanced_query}': {e}")
-                continue
+        if pending:
+            logger.warning("Wikipedia deadline reached, abandoning %s pending calls", len(pending))
+            for future in pending:
+                future.cancel()
         
-        return results
+        return self._collect(terms, [future.result() if future in done and future.exception() is None else []
+                                     for future in futures], max_per_term)
     
-    def _is_egyptian_related(self, title: str) -> bool:
-        """
-        Check if a Wikipedia title is related to Egyptian history.
-        
-        Args:
-            title (str): Wikipedia page title
-            
-        Returns:
-            bool: True if related to Egyptian history
-        """
-        egyptian_keywords = [
-            'egypt', 'egyptian', 'pharaoh', 'pyramid', 'nile', 'cairo', 'alexandria',
-            'cleopatra', 'tutankhamun', 'ramses', 'ptolemy', 'hieroglyph', 'sphinx',
-            'luxor', 'karnak', 'thebes', 'memphis', 'giza', 'saqqara', 'abydos',
-            'coptic', 'mamluk', 'fatimid', 'ayyubid', 'ottoman egypt', 'muhammad ali',
-            'suez', 'aswan', 'nubia', 'kush', 'dynasty', 'kingdom egypt'
-        ]
+    async def _retrieve_async(self, terms: List[str], language: Optional[str] = None,
+                              max_per_term: int = 5) -> List[Dict[str, str]]:
+        """Async variant of _retrieve(), with the same deadline and deduplication"""
+        language = language or self.language
+        tasks = [asyncio.ensure_future(self.search_pages_async(self._search_query(term), max_per_term * 2, 2, language))
+                 for term in terms]
+        done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        
+        if pending:
+            logger.warning("Wikipedia deadline reached, abandoning %s pending calls", len(pending))
+            for task in pending:
+                task.cancel()
+        
+        return self._collect(terms, [task.result() if task in done and task.exception() is None else []
+                                     for task in tasks], max_per_term)
+    
+    def _collect(self, terms: List[str], term_results: List[List[Tuple[str, str]]],
+                 max_per_term: int) -> List[Dict[str, str]]:
+        """Keep the Egyptian-related hits of each term, deduplicating titles across terms"""
+        results = [{} for _ in terms]
+        seen_titles = set()
+        for term_index, hits in enumerate(term_results):
+            for title, summary in hits:
+                if title.lower() in seen_titles or not is_egyptian_related(title):
+                    continue
+                seen_titles.add(title.lower())
+                if len(results[term_index]) < max_per_term:
+                    results[term_index][title] = summary
+                    logger.debug("Added Egyptian topic: %s", title)
         
-        title_lower = title.lower()
-        return any(keyword in title_lower for keyword in egyptian_keywords)
+        return results
     
-    def get_contextual_information(self, user_message: str, language: str = 'en') -> str:
+    def get_contextual_passages(self, user_message: str, language: str = 'en') -> List[Tuple[str, str]]:
         """
-        Get contextual Wikipedia information based on user message.
+        Get Egyptian history summaries related to a user message.
         
         Args:
             user_message (str): User's message/question
-            language (str): Language for search ('en' or 'ar')
+            language (str): Language of the message ('en' or 'ar')
             
         Returns:
-            str: Formatted Wikipedia information to add to the prompt
+            List[Tuple[str, str]]: (title, summary) pairs, best matches of earlier terms first
         """
-        print(f"🔍 Getting contextual information for: {user_message[:100]}...")
-        
-        # Set language for search
-        original_lang = self.language
-        if language != self.language:
-            self.set_language(language)
-        
         try:
-            # Extract key terms from user message
-            key_terms = self._extract_key_terms(user_message)
-            print(f"🔑 Extracted key terms: {key_terms}")
-            
-            wikipedia_info = []
-            
-            for term in key_terms[:3]:  # Limit to top 3 terms
-                if language == 'ar':
-                    # For Arabic, search in English but provide context
-                    self.set_language('en')
-                    egyptian_results = self.search_egyptian_history(term)
-                else:
-                    egyptian_results = self.search_egyptian_history(term)
-                
-                for title, summary in egyptian_results.items():
-                    wikipedia_info.append(f"**{title}**: {summary}")
-                
-                if len(wikipedia_info) >= 3:  # Limit total information
-                    break
-            
-            # Format the information
-            if wikipedia_info:
-                formatted_info = "\n\n**Additional Context from Wikipedia:**\n" + "\n\n".join(wikipedia_info)
-                print(f"✅ Retrieved {len(wikipedia_info)} pieces of contextual information")
-                return formatted_info
-            else:
-                print("ℹ️ No relevant Wikipedia information found")
-                return ""
-                
+            key_terms, search_lang = self._contextual_terms(user_message, language)
+            return self._flatten(self._retrieve(key_terms, search_lang))
         except Exception as e:
-            print(f"❌ Error getting contextual information: {e}")
-            return ""
-        finally:
-            # Restore original language
-            if language != original_lang:
-                self.set_language(original_lang)
+            logger.error("Error getting contextual information: %s", e)
+            return []
     
-    def _extract_key_terms(self, text: str) -> List[str]:
-        """
-        Extract key terms from user message that might be relevant for Wikipedia search.
-        
-        Args:
-            text (str): User message
-            
-        Returns:
-            List[str]: List of key terms
-        """
-        # Remove common words and extract potential search terms
-        common_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with',
-            'by', 'about', 'tell', 'me', 'what', 'how', 'when', 'where', 'why', 'who', 'which',
-            'can', 'could', 'would', 'should', 'will', 'was', 'were', 'is', 'are', 'am', 'be',
-            'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'get', 'got', 'give',
-            'أخبرني', 'عن', 'ما', 'هو', 'هي', 'كيف', 'متى', 'أين', 'لماذا', 'من', 'التي', 'الذي',
-            'في', 'على', 'إلى', 'من', 'مع', 'عند', 'كان', 'كانت', 'يكون', 'تكون', 'هل', 'لا', 'نعم'
-        }
-        
-        # Clean and split text
-        words = re.findall(r'\b\w+\b', text.lower())
-        
-        # Filter out common words and short words
-        key_terms = [word for word in words if len(word) > 2 and word not in common_words]
-        
-        # Also look for multi-word phrases that might be important
-        phrases = []
-        text_lower = text.lower()
-        
-        # Egyptian history specific terms
-        egyptian_phrases = [
-            'ancient egypt', 'old kingdom', 'middle kingdom', 'new kingdom', 'ptolemaic period',
-            'roman egypt', 'islamic egypt', 'ottoman egypt', 'modern egypt', 'pharaonic period',
-            'coptic period', 'mamluk period', 'fatimid period', 'ayyubid period',
-            'مصر القديمة', 'الدولة القديمة', 'الدولة الوسطى', 'الدولة الحديثة', 'العصر البطلمي',
-            'مصر الرومانية', 'مصر الإسلامية', 'مصر العثمانية', 'مصر الحديثة'
-        ]
-        
-        for phrase in egyptian_phrases:
-            if phrase in text_lower:
-                phrases.append(phrase)
+    async def get_contextual_passages_async(self, user_message: str, language: str = 'en') -> List[Tuple[str, str]]:
+        """Async variant of get_contextual_passages()"""
+        try:
+            key_terms, search_lang = self._contextual_terms(user_message, language)
+            return self._flatten(await self._retrieve_async(key_terms, search_lang))
+        except Exception as e:
+            logger.error("Error getting contextual information: %s", e)
+            return []
+    
+    def _contextual_terms(self, user_message: str, language: str) -> Tuple[List[str], str]:
+        """Search terms and search language for a message"""
+        logger.debug("Getting contextual information for: %s", user_message[:100])
         
-        # Combine single terms and phrases
-        all_terms = key_terms + phrases
+        # Key terms come from the shared analysis, computed once per message
+        key_terms = query_analyzer.analyze(user_message).terms
+        logger.debug("Extracted key terms: %s", key_terms)
         
-        # Remove duplicates and return top terms
-        unique_terms = list(dict.fromkeys(all_terms))  # Preserves order
-        return unique_terms[:5]  # Return top 5 terms
+        # For Arabic, search in English but provide context.
+        # Limit to top 3 terms, all searched concurrently
+        return key_terms[:3], 'en' if language == 'ar' else language
+    
+    @staticmethod
+    def _flatten(results: List[Dict[str, str]]) -> List[Tuple[str, str]]:
+        passages = [item for term_results in results for item in term_results.items()]
+        logger.debug("Retrieved %s pieces of contextual information", len(passages))
+        return passages
 
 # Global instance for easy access
 wikipedia_searcher = WikipediaSearcher()
@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read when src.config is imported, so the test environment is set up first
+_WORKDIR = tempfile.mkdtemp(prefix='chronicler-tests-')
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(_WORKDIR, 'test.db')}",
+    'WIKIPEDIA_CACHE_PATH': os.path.join(_WORKDIR, 'wikipedia_cache.sqlite3'),
+    'WHATSAPP_QUEUE_PATH': os.path.join(_WORKDIR, 'whatsapp_queue.sqlite3'),
+    'CONVERSATION_ARCHIVE_DIR': os.path.join(_WORKDIR, 'archive'),
+    'BACKGROUND_WORKERS_ENABLED': 'false',
+    'WHATSAPP_QUEUE_ENABLED': 'false',
+    'CONVERSATION_WRITE_BEHIND': 'false',
+    'LOG_LEVEL': 'WARNING'
+})
+for name in ('GEMINI_API_KEY', 'GEMINI_API_ENDPOINT', 'WHATSAPP_ACCESS_TOKEN', 'WHATSAPP_PHONE_NUMBER_ID'):
+    os.environ.pop(name, None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app():
+    from src.main import app
+    return app
+
+
+@pytest.fixture
+def db_session(app):
+    """An app context over empty tables"""
+    from src.models.conversation import db
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db.session
+        db.session.remove()
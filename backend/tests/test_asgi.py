@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+from src import asgi
+from src.models.conversation import ConversationHistory
+from src.routes import chat
+
+
+def test_client_disconnect_during_stream_is_not_answered_again(app, monkeypatch):
+    async def answer(user_message, conversation, language):
+        yield "The pyramids "
+        yield "of Giza..."
+
+    monkeypatch.setattr(asgi, 'stream_chronicler_response_async', answer)
+    sent = []
+
+    async def send(message):
+        if message['type'] == 'http.response.body':
+            raise OSError('client disconnected')
+        sent.append(message)
+
+    application = asgi.ChroniclerASGI(app)
+    # Returns quietly: no second send into the closed connection, no error raised
+    asyncio.run(application._stream_chat(send, "Who built the pyramids?", 'web-1', 'en', ConversationHistory()))
+    assert [message['type'] for message in sent] == ['http.response.start']
+
+
+def test_knowledge_retrieval_runs_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def retrieve(user_message):
+        threads.append(threading.current_thread())
+        return [], True
+
+    monkeypatch.setattr(chat, '_retrieve_knowledge', retrieve)
+    monkeypatch.setattr(chat, '_assemble_prompt', lambda *args: 'prompt')
+
+    async def build():
+        loop_thread = threading.current_thread()
+        await chat.build_chronicler_prompt_async("Who built Karnak?", ConversationHistory(), 'en')
+        return loop_thread
+
+    loop_thread = asyncio.run(build())
+    assert threads and threads[0] is not loop_thread
@@ -0,0 +1,19 @@
+from benchmarks.stats import delta, percentile, summarize
+
+
+def test_percentiles_use_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0.0
+
+
+def test_summary_of_no_samples_only_has_a_count():
+    assert summarize([]) == {'count': 0}
+
+
+def test_delta_subtracts_counters_and_keeps_rates():
+    before = {'hits': 3, 'hit_rate': 0.5, 'nested': {'calls': 1}}
+    after = {'hits': 7, 'hit_rate': 0.7, 'nested': {'calls': 4}}
+    assert delta(before, after) == {'hits': 4, 'hit_rate': 0.7, 'nested': {'calls': 3}}
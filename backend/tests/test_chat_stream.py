@@ -0,0 +1,56 @@
+import json
+
+from src.models.conversation import Conversation
+from src.routes import chat
+
+
+def _events(response):
+    events = []
+    for block in response.get_data(as_text=True).split('\n\n'):
+        if block:
+            event, data = block.split('\n')
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+def _post(app, message, session_id):
+    return app.test_client().post('/api/chat', json={'message': message, 'session_id': session_id},
+                                  headers={'Accept': 'text/event-stream'})
+
+
+def test_answer_streams_as_events_then_is_saved(app, db_session, monkeypatch):
+    def answer(user_message, conversation, language):
+        yield "The pyramids "
+        yield "of Giza..."
+
+    monkeypatch.setattr(chat, 'stream_chronicler_response', answer)
+    response = _post(app, "Who built the pyramids?", 'web-stream-1')
+
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    events = _events(response)
+    assert events[:2] == [('chunk', {'text': "The pyramids "}), ('chunk', {'text': "of Giza..."})]
+    assert events[2][0] == 'done' and events[2][1]['session_id'] == 'web-stream-1'
+
+    assert [message['content'] for message in chat.conversation_sessions.get('web-stream-1').history] == [
+        "Who built the pyramids?", "The pyramids of Giza..."]
+    assert Conversation.query.filter_by(session_id='web-stream-1').one().ai_response == "The pyramids of Giza..."
+
+
+def test_failure_mid_stream_ends_with_an_error_event(app, db_session, monkeypatch):
+    def answer(user_message, conversation, language):
+        yield "The pyramids "
+        raise RuntimeError('quota exceeded')
+
+    monkeypatch.setattr(chat, 'stream_chronicler_response', answer)
+    events = _events(_post(app, "Who built the pyramids?", 'web-stream-2'))
+
+    assert events == [('chunk', {'text': "The pyramids "}), ('error', {'error': 'quota exceeded'})]
+    assert Conversation.query.filter_by(session_id='web-stream-2').count() == 0
+
+
+def test_clients_without_event_stream_get_one_json_answer(app, db_session, monkeypatch):
+    monkeypatch.setattr(chat, 'get_chronicler_response', lambda *args: "The pyramids of Giza...")
+    response = app.test_client().post('/api/chat', json={'message': "Who built the pyramids?", 'session_id': 'web-3'})
+
+    assert response.get_json()['response'] == "The pyramids of Giza..."
@@ -0,0 +1,76 @@
+import pytest
+
+from src.utils.context_assembler import SECTION_HEADERS, ContextAssembler
+from src.utils.tokenizer import Tokenizer
+
+
+class WordTokenizer(Tokenizer):
+    """One token per whitespace-separated word"""
+
+    def count(self, text):
+        return len(text.split())
+
+
+KNOWLEDGE = [
+    ('Karnak', "Karnak is a vast temple complex at Thebes. It was built over two thousand years. "
+               "Its hypostyle hall has 134 columns."),
+    ('Giza', "The pyramids of Giza were built for Khufu, Khafre and Menkaure.")
+]
+WIKIPEDIA = [
+    ('Karnak Temple Complex', "Karnak is a vast temple complex at Thebes. It was built over two thousand years. "
+                              "Its hypostyle hall has 134 columns!"),
+    ('Luxor', "Luxor is a city on the east bank of the Nile, built on the site of ancient Thebes.")
+]
+
+
+def _assembler(budget, min_passage_tokens=5):
+    return ContextAssembler(tokenizer=WordTokenizer(), token_budget=budget, min_passage_tokens=min_passage_tokens)
+
+
+def test_near_duplicates_are_dropped_across_sources():
+    sections, stats = _assembler(500).assemble("Who built the temple at Karnak?", KNOWLEDGE, WIKIPEDIA)
+
+    assert stats['duplicates_dropped'] == 1
+    assert 'Karnak Temple Complex' not in ''.join(sections)
+    # The archive copy wins the tie with its Wikipedia twin
+    assert sections[0].startswith(SECTION_HEADERS['knowledge'] + "**Karnak**")
+
+
+def test_best_covering_passage_is_admitted_first_whatever_its_source():
+    tokenizer = WordTokenizer()
+    budget = tokenizer.count(SECTION_HEADERS['wikipedia']) + tokenizer.count("**Luxor**: " + WIKIPEDIA[1][1])
+    sections, stats = _assembler(budget, min_passage_tokens=budget).assemble(
+        "Was Luxor built on Thebes?", KNOWLEDGE[1:], WIKIPEDIA[1:])
+
+    assert sections == [SECTION_HEADERS['wikipedia'] + "**Luxor**: " + WIKIPEDIA[1][1]]
+    assert stats['passages_skipped'] == 1
+
+
+@pytest.mark.parametrize('budget', range(0, 80, 3))
+def test_context_never_exceeds_the_budget(budget):
+    tokenizer = WordTokenizer()
+    sections, stats = _assembler(budget).assemble("Who built the temple at Karnak?", KNOWLEDGE, WIKIPEDIA)
+
+    assert stats['context_tokens'] == sum(tokenizer.count(section) for section in sections) <= budget
+    assert stats['tokens_saved'] == stats['candidate_tokens'] - stats['context_tokens']
+    assert stats['selected'] + stats['duplicates_dropped'] + stats['passages_skipped'] == stats['candidates']
+
+
+def test_passage_that_does_not_fit_is_cut_at_a_sentence_boundary():
+    tokenizer = WordTokenizer()
+    header = tokenizer.count(SECTION_HEADERS['knowledge'])
+    # Room for the header and the first sentence of the Karnak passage only
+    budget = header + tokenizer.count("**Karnak**: Karnak is a vast temple complex at Thebes.")
+    sections, stats = _assembler(budget).assemble("Karnak temple", KNOWLEDGE[:1])
+
+    assert sections == [SECTION_HEADERS['knowledge'] + "**Karnak**: Karnak is a vast temple complex at Thebes."]
+    assert stats['passages_trimmed'] == 1
+
+
+def test_leftover_budget_below_the_minimum_is_not_filled():
+    tokenizer = WordTokenizer()
+    budget = tokenizer.count(SECTION_HEADERS['knowledge']) + 4
+    sections, stats = _assembler(budget, min_passage_tokens=5).assemble("Karnak temple", KNOWLEDGE[:1])
+
+    assert sections == []
+    assert stats['passages_skipped'] == 1
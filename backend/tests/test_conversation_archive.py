@@ -0,0 +1,69 @@
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from src.models.conversation import Conversation, ConversationArchive
+from src.utils.conversation_archive import ConversationArchiver
+from src.utils.conversation_writer import ConversationWriter
+from src.utils.history_pages import read_history_page
+
+
+@pytest.fixture
+def archiver(db_session, tmp_path, monkeypatch):
+    """An archiver over an empty directory, also used by the history pages"""
+    archiver = ConversationArchiver(directory=str(tmp_path), max_age_days=30)
+    monkeypatch.setattr('src.utils.history_pages.conversation_archiver', archiver)
+    return archiver
+
+
+def _submit(session_id, count, timestamp, start=0):
+    writer = ConversationWriter()
+    for index in range(start, start + count):
+        writer.submit(session_id=session_id, user_message=f"question {index}", ai_response=f"answer {index}",
+                      language='ar' if index % 2 else 'en', timestamp=timestamp)
+
+
+def test_archived_exchanges_read_back_unchanged(archiver):
+    _submit('web-1', 4, datetime(2023, 1, 5))
+    _submit('web-2', 2, datetime(2023, 1, 6))
+    before = read_history_page('web-1', limit=10)['history']
+
+    _submit('web-2', 1, datetime(2023, 6, 1), start=2)
+    assert archiver.archive(now=datetime(2023, 6, 1)) == {'rows': 6, 'files': 1}
+    assert Conversation.query.count() == 1
+
+    assert read_history_page('web-1', limit=10)['history'] == before
+    assert [exchange['language'] for exchange in before] == ['en', 'ar', 'en', 'ar']
+
+
+def test_archive_file_is_plain_jsonl_gzip(archiver):
+    _submit('web-1', 3, datetime(2023, 1, 5))
+    _submit('web-2', 2, datetime(2023, 1, 6))
+    _submit('web-3', 1, datetime(2023, 6, 1))
+    archiver.archive(now=datetime(2023, 6, 1))
+
+    # Each session is its own gzip member, but the file decompresses as a whole
+    path = ConversationArchive.query.one().path
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert [(row['session_id'], row['user_message']) for row in rows] == [
+        ('web-1', 'question 0'), ('web-1', 'question 1'), ('web-1', 'question 2'),
+        ('web-2', 'question 0'), ('web-2', 'question 1')
+    ]
+
+
+def test_ids_are_not_reused_after_archiving(archiver):
+    _submit('web-1', 3, datetime(2023, 1, 5))
+    archiver.archive(now=datetime(2024, 1, 1))
+
+    _submit('web-1', 1, datetime(2024, 1, 1), start=3)
+    ids = [exchange['id'] for exchange in read_history_page('web-1', limit=10)['history']]
+    assert ids == sorted(set(ids)) and len(ids) == 4
+
+
+def test_conversation_table_uses_autoincrement(db_session):
+    sql = db_session.execute(text("SELECT sql FROM sqlite_master WHERE name = 'conversation'")).scalar()
+    assert 'AUTOINCREMENT' in sql
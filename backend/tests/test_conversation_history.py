@@ -0,0 +1,80 @@
+import pytest
+
+from src.models.conversation import ConversationHistory
+from src.utils.tokenizer import HeuristicTokenizer, Tokenizer
+
+
+class LengthTokenizer(Tokenizer):
+    """One token per character, so budgets are easy to reason about"""
+
+    def count(self, text):
+        return len(text)
+
+
+OVERHEAD = ConversationHistory.MESSAGE_OVERHEAD_TOKENS
+
+
+def _history(contents, max_length=None):
+    conversation = ConversationHistory(max_length=max_length, tokenizer=LengthTokenizer())
+    for index, content in enumerate(contents):
+        conversation.add_message('user' if index % 2 == 0 else 'assistant', content)
+    return conversation
+
+
+def _reference(history, max_tokens, exclude_latest):
+    """Walk back from the newest message, keeping messages while they fit"""
+    messages = history[:max(len(history) - exclude_latest, 0)]
+    kept = []
+    used = 0
+    for message in reversed(messages):
+        if used + message['tokens'] > max_tokens:
+            break
+        kept.insert(0, message)
+        used += message['tokens']
+    return kept
+
+
+CONTENTS = ['a' * 8, 'b' * 3, 'c' * 13, 'd', 'e' * 6, 'f' * 2, 'g' * 9]
+
+
+@pytest.mark.parametrize('exclude_latest', [0, 1, 2, 7, 9])
+def test_window_is_the_longest_recent_run_that_fits(exclude_latest):
+    conversation = _history(CONTENTS)
+    for max_tokens in range(0, 60):
+        assert conversation.get_context_for_ai(max_tokens, exclude_latest) == \
+            _reference(conversation.history, max_tokens, exclude_latest)
+
+
+def test_budget_boundaries_are_inclusive():
+    conversation = _history(CONTENTS)
+    last_two = len('f' * 2) + len('g' * 9) + 2 * OVERHEAD
+
+    assert [m['content'] for m in conversation.get_context_for_ai(last_two)] == ['f' * 2, 'g' * 9]
+    assert [m['content'] for m in conversation.get_context_for_ai(last_two - 1)] == ['g' * 9]
+
+
+def test_window_stays_correct_after_old_messages_are_evicted():
+    conversation = _history(CONTENTS + ['h' * 4, 'i' * 5], max_length=4)
+
+    assert [m['content'] for m in conversation.history] == ['f' * 2, 'g' * 9, 'h' * 4, 'i' * 5]
+    for max_tokens in range(0, 40):
+        for exclude_latest in range(0, 5):
+            assert conversation.get_context_for_ai(max_tokens, exclude_latest) == \
+                _reference(conversation.history, max_tokens, exclude_latest)
+
+
+def test_loaded_messages_keep_their_cached_token_counts():
+    messages = [{'role': 'user', 'content': 'Who built Karnak?', 'tokens': 99}]
+    conversation = ConversationHistory(messages=messages, tokenizer=LengthTokenizer())
+
+    assert conversation.get_context_for_ai(98) == []
+    assert conversation.get_context_for_ai(99) == messages
+    assert conversation.unsaved == []
+
+
+def test_arabic_costs_more_tokens_than_english_of_the_same_length():
+    tokenizer = HeuristicTokenizer()
+
+    assert tokenizer.count('pyramids') == 2
+    assert tokenizer.count('الأهرامات') == 4
+    assert tokenizer.count('1952!') == 3
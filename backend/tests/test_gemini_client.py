@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.utils import gemini_client
+from src.utils.gemini_client import GeminiModelManager
+
+
+class FakeModel:
+    created = []
+
+    def __init__(self, model_name, system_instruction=None, generation_config=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.generation_config = generation_config
+        self.prompts = []
+        FakeModel.created.append(self)
+
+    def generate_content(self, prompt, stream=False):
+        self.prompts.append(prompt)
+        return iter(['The ', 'Nile']) if stream else 'The Nile'
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    FakeModel.created = []
+    monkeypatch.setattr(gemini_client.genai, 'GenerativeModel', FakeModel)
+    return GeminiModelManager(system_instruction='You are the Chronicler.', model_name='gemini-test', temperature=0.2)
+
+
+def test_one_model_is_shared_by_concurrent_requests(manager):
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(manager.get_model())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(FakeModel.created) == 1
+    assert all(model is FakeModel.created[0] for model in models)
+    assert models[0].system_instruction == 'You are the Chronicler.'
+    assert models[0].generation_config.temperature == 0.2
+
+
+def test_requests_send_only_their_own_prompt(manager):
+    assert manager.generate('Who built Karnak?') == 'The Nile'
+    assert manager.generate('Who was Hatshepsut?') == 'The Nile'
+    assert FakeModel.created[0].prompts == ['Who built Karnak?', 'Who was Hatshepsut?']
+
+
+def test_model_is_rebuilt_in_a_forked_worker(manager, monkeypatch):
+    parent_model = manager.get_model()
+    monkeypatch.setattr(gemini_client.os, 'getpid', lambda: -1)
+
+    assert manager.get_model() is not parent_model
+    assert len(FakeModel.created) == 2
+
+
+def test_rest_streaming_is_iterated_off_the_event_loop(manager, monkeypatch):
+    monkeypatch.setattr(gemini_client.Config, 'GEMINI_API_ENDPOINT', 'http://127.0.0.1:1')
+
+    async def collect():
+        return [chunk async for chunk in await manager.generate_async('Who built Karnak?', stream=True)]
+
+    assert asyncio.run(collect()) == ['The ', 'Nile']
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import pytest
+
+from src.utils.conversation_archive import conversation_archiver
+from src.utils.conversation_writer import ConversationWriter
+from src.utils.history_pages import read_history_page, read_sessions_page
+
+# Exchanges sharing a timestamp are ordered by id, so ties must not be skipped or repeated
+TIMESTAMPS = [datetime(2020, 1, 1, 10)] * 3 + [datetime(2020, 2, 1, 10)] * 2 + [datetime(2020, 6, 1, 10)] * 4
+
+
+@pytest.fixture
+def session(db_session):
+    writer = ConversationWriter()
+    for index, timestamp in enumerate(TIMESTAMPS):
+        writer.submit(session_id='web-1', user_message=f"question {index}", ai_response=f"answer {index}",
+                      timestamp=timestamp)
+    # The first five exchanges are older than 90 days and move to the archive
+    assert conversation_archiver.archive(now=datetime(2020, 6, 1))['rows'] == 5
+    return 'web-1'
+
+
+def _questions(page):
+    return [exchange['user_message'] for exchange in page['history']]
+
+
+def test_paging_back_visits_live_and_archived_exchanges_once(session):
+    seen = []
+    page = read_history_page(session, limit=2)
+    while True:
+        seen = _questions(page) + seen
+        if not page['has_more']:
+            break
+        page = read_history_page(session, before=page['next_before'], limit=2)
+
+    assert seen == [f"question {index}" for index in range(len(TIMESTAMPS))]
+
+
+def test_paging_forward_from_a_cursor(session):
+    oldest = read_history_page(session, limit=4)
+    while oldest['has_more']:
+        oldest = read_history_page(session, before=oldest['next_before'], limit=4)
+
+    assert _questions(oldest) == ['question 0']
+
+    pages = []
+    page = oldest
+    while True:
+        page = read_history_page(session, after=page['next_after'], limit=3)
+        pages.append(_questions(page))
+        if not page['has_more']:
+            break
+    assert pages == [['question 1', 'question 2', 'question 3'],
+                     ['question 4', 'question 5', 'question 6'],
+                     ['question 7', 'question 8']]
+    # Nothing newer yet, but the cursor stays usable for polling
+    assert read_history_page(session, after=page['next_after'])['history'] == []
+
+
+def test_malformed_cursor_is_rejected(session, app):
+    with pytest.raises(ValueError):
+        read_history_page(session, before='not-a-cursor')
+    assert app.test_client().get('/api/history/web-1?before=not-a-cursor').status_code == 400
+
+
+def test_sessions_are_paged_most_recent_first(db_session):
+    writer = ConversationWriter()
+    for day in range(1, 6):
+        writer.submit(session_id=f"web-{day}", user_message='question', ai_response='answer',
+                      timestamp=datetime(2024, 1, day))
+
+    seen = []
+    page = read_sessions_page(limit=2)
+    while True:
+        seen += [summary['session_id'] for summary in page['sessions']]
+        if not page['has_more']:
+            break
+        page = read_sessions_page(cursor=page['next_cursor'], limit=2)
+
+    assert seen == ['web-5', 'web-4', 'web-3', 'web-2', 'web-1']
@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from src.utils.knowledge_base import KnowledgeBase
+
+
+@pytest.fixture
+def knowledge_dir(tmp_path):
+    (tmp_path / 'ancient_egypt.json').write_text(json.dumps({'period': 'Ancient Egypt'}), encoding='utf-8')
+    return tmp_path
+
+
+def _rewrite(path, data):
+    path.write_text(json.dumps(data), encoding='utf-8')
+    # Make the change visible even on filesystems with coarse mtimes
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+
+def test_periods_are_parsed_once_until_their_file_changes(knowledge_dir):
+    knowledge = KnowledgeBase(str(knowledge_dir), ['ancient_egypt.json'], check_interval=0)
+    first = knowledge.get('ancient_egypt')
+    body, etag = knowledge.period_response('ancient_egypt')
+
+    assert knowledge.get('ancient_egypt') is first
+    assert knowledge.period_response('ancient_egypt') == (body, etag)
+
+    _rewrite(knowledge_dir / 'ancient_egypt.json', {'period': 'Ancient Egypt', 'overview': 'Pharaohs'})
+    assert knowledge.get('ancient_egypt')['overview'] == 'Pharaohs'
+    assert knowledge.period_response('ancient_egypt')[1] != etag
+
+
+def test_a_broken_rewrite_keeps_the_last_good_copy(knowledge_dir):
+    knowledge = KnowledgeBase(str(knowledge_dir), ['ancient_egypt.json'], check_interval=0)
+    knowledge.preload()
+
+    path = knowledge_dir / 'ancient_egypt.json'
+    path.write_text('{"period": ', encoding='utf-8')
+    os.utime(path, (0, os.stat(path).st_mtime + 10))
+    assert knowledge.get('ancient_egypt') == {'period': 'Ancient Egypt'}
+
+
+def test_mtimes_are_not_checked_within_the_interval(knowledge_dir):
+    knowledge = KnowledgeBase(str(knowledge_dir), ['ancient_egypt.json'], check_interval=3600)
+    knowledge.get('ancient_egypt')
+
+    _rewrite(knowledge_dir / 'ancient_egypt.json', {'period': 'Changed'})
+    assert knowledge.get('ancient_egypt') == {'period': 'Ancient Egypt'}
+
+
+@pytest.mark.parametrize('path', ['/api/knowledge', '/api/knowledge/periods', '/api/knowledge/ancient_egypt'])
+def test_unchanged_knowledge_is_answered_with_304(app, path):
+    client = app.test_client()
+    response = client.get(path)
+    etag = response.headers['ETag']
+
+    assert response.status_code == 200 and etag
+    assert response.headers['Cache-Control'] == 'no-cache'
+    revalidated = client.get(path, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304 and revalidated.get_data() == b''
+    assert client.get(path, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_unknown_period_is_not_found(app):
+    assert app.test_client().get('/api/knowledge/atlantis').status_code == 404
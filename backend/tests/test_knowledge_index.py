@@ -0,0 +1,85 @@
+import pytest
+
+from src.utils.knowledge_index import KnowledgeIndex, tokenize
+
+KNOWLEDGE = {
+    'graeco_roman': {
+        'period': 'Graeco-Roman Egypt',
+        'rulers': [
+            {'name': 'Cleopatra VII', 'reign': '51-30 BCE', 'significance': 'Last active ruler of the Ptolemaic Kingdom'},
+            {'name': 'Ptolemy I Soter', 'reign': '305-282 BCE', 'significance': 'Founded the Library of Alexandria'}
+        ]
+    },
+    'modern_egypt': {
+        'period': 'Modern Egypt',
+        'events': [{'event': 'October War', 'date': '1973', 'significance': 'Sadat crossed the Suez Canal'}]
+    }
+}
+
+
+@pytest.fixture(scope='module')
+def index():
+    return KnowledgeIndex(KNOWLEDGE)
+
+
+@pytest.mark.parametrize('query, title', [
+    ("Who was Cleopatra?", 'Cleopatra VII'),
+    ("من هي كليوباترا؟", 'Cleopatra VII'),
+    ("من هي كِلِيوباترا", 'Cleopatra VII'),
+    ("ما هي حرب أكتوبر", 'October War'),
+    ("من أسس مكتبة الإسكندرية", 'Ptolemy I Soter')
+])
+def test_english_and_arabic_questions_find_the_passage(index, query, title):
+    results, _ = index.retrieve(query, k=1)
+    assert results and results[0][1]['title'].endswith(title)
+
+
+def test_arabic_question_words_are_not_terms():
+    assert tokenize("متى حكم محمد علي مصر") == ['حكم', 'muhammad', 'ali']
+
+
+def test_glossary_prefers_the_longest_arabic_phrase():
+    assert tokenize("الدولة الحديثة") == ['new', 'kingdom']
+    assert tokenize("قناة السويس") == ['suez', 'canal']
+
+
+RANKING = {
+    'temples': {
+        'period': 'Temples',
+        'sites': [
+            {'name': 'Karnak', 'description': 'Temple of Amun at Thebes'},
+            {'name': 'Luxor Temple', 'description': 'Temple of Amun beside the Nile at Thebes, with a long avenue of sphinxes, '
+                                                    'colossal statues of the king and a mosque built into its court'},
+            {'name': 'Abu Simbel', 'description': 'Rock temple of Ramesses II in Nubia'}
+        ]
+    }
+}
+
+
+@pytest.fixture(scope='module')
+def ranking_index():
+    return KnowledgeIndex(RANKING)
+
+
+def _titles(results):
+    return [passage['title'].split(' > ')[-1] for _, passage in results]
+
+
+def test_rare_terms_outweigh_common_ones(ranking_index):
+    # 'temple' is in every passage, 'nubia' in one
+    results, _ = ranking_index.retrieve("temple in Nubia", k=3, min_score=0, min_coverage=0)
+    assert _titles(results)[0] == 'Abu Simbel'
+
+
+def test_shorter_passages_rank_first_for_the_same_matches(ranking_index):
+    results, _ = ranking_index.retrieve("Amun Thebes", k=3, min_score=0, min_coverage=0)
+    assert _titles(results) == ['Karnak', 'Luxor Temple']
+    assert results[0][0] > results[1][0]
+
+
+def test_recall_is_strong_only_when_the_best_passage_covers_the_question(ranking_index):
+    _, strong = ranking_index.retrieve("Amun Thebes", min_score=0, min_coverage=0.6)
+    assert strong
+    _, strong = ranking_index.retrieve("Amun pyramids Saqqara Djoser", min_score=0, min_coverage=0.6)
+    assert not strong
+    assert ranking_index.retrieve("Napoleon", min_score=0, min_coverage=0) == ([], False)
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from src.utils.knowledge_base import KnowledgeBase
+from src.utils.knowledge_query import KnowledgeQuery, parse_field
+
+ANCIENT = {
+    'period': 'Ancient Egypt',
+    'timeframe': 'c. 3100-30 BCE',
+    'dynasties': {
+        'new_kingdom': {
+            'period': 'c. 1550-1077 BCE',
+            'notable_rulers': ['Hatshepsut', 'Thutmose III', 'Ramesses II', 'Ramesses III']
+        },
+        'late_period': {'period': 'c. 664-332 BCE', 'notable_rulers': ['Psamtik I']}
+    }
+}
+GRAECO_ROMAN = {
+    'period': 'Graeco-Roman Egypt',
+    'timeframe': '332 BCE - 641 CE',
+    'ptolemaic_dynasty': {
+        'rulers': [
+            {'name': 'Ptolemy I Soter', 'reign': '305-282 BCE'},
+            {'name': 'Ptolemy II Philadelphus', 'reign': '282-246 BCE'},
+            {'name': 'Cleopatra VII', 'reign': '51-30 BCE'}
+        ]
+    },
+    'events': [{'event': 'Battle of Actium', 'date': '31 BCE'}]
+}
+
+
+@pytest.fixture
+def query(tmp_path):
+    for name, data in (('ancient_egypt', ANCIENT), ('graeco_roman', GRAECO_ROMAN)):
+        (tmp_path / f"{name}.json").write_text(json.dumps(data), encoding='utf-8')
+    return KnowledgeQuery(KnowledgeBase(str(tmp_path), ['ancient_egypt.json', 'graeco_roman.json']))
+
+
+def _names(rulers):
+    return [ruler['name'] for ruler in rulers]
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('ramesses', ['Ramesses II', 'Ramesses III']),
+    ('Ramses', ['Ramesses II', 'Ramesses III']),
+    ('ramses ii', ['Ramesses II']),
+    ('thutmosis', ['Thutmose III']),
+    ('ptol', ['Ptolemy I Soter', 'Ptolemy II Philadelphus']),
+    ('ptolemy i', ['Ptolemy I Soter']),
+    ('cleo', ['Cleopatra VII'])
+])
+def test_rulers_match_by_alias_and_word_prefix(query, name, expected):
+    assert _names(query.rulers(name)) == expected
+
+
+def test_rulers_filter_by_reign(query):
+    assert _names(query.rulers('ptolemy', start=-290, end=-280)) == ['Ptolemy I Soter', 'Ptolemy II Philadelphus']
+    assert _names(query.rulers(start=-40, end=-35)) == ['Cleopatra VII']
+
+
+@pytest.mark.parametrize('start, end', [
+    (None, None), (-2000, None), (None, -300), (-700, -600), (-40, -30), (-31, -31), (100, 200), (-5000, -4000)
+])
+def test_timeline_matches_a_full_scan(query, start, end):
+    everything = query.timeline()
+    expected = [entry for entry in everything
+                if (start is None or entry['end'] >= start) and (end is None or entry['start'] <= end)]
+    assert query.timeline(start, end) == expected
+
+
+def test_dotted_paths_and_json_pointers_select_the_same_field(query):
+    assert parse_field('/dynasties/new_kingdom/notable_rulers/1') == ['dynasties', 'new_kingdom', 'notable_rulers', '1']
+    assert parse_field('/a~1b/c~0d') == ['a/b', 'c~d']
+    assert (query.select('ancient_egypt', 'dynasties.new_kingdom.notable_rulers.1')
+            == query.select('ancient_egypt', '/dynasties/new_kingdom/notable_rulers/1')
+            == 'Thutmose III')
+    with pytest.raises(KeyError):
+        query.select('ancient_egypt', 'dynasties.middle_kingdom')
+
+
+def test_list_fields_are_paginated(app):
+    client = app.test_client()
+    response = client.get('/api/knowledge/ancient_egypt?field=/dynasties/new_kingdom/notable_rulers&offset=1&limit=2')
+
+    assert response.status_code == 200
+    page = response.get_json()
+    assert page['items'] == ['Thutmose III', 'Akhenaten']
+    assert page['total'] == 6 and page['has_more']
+
+    assert client.get('/api/knowledge/ancient_egypt?field=dynasties.missing').status_code == 404
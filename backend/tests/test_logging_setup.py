@@ -0,0 +1,76 @@
+import json
+import logging
+import sys
+
+from src.utils.logging_setup import (CorrelationIdFilter, DebugSamplingFilter, JsonFormatter, correlation_id,
+                                     in_current_context, new_correlation_id)
+
+
+def _record(level=logging.INFO, msg='Chat request from %s', args=('web-1',), **extra):
+    record = logging.LogRecord('src.routes.chat', level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_lines_carry_the_message_correlation_id_and_extra_fields():
+    record = _record(correlation_id='abc123', language='ar', history_messages=4)
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry['level'] == 'INFO' and entry['logger'] == 'src.routes.chat'
+    assert entry['msg'] == 'Chat request from web-1'
+    assert entry['correlation_id'] == 'abc123'
+    assert entry['language'] == 'ar' and entry['history_messages'] == 4
+    assert 'args' not in entry and 'exc_info' not in entry
+
+
+def test_json_lines_keep_tracebacks_and_non_ascii_text():
+    try:
+        raise ValueError('bad input')
+    except ValueError:
+        record = logging.LogRecord('src', logging.ERROR, __file__, 1, 'سؤال: %s', ('كليوباترا',), sys.exc_info())
+    line = JsonFormatter().format(record)
+
+    assert 'كليوباترا' in line
+    assert 'ValueError: bad input' in json.loads(line)['exc_info']
+
+
+def test_records_are_stamped_with_the_context_correlation_id():
+    token = new_correlation_id('job-7')
+    try:
+        record = _record()
+        assert CorrelationIdFilter().filter(record)
+        assert record.correlation_id == 'job-7'
+    finally:
+        correlation_id.reset(token)
+    assert correlation_id.get() is None
+
+
+def test_debug_records_are_sampled_but_other_levels_are_kept():
+    never = DebugSamplingFilter(0.0)
+    assert not never.filter(_record(logging.DEBUG))
+    assert never.filter(_record(logging.INFO))
+    assert DebugSamplingFilter(1.0).filter(_record(logging.DEBUG))
+
+
+def test_streamed_bodies_keep_the_request_correlation_id():
+    def body():
+        yield correlation_id.get()
+        yield correlation_id.get()
+
+    token = new_correlation_id('request-1')
+    try:
+        stream = in_current_context(body())
+    finally:
+        correlation_id.reset(token)
+
+    # Iterated after the request context is gone, as a WSGI server does
+    assert list(stream) == ['request-1', 'request-1']
+
+
+def test_requests_echo_or_generate_an_id(app):
+    client = app.test_client()
+
+    assert client.get('/api/knowledge/periods', headers={'X-Request-ID': 'client-42'}).headers['X-Request-ID'] == 'client-42'
+    generated = client.get('/api/knowledge/periods').headers['X-Request-ID']
+    assert len(generated) == 16
+    assert correlation_id.get() is None
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from benchmarks.stubs import Faults, MediaWikiStub, StubServer
+from src.utils.mediawiki_client import MediaWikiClient, MediaWikiError
+
+
+class CannedStub(StubServer):
+    """Answers every request with one fixed payload and remembers the query string"""
+
+    name = 'canned'
+
+    def __init__(self, payload):
+        super().__init__()
+        self.payload = payload
+        self.queries = []
+
+    def handle(self, request, url, body):
+        self.queries.append(url.query)
+        self.send_json(request, self.payload)
+
+
+@pytest.fixture
+def serve():
+    stubs = []
+
+    def start(stub):
+        stubs.append(stub.start())
+        return MediaWikiClient(api_url=f"{stub.url}/{{language}}/api.php", pool_size=2)
+
+    yield start
+    for stub in stubs:
+        stub.stop()
+
+
+def test_one_request_returns_hits_with_their_intros(serve):
+    stub = MediaWikiStub(hits=3)
+    client = serve(stub)
+
+    pages = client.search('Karnak', 'en', limit=3)
+    assert [page.title for page in pages] == ['Karnak in Egypt (1)', 'Karnak in Egypt (2)', 'Karnak in Egypt (3)']
+    assert all(page.extract for page in pages)
+    assert stub.stats()['calls'] == 1
+
+
+def test_language_is_chosen_per_call(serve):
+    client = serve(MediaWikiStub(hits=1))
+
+    english = client.search('Karnak', 'en', limit=1)[0].extract
+    arabic = client.search('الكرنك', 'ar', limit=1)[0].extract
+    assert english != arabic and 'ا' in arabic
+
+
+def test_pages_are_ranked_and_flagged_and_missing_ones_dropped(serve):
+    stub = CannedStub({'query': {'pages': [
+        {'pageid': 2, 'title': 'Luxor (disambiguation)', 'index': 2, 'pageprops': {'disambiguation': ''}},
+        {'title': 'Nowhere', 'missing': True},
+        {'pageid': 1, 'title': 'Luxor', 'index': 1, 'extract': 'A city on the Nile.'}
+    ]}})
+    pages = serve(stub).search('Luxor', limit=5, sentences=2)
+
+    assert [(page.title, page.disambiguation) for page in pages] == [('Luxor', False), ('Luxor (disambiguation)', True)]
+    assert 'gsrsearch=Luxor' in stub.queries[0] and 'exsentences=2' in stub.queries[0]
+
+
+def test_api_and_http_errors_raise(serve):
+    with pytest.raises(MediaWikiError, match='badvalue'):
+        serve(CannedStub({'error': {'code': 'badvalue', 'info': 'Unrecognized value'}})).search('Luxor')
+
+    client = serve(MediaWikiStub(faults=Faults(error_rate=1.0)))
+    with pytest.raises(MediaWikiError):
+        client.search('Luxor')
+    assert client.stats()['failures'] == 1
+
+
+def test_async_search_matches_the_blocking_one(serve):
+    client = serve(MediaWikiStub(hits=2))
+
+    async def search():
+        try:
+            return await client.search_async('Karnak', 'en', limit=2)
+        finally:
+            await client.aclose()
+
+    async_pages = asyncio.run(search())
+    assert [(page.title, page.extract) for page in async_pages] == \
+        [(page.title, page.extract) for page in client.search('Karnak', 'en', limit=2)]
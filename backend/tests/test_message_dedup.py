@@ -0,0 +1,56 @@
+import pytest
+
+from src.models.conversation import ProcessedMessage
+from src.routes import whatsapp
+from src.utils.job_queue import JobQueue
+from src.utils.message_dedup import MessageDeduplicator
+
+
+def _message(message_id):
+    return {'id': message_id, 'from': '201000000000', 'type': 'text', 'text': {'body': 'Who was Ramses II?'}}
+
+
+@pytest.fixture
+def deduplicator(db_session, monkeypatch):
+    deduplicator = MessageDeduplicator()
+    monkeypatch.setattr(whatsapp, 'message_deduplicator', deduplicator)
+    return deduplicator
+
+
+def test_redelivery_is_dropped(deduplicator):
+    assert deduplicator.claim('wamid.1') is True
+    assert deduplicator.claim('wamid.1') is False
+    # A fresh window (another worker, or after a restart) still finds the stored id
+    assert MessageDeduplicator().claim('wamid.1') is False
+
+
+def test_failed_enqueue_releases_the_claim(deduplicator, monkeypatch, tmp_path):
+    class BrokenQueue:
+        def enqueue(self, payload):
+            raise OSError("disk full")
+
+    monkeypatch.setattr(whatsapp, 'whatsapp_job_queue', BrokenQueue())
+    with pytest.raises(OSError):
+        whatsapp.accept_message(_message('wamid.2'))
+    assert ProcessedMessage.query.filter_by(message_id='wamid.2').count() == 0
+
+    # Meta's retry of the webhook is accepted and queued
+    queue = JobQueue('test', str(tmp_path / 'queue.sqlite3'), lambda payload: None)
+    monkeypatch.setattr(whatsapp, 'whatsapp_job_queue', queue)
+    assert whatsapp.accept_message(_message('wamid.2')) is True
+    assert queue.stats()['pending'] == 1
+    assert whatsapp.accept_message(_message('wamid.2')) is False
+    assert queue.stats()['pending'] == 1
+
+
+def test_webhook_returns_500_and_keeps_the_message_retryable(app, deduplicator, monkeypatch):
+    class BrokenQueue:
+        def enqueue(self, payload):
+            raise OSError("disk full")
+
+    monkeypatch.setattr(whatsapp, 'whatsapp_job_queue', BrokenQueue())
+    payload = {'object': 'whatsapp_business_account',
+               'entry': [{'changes': [{'field': 'messages', 'value': {'messages': [_message('wamid.3')]}}]}]}
+    response = app.test_client().post('/api/whatsapp/webhook', json=payload)
+    assert response.status_code == 500
+    assert deduplicator.claim('wamid.3') is True
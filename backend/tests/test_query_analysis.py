@@ -0,0 +1,39 @@
+import pytest
+
+from src.utils.query_analysis import QueryAnalyzer, detect_language, normalize
+
+
+@pytest.mark.parametrize('variant, plain', [
+    ("كِلِيوبَاتْرَا", "كليوباترا"),
+    ("الإسكندرية", "الاسكندريه"),
+    ("أحمد", "احمد"),
+    ("مصطفى", "مصطفي"),
+    ("القـــاهرة", "القاهره"),
+    ("Ramses", "ramses")
+])
+def test_spelling_variants_normalize_alike(variant, plain):
+    assert normalize(variant) == plain
+
+
+@pytest.mark.parametrize('text, language', [
+    ("Who was Cleopatra?", 'en'),
+    ("من هي كليوباترا؟", 'ar'),
+    ("من هو رمسيس الثاني II", 'ar'),
+    ("Tell me about الأهرام please", 'en'),
+    ("", 'en')
+])
+def test_language_is_detected_by_script(text, language):
+    assert detect_language(text) == language
+
+
+def test_terms_keep_the_message_spelling():
+    analysis = QueryAnalyzer().analyze("ما هي مكتبة الإسكندرية في مصر القديمة؟")
+
+    assert analysis.terms == ['مكتبة', 'الإسكندرية', 'مصر', 'القديمة', 'مصر القديمة']
+    assert analysis.entities == ['مصر القديمه', 'الاسكندريه', 'مصر']
+
+
+def test_terms_are_deduplicated_on_their_normalized_form():
+    analysis = QueryAnalyzer().analyze("Karnak or karnak, the temple of KARNAK")
+
+    assert analysis.terms == ['Karnak', 'temple']
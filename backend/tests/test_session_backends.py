@@ -0,0 +1,102 @@
+import socketserver
+import threading
+import time
+
+import pytest
+
+from src.utils.conversation_writer import ConversationWriter
+from src.utils.session_backends import RespClient, SQLSessionBackend
+from src.utils.session_store import SessionStore
+
+
+def test_sql_backend_sees_the_last_exchange_on_the_next_turn(db_session):
+    store = SessionStore(SQLSessionBackend())
+    writer = ConversationWriter()
+
+    for question, answer in (('Who built Karnak?', 'Many pharaohs.'), ('Which one began it?', 'Senusret I.')):
+        conversation = store.get('web-1')
+        conversation.add_message('user', question)
+        conversation.add_message('assistant', answer)
+        # Without write-behind running, submit() commits before the route returns
+        writer.submit(session_id='web-1', user_message=question, ai_response=answer)
+        store.save('web-1', conversation)
+
+    assert [message['content'] for message in store.get('web-1').history] == [
+        'Who built Karnak?', 'Many pharaohs.', 'Which one began it?', 'Senusret I.']
+
+
+class FakeRedis:
+    """A RESP server that records every command and can drop a connection instead of replying"""
+
+    def __init__(self):
+        self.commands = []
+        self.drop_replies = 0
+        self.close_after_reply = False
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return 'redis://127.0.0.1:%s/0' % self.server.server_address[1]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    header = self.rfile.readline()
+                    if not header:
+                        return
+                    command = []
+                    for _ in range(int(header[1:])):
+                        length = int(self.rfile.readline()[1:])
+                        command.append(self.rfile.read(length + 2)[:-2].decode())
+                    fake.commands.append(command[0])
+                    if fake.drop_replies:
+                        fake.drop_replies -= 1
+                        return
+                    self.wfile.write(b'*0\r\n' if command[0] == 'LRANGE' else b':1\r\n')
+                    if fake.close_after_reply:
+                        return
+
+        return Handler
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def redis():
+    server = FakeRedis()
+    yield server
+    server.close()
+
+
+def test_failed_write_is_not_sent_twice(redis):
+    client = RespClient(redis.url)
+    redis.drop_replies = 1
+
+    with pytest.raises(OSError):
+        client.pipeline([('RPUSH', 'session', 'message')])
+    assert redis.commands == ['RPUSH']
+
+
+def test_failed_read_is_retried_on_a_fresh_connection(redis):
+    client = RespClient(redis.url)
+    redis.drop_replies = 1
+
+    assert client.pipeline([('LRANGE', 'session', -10, -1)], idempotent=True) == [[]]
+    assert redis.commands == ['LRANGE', 'LRANGE']
+
+
+def test_connection_closed_by_the_server_is_replaced_before_a_write(redis):
+    client = RespClient(redis.url)
+    redis.close_after_reply = True
+    client.execute('EXPIRE', 'session', 60)
+    time.sleep(0.1)
+
+    assert client.execute('RPUSH', 'session', 'message') == 1
+    assert redis.commands == ['EXPIRE', 'RPUSH']
@@ -0,0 +1,70 @@
+import time
+
+from src.utils.session_backends import InMemorySessionBackend, SessionBackend
+from src.utils.session_store import SessionStore
+
+
+class DictBackend(SessionBackend):
+    """A durable backend stand-in that counts its reads"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.reads = 0
+
+    def read(self, session_id, limit):
+        self.reads += 1
+        return self.sessions.get(session_id, [])[-limit:]
+
+    def append(self, session_id, messages):
+        self.sessions.setdefault(session_id, []).extend(messages)
+
+
+def _message(content):
+    return {'role': 'user', 'content': content}
+
+
+def test_least_recently_used_session_is_evicted():
+    backend = InMemorySessionBackend(max_sessions=2, ttl=60, fallback=DictBackend())
+    backend.append('a', [_message('1')])
+    backend.append('b', [_message('2')])
+    backend.read('a', 10)
+    backend.append('c', [_message('3')])
+
+    assert 'a' in backend and 'c' in backend and 'b' not in backend
+    assert backend.stats()['evicted'] == 1
+
+
+def test_idle_sessions_expire():
+    backend = InMemorySessionBackend(max_sessions=10, ttl=0.05, fallback=DictBackend())
+    backend.append('a', [_message('1')])
+    time.sleep(0.1)
+
+    assert backend.stats()['expired'] == 1
+    assert 'a' not in backend
+
+
+def test_evicted_session_is_rehydrated_from_the_fallback():
+    fallback = DictBackend()
+    fallback.sessions['a'] = [_message('older'), _message('old')]
+    backend = InMemorySessionBackend(max_sessions=1, ttl=60, max_history_length=2, fallback=fallback)
+
+    assert backend.read('a', 10) == [_message('older'), _message('old')]
+    backend.read('b', 10)
+    assert backend.read('a', 10) == [_message('older'), _message('old')]
+    assert fallback.reads == 3
+    assert backend.stats()['rehydrated'] == 2
+
+
+def test_histories_are_capped_and_saved_in_one_batch():
+    backend = DictBackend()
+    store = SessionStore(backend, max_history_length=4)
+
+    conversation = store.get('a')
+    for index in range(6):
+        conversation.add_message('user', str(index))
+    store.save('a', conversation)
+    store.save('a', conversation)
+
+    assert [message['content'] for message in conversation.history] == ['2', '3', '4', '5']
+    assert len(backend.sessions['a']) == 6
+    assert [message['content'] for message in store.get('a').history] == ['2', '3', '4', '5']
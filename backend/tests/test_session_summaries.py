@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from src.models.conversation import (Conversation, SessionSummary, backfill_session_summaries, db,
+                                     record_session_activity)
+from src.utils.conversation_writer import ConversationWriter
+
+
+def _summary(session_id):
+    return SessionSummary.query.filter_by(session_id=session_id).one().to_dict()
+
+
+def test_batched_writes_fold_into_one_summary_per_session(db_session):
+    rows = [{'session_id': 'web-1', 'user_message': 'q', 'ai_response': 'a', 'language': 'en', 'platform': 'web',
+             'timestamp': datetime(2024, 1, day)} for day in (3, 1, 2)]
+    db_session.execute(Conversation.__table__.insert(), rows)
+    record_session_activity(db_session.connection(), rows)
+    db_session.commit()
+    ConversationWriter().submit(session_id='web-1', user_message='q', ai_response='a', language='ar',
+                  timestamp=datetime(2024, 1, 4))
+
+    assert _summary('web-1') == {
+        'session_id': 'web-1', 'platform': 'web', 'language': 'ar',
+        'first_timestamp': '2024-01-01T00:00:00', 'last_timestamp': '2024-01-04T00:00:00', 'message_count': 4
+    }
+
+
+def test_orm_inserts_update_the_summary_and_late_rows_keep_the_latest_time(db_session):
+    for day in (5, 2):
+        db_session.add(Conversation(session_id='whatsapp-1', user_message='q', ai_response='a', platform='whatsapp',
+                                    phone_number='201000000000', timestamp=datetime(2024, 1, day)))
+        db_session.commit()
+
+    summary = _summary('whatsapp-1')
+    assert summary['last_timestamp'] == '2024-01-05T00:00:00'
+    assert summary['message_count'] == 2 and summary['platform'] == 'whatsapp'
+
+
+def test_existing_conversations_are_backfilled(db_session):
+    db_session.execute(Conversation.__table__.insert(), [
+        {'session_id': session_id, 'user_message': 'q', 'ai_response': 'a', 'language': language,
+         'platform': 'web', 'timestamp': datetime(2024, 2, day)}
+        for session_id, language, day in (('web-1', 'en', 1), ('web-1', 'ar', 3), ('web-2', 'en', 2))
+    ])
+    db_session.commit()
+
+    backfill_session_summaries()
+    assert _summary('web-1')['message_count'] == 2 and _summary('web-1')['language'] == 'ar'
+    assert _summary('web-2')['last_timestamp'] == '2024-02-02T00:00:00'
+
+    # Only an empty sessions table is backfilled
+    backfill_session_summaries()
+    assert db.session.query(SessionSummary).count() == 2
+
+
+def test_sessions_endpoint_filters_by_platform(app, db_session):
+    writer = ConversationWriter()
+    writer.submit(session_id='web-1', user_message='q', ai_response='a', timestamp=datetime(2024, 1, 1))
+    writer.submit(session_id='whatsapp-1', user_message='q', ai_response='a', platform='whatsapp',
+                  timestamp=datetime(2024, 1, 2))
+
+    page = app.test_client().get('/api/sessions?platform=whatsapp').get_json()
+    assert [summary['session_id'] for summary in page['sessions']] == ['whatsapp-1']
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs a script, then lists the threads it left behind
+_PROBE = """
+import runpy, sys, threading
+runpy.run_path(sys.argv[1], run_name='__main__')
+print(sorted(thread.name for thread in threading.enumerate()))
+"""
+
+
+def _threads_after(script, tmp_path, **settings):
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{tmp_path / 'startup.db'}",
+               WHATSAPP_QUEUE_PATH=str(tmp_path / 'queue.sqlite3'),
+               CONVERSATION_ARCHIVE_DIR=str(tmp_path / 'archive'),
+               WHATSAPP_QUEUE_ENABLED='true',
+               CONVERSATION_WRITE_BEHIND='true',
+               **settings)
+    env.pop('BACKGROUND_WORKERS_ENABLED', None)
+    result = subprocess.run([sys.executable, '-c', _PROBE, script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_maintenance_scripts_do_not_start_workers(tmp_path):
+    threads = _threads_after('init_db.py', tmp_path)
+    assert 'conversation-writer' not in threads
+    assert 'whatsapp-worker-0' not in threads
+
+
+def test_serving_process_starts_workers(tmp_path):
+    (tmp_path / 'serve.py').write_text("from src.main import app\n")
+    threads = _threads_after(str(tmp_path / 'serve.py'), tmp_path)
+    assert 'conversation-writer' in threads
+    assert 'whatsapp-worker-0' in threads
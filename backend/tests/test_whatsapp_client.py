@@ -0,0 +1,114 @@
+import asyncio
+
+import httpx
+import pytest
+import requests
+from urllib3.exceptions import ProtocolError
+
+from src.utils.whatsapp_client import UNCONFIRMED, WhatsAppClient, text_payload
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = body or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self._body
+
+
+@pytest.fixture
+def client():
+    return WhatsAppClient('token', '123', base_url='http://graph.invalid/v18.0', max_retries=2, backoff=0,
+                          rate_per_number=1000, burst_per_number=1000)
+
+
+def _script(client, monkeypatch, outcomes):
+    """Make session.post return or raise each outcome in turn, and count the calls"""
+    calls = []
+
+    def post(url, json, timeout):
+        outcome = outcomes[len(calls)]
+        calls.append(json)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(client.session, 'post', post)
+    return calls
+
+
+def test_read_timeout_is_not_resent(client, monkeypatch):
+    calls = _script(client, monkeypatch, [requests.exceptions.ReadTimeout('read timed out')])
+
+    assert client.send(text_payload('201000000000', 'hello')) is UNCONFIRMED
+    assert len(calls) == 1
+    assert client.stats()['unconfirmed'] == 1
+
+
+def test_dropped_connection_is_not_resent(client, monkeypatch):
+    aborted = requests.exceptions.ConnectionError(ProtocolError('Connection aborted.'))
+    calls = _script(client, monkeypatch, [aborted])
+
+    assert client.send(text_payload('201000000000', 'hello')) is UNCONFIRMED
+    assert len(calls) == 1
+
+
+def test_failed_connection_and_5xx_are_retried(client, monkeypatch):
+    calls = _script(client, monkeypatch, [
+        requests.exceptions.ConnectTimeout('connect timed out'),
+        FakeResponse(503),
+        FakeResponse(200, {'messages': [{'id': 'wamid.1'}]})
+    ])
+
+    assert client.send(text_payload('201000000000', 'hello')) == {'messages': [{'id': 'wamid.1'}]}
+    assert len(calls) == 3
+    assert client.stats()['retries'] == 2
+
+
+def test_client_errors_are_not_retried(client, monkeypatch):
+    calls = _script(client, monkeypatch, [FakeResponse(400)])
+
+    assert client.send(text_payload('201000000000', 'hello')) is None
+    assert len(calls) == 1
+
+
+def _run_async(client, handler):
+    async def send():
+        session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._async_session = lambda: session
+        try:
+            return await client.send_async(text_payload('201000000000', 'hello'))
+        finally:
+            await session.aclose()
+
+    return asyncio.run(send())
+
+
+def test_async_read_timeout_is_not_resent(client):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadTimeout('read timed out', request=request)
+
+    assert _run_async(client, handler) is UNCONFIRMED
+    assert len(calls) == 1
+
+
+def test_async_connect_error_is_retried(client):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError('connection refused', request=request)
+        return httpx.Response(200, json={'messages': [{'id': 'wamid.2'}]})
+
+    assert _run_async(client, handler) == {'messages': [{'id': 'wamid.2'}]}
+    assert len(calls) == 2
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from src.models.conversation import OutboundChunk, OutboundDelivery
+from src.utils.whatsapp_delivery import RESTART_NOTICES, WhatsAppDelivery
+
+
+class FakeClient:
+    """Records sent bodies; fails the sends whose positions are in fail_at"""
+
+    def __init__(self, fail_at=()):
+        self.sent = []
+        self.fail_at = set(fail_at)
+        self.calls = 0
+
+    def send(self, payload):
+        self.calls += 1
+        if self.calls in self.fail_at:
+            return None
+        self.sent.append(payload['text']['body'])
+        return {'messages': [{'id': f"wamid.{self.calls}"}]}
+
+
+def _paragraphs(*words):
+    return [f"{word * 30}\n\n" for word in words]
+
+
+@pytest.fixture
+def delivery(db_session):
+    def make(client):
+        return WhatsAppDelivery(client, max_chars=40, first_chunk_min_chars=20)
+    return make
+
+
+def test_failed_chunk_is_resent_from_storage(delivery):
+    client = FakeClient(fail_at={2})
+    assert not delivery(client).deliver('wamid.in.1', '201000000000', _paragraphs('a', 'b', 'c'))
+    assert client.sent == ['a' * 30]
+
+    stored = OutboundDelivery.query.filter_by(message_id='wamid.in.1').one()
+    assert stored.complete
+    assert delivery(client).resend(stored)
+    assert client.sent == ['a' * 30, 'b' * 30, 'c' * 30]
+
+
+def test_interrupted_generation_restarts_visibly(delivery):
+    client = FakeClient(fail_at={2})
+
+    def interrupted():
+        yield from _paragraphs('a', 'b', 'c')
+        raise RuntimeError('generation failed')
+
+    with pytest.raises(RuntimeError):
+        delivery(client).deliver('wamid.in.2', '201000000000', interrupted())
+    assert client.sent == ['a' * 30]
+    assert OutboundChunk.query.filter_by(body='b' * 30, sent_at=None).count() == 1
+
+    # The retry generates a different answer; it is sent whole, never spliced onto the first
+    assert delivery(client).deliver('wamid.in.2', '201000000000', _paragraphs('x', 'y'), language='ar')
+    assert client.sent == ['a' * 30, RESTART_NOTICES['ar'], 'x' * 30, 'y' * 30]
+
+    bodies = [chunk.body for chunk in OutboundChunk.query.order_by(OutboundChunk.seq)]
+    assert 'b' * 30 not in bodies
+
+
+def test_generation_does_not_wait_for_sends(delivery):
+    generated = threading.Event()
+
+    class SlowClient(FakeClient):
+        def send(self, payload):
+            # Sending inline would hold generation here until the timeout
+            self.waited = generated.wait(timeout=5)
+            return super().send(payload)
+
+    def answer():
+        yield from _paragraphs('a', 'b', 'c')
+        generated.set()
+
+    client = SlowClient()
+    assert delivery(client).deliver('wamid.in.3', '201000000000', answer())
+    assert client.waited
+    assert client.sent == ['a' * 30, 'b' * 30, 'c' * 30]
+    stored = OutboundDelivery.query.filter_by(message_id='wamid.in.3').one()
+    assert [chunk.wamid for chunk in stored.chunks] == ['wamid.1', 'wamid.2', 'wamid.3']
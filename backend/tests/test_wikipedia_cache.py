@@ -0,0 +1,39 @@
+import sqlite3
+import threading
+
+from src.utils.wikipedia_cache import MISS, WikipediaCache
+
+
+def _rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute('SELECT COUNT(*) FROM wikipedia_cache').fetchone()[0]
+
+
+def test_set_purges_expired_entries_when_due(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = WikipediaCache(path, ttl=60, negative_ttl=-1, purge_interval=0)
+
+    cache.set(('pages', 'en', 'Karnak', 5, 2), {'title': 'Karnak'})
+    # Negative entries expire at once here, so the purge that follows the write removes it
+    cache.set(('pages', 'en', 'Nowhere', 5, 2), None)
+
+    assert _rows(path) == 1
+    assert cache.stats()['purged'] == 1
+
+
+def test_threads_share_the_file_through_their_own_connections(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    WikipediaCache(path).set(('pages', 'ar', 'الكرنك', 5, 2), {'title': 'الكرنك'})
+
+    # A fresh instance has an empty memory tier, so every read goes to the file
+    cache = WikipediaCache(path)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(('pages', 'ar', 'الكرنك', 5, 2))))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [{'title': 'الكرنك'}] * 4
+    assert cache.get(('pages', 'ar', 'missing', 5, 2)) is MISS
@@ -0,0 +1,76 @@
+import threading
+import time
+
+from src.utils.mediawiki_client import MediaWikiError, WikiPage
+from src.utils.wikipedia_cache import WikipediaCache
+from src.utils.wikipedia_search import WikipediaSearcher
+
+
+class FakeMediaWiki:
+    """Answers searches from a dict of query -> titles; slow queries sleep first"""
+
+    def __init__(self, results, slow=(), delay=1.0):
+        self.results = results
+        self.slow = set(slow)
+        self.delay = delay
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def search(self, query, language='en', limit=10, sentences=2):
+        with self._lock:
+            self.queries.append(query)
+        if query in self.slow:
+            time.sleep(self.delay)
+        if query not in self.results:
+            raise MediaWikiError(f"no results for {query}")
+        return [WikiPage(rank, title, f"About {title}." if title != 'Empty Egypt' else '', rank,
+                         title.endswith('(disambiguation)'))
+                for rank, title in enumerate(self.results[query])]
+
+
+def _searcher(client, deadline=5.0):
+    return WikipediaSearcher(cache=WikipediaCache(None), client=client, deadline=deadline)
+
+
+def test_titles_are_deduplicated_across_terms_and_filtered():
+    client = FakeMediaWiki({
+        'Cleopatra': ['Cleopatra', 'Ptolemaic Egypt', 'Cleopatra (disambiguation)', 'Empty Egypt'],
+        'Actium Egypt': ['Ptolemaic Egypt', 'Battle of Actium', 'Actium in Egypt']
+    })
+
+    passages = _searcher(client).get_contextual_passages("Cleopatra and Actium")
+
+    # Terms that already name Egyptian history are searched as they are
+    assert sorted(client.queries) == ['Actium Egypt', 'Cleopatra']
+    # Titles that do not name Egyptian history are dropped, and a title found by two terms is kept once
+    assert passages == [('Cleopatra', 'About Cleopatra.'), ('Ptolemaic Egypt', 'About Ptolemaic Egypt.'),
+                        ('Actium in Egypt', 'About Actium in Egypt.')]
+
+
+def test_terms_are_looked_up_concurrently_within_the_deadline():
+    client = FakeMediaWiki({'Karnak': ['Karnak'], 'Luxor': ['Luxor'], 'Thebes': ['Thebes']},
+                           slow={'Karnak', 'Luxor', 'Thebes'}, delay=0.3)
+
+    started = time.monotonic()
+    passages = _searcher(client).get_contextual_passages("Karnak Luxor Thebes")
+
+    assert time.monotonic() - started < 0.8
+    assert [title for title, _ in passages] == ['Karnak', 'Luxor', 'Thebes']
+
+
+def test_late_lookups_are_abandoned_at_the_deadline():
+    client = FakeMediaWiki({'Karnak': ['Karnak'], 'Luxor': ['Luxor']}, slow={'Luxor'}, delay=1.0)
+
+    started = time.monotonic()
+    passages = _searcher(client, deadline=0.2).get_contextual_passages("Karnak Luxor")
+
+    assert time.monotonic() - started < 0.8
+    assert passages == [('Karnak', 'About Karnak.')]
+
+
+def test_repeated_searches_are_served_from_the_cache():
+    client = FakeMediaWiki({'Karnak': ['Karnak']})
+    searcher = _searcher(client)
+
+    assert searcher.search_pages('Karnak') == searcher.search_pages('Karnak') == [('Karnak', 'About Karnak.')]
+    assert client.queries == ['Karnak']